@@ -0,0 +1,187 @@
+"""
+Admission control for Trylia Contact Us feature
+Per-IP and per-email token buckets plus a TTL cache of recent submission
+hashes, checked before validation so repeats and floods never reach SMTP.
+All state is in memory and bounded with LRU eviction.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from validation_utils import CONTACT_FORM_SCHEMA
+
+# Form fields that identify a submission for deduplication
+DEDUP_FIELDS = tuple(field.name for field in CONTACT_FORM_SCHEMA)
+
+
+class TokenBucketLimiter:
+    """Token bucket per key; the least recently seen keys are evicted first"""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """Take a token for key. Returns (allowed, seconds until a token is available)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1 - tokens) / self.rate
+        return allowed, retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class DedupCache:
+    """Submission hash -> tracking ID for ttl seconds, LRU-bounded"""
+
+    # Stored while the first request for a hash is still being processed
+    PENDING = object()
+
+    def __init__(self, ttl=600, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key, now=None):
+        """
+        Return (True, None) if key is new and now reserved for this caller,
+        or (False, tracking_id) for a duplicate. tracking_id is None while
+        the original request has not finished.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                value = entry[1]
+                return False, None if value is self.PENDING else value
+            self._entries[key] = (now + self.ttl, self.PENDING)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True, None
+
+    def complete(self, key, tracking_id, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[key] = (now + self.ttl, tracking_id)
+
+    def release(self, key):
+        """Forget a claim whose request was not accepted, so it can be retried"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is self.PENDING:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def submission_hash(form_data):
+    """Hash of the submission with whitespace and case normalized"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in DEDUP_FIELDS:
+        value = form_data.get(name)
+        if isinstance(value, str):
+            value = ' '.join(value.split()).casefold()
+        digest.update(f'{name}={value}\x00'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AdmissionDecision:
+    """Outcome of ContactAdmission.check()"""
+
+    def __init__(self, status, key=None, tracking_id=None, retry_after=0.0):
+        self.status = status  # 'admit', 'duplicate' or 'rate_limited'
+        self.key = key
+        self.tracking_id = tracking_id
+        self.retry_after = retry_after
+
+    @property
+    def admitted(self):
+        return self.status == 'admit'
+
+
+class ContactAdmission:
+    """Admission layer in front of the contact form endpoint"""
+
+    def __init__(self):
+        max_keys = int(os.getenv('CONTACT_ADMISSION_MAX_KEYS', '10000'))
+        self.ip_limiter = TokenBucketLimiter(
+            rate=float(os.getenv('CONTACT_IP_RATE_PER_MINUTE', '5')) / 60.0,
+            burst=float(os.getenv('CONTACT_IP_BURST', '5')),
+            max_keys=max_keys
+        )
+        self.email_limiter = TokenBucketLimiter(
+            rate=float(os.getenv('CONTACT_EMAIL_RATE_PER_MINUTE', '2')) / 60.0,
+            burst=float(os.getenv('CONTACT_EMAIL_BURST', '3')),
+            max_keys=max_keys
+        )
+        self.dedup = DedupCache(
+            ttl=float(os.getenv('CONTACT_DEDUP_TTL_SECONDS', '600')),
+            max_entries=max_keys
+        )
+        self.counters = {'admitted': 0, 'deduplicated': 0, 'rateLimitedIp': 0, 'rateLimitedEmail': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def check(self, ip, form_data):
+        """
+        Decide whether a raw submission goes on to validation. Duplicates are
+        recognized first so a double-click never spends a rate-limit token.
+        """
+        key = submission_hash(form_data)
+        is_new, tracking_id = self.dedup.claim(key)
+        if not is_new:
+            self._count('deduplicated')
+            return AdmissionDecision('duplicate', key, tracking_id)
+
+        allowed, retry_after = self.ip_limiter.allow(ip)
+        if not allowed:
+            self.dedup.release(key)
+            self._count('rateLimitedIp')
+            return AdmissionDecision('rate_limited', key, retry_after=retry_after)
+
+        email = form_data.get('businessEmail')
+        if isinstance(email, str) and email.strip():
+            allowed, retry_after = self.email_limiter.allow(email.strip().casefold())
+            if not allowed:
+                self.dedup.release(key)
+                self._count('rateLimitedEmail')
+                return AdmissionDecision('rate_limited', key, retry_after=retry_after)
+
+        self._count('admitted')
+        return AdmissionDecision('admit', key)
+
+    def accepted(self, decision, tracking_id):
+        """Remember an admitted submission so repeats get the same tracking ID"""
+        self.dedup.complete(decision.key, tracking_id)
+
+    def rejected(self, decision):
+        """An admitted submission failed later on (validation, full queue)"""
+        self.dedup.release(decision.key)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, trackedIps=len(self.ip_limiter), trackedEmails=len(self.email_limiter),
+                    recentSubmissions=len(self.dedup))
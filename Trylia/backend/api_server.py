@@ -1,11 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, current_app, g, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import subprocess
 import threading
+import queue
 import os
 import sys
-import signal
 import time
+import signal
+import json
+import hmac
 import logging
 from datetime import datetime
 
@@ -19,25 +22,50 @@ except ImportError:
 
 # Import contact form modules
 from email_service import email_service
+from email_queue import EmailDispatchQueue
 from validation_utils import ContactFormValidator
+from submission_store import submission_store, iter_csv, iter_ndjson
+from contact_batch import batch_format, iter_batch_records, BatchLimitExceeded
+from admission import ContactAdmission
+from responses import CodecJSONProvider, PrecomputedResponse, load_json_codec
+from metrics import TryOnMetricsAggregator, parse_metrics_line, service_metrics, render_counter
+from process_registry import create_process_registry, stop_process, WarmSpare
+from worker_watchdog import Heartbeat, WorkerWatchdog
+from resource_governor import create_resource_governor, format_cpu_list
+from lifecycle import Lifecycle
+from log_setup import configure_logging, init_request_logging
+from tracing import configure_tracer, parse_traceparent
+from status_stream import StatusBroadcaster, parse_event_line, format_sse
+from tryon_sessions import SessionManager
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('api_server.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging: JSON lines to a rotated api_server.log and text to
+# stdout, written by a background thread
+async_logging = configure_logging()
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Request spans, appended to TRACE_FILE (traces.jsonl) and continued by
+# the try-on worker; see trace_report.py
+tracer = configure_tracer('trylia-api', background=True)
+
+# Routes are registered on the app built by create_app()
+api = Blueprint('api', __name__)
+
+# Frame metrics reported by try-on workers on stdout
+tryon_metrics = TryOnMetricsAggregator()
+
+# Session events reported by try-on workers, pushed to /api/status/stream
+status_broadcaster = StatusBroadcaster(int(os.getenv('STATUS_STREAM_BUFFER', '64')))
+STATUS_STREAM_KEEPALIVE = float(os.getenv('STATUS_STREAM_KEEPALIVE', '15'))
+
+# Try-on sessions started through /api/try-on, following their workers' events
+tryon_sessions = SessionManager()
+status_broadcaster.listeners.append(tryon_sessions.on_worker_event)
+
+# Contact emails are sent in the background, off the request thread
+email_queue = EmailDispatchQueue(email_service)
 
-# Global variable to track the current try-on process
-current_process = None
-process_lock = threading.Lock()
+# Rate limiting and duplicate detection in front of /api/contact
+contact_admission = ContactAdmission()
 
 def map_shirt_id_to_selection(shirt_id):
     """
@@ -55,12 +83,26 @@ def map_shirt_id_to_selection(shirt_id):
 def test_camera_access():
     """
     Test if camera is accessible before starting the try-on service.
+    The probe is timed as the camera_probe operation.
+    """
+    with service_metrics.operation('camera_probe') as probe, tracer.span('camera_probe') as span:
+        camera_ok, camera_msg = probe_camera()
+        probe.ok = camera_ok
+        if not camera_ok:
+            span.set_error(camera_msg)
+    return camera_ok, camera_msg
+
+def probe_camera():
+    """
+    Open the frame source and read one frame.
+    TRYON_FRAME_SOURCE can point the worker at a non-camera source.
     """
     try:
-        import cv2
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            return False, "Camera could not be opened"
+        from frame_sources import open_frame_source
+        try:
+            cap = open_frame_source(os.getenv('TRYON_FRAME_SOURCE', 'camera:0'), prefetch=0)
+        except (IOError, OSError) as e:
+            return False, f"Camera could not be opened: {e}"
         
         ret, frame = cap.read()
         cap.release()
@@ -72,394 +114,273 @@ def test_camera_access():
     except Exception as e:
         return False, f"Camera test failed: {str(e)}"
 
-def create_tryon_script_with_args(gender, shirt_index):
+def build_worker_command(gender, shirt_index):
     """
-    Create a try-on service script that accepts command line arguments.
+    Command line for a try-on worker. The worker runs the same stage
+    pipeline as the interactive viewer (see tryon_pipeline.py).
     """
-    script_content = f'''
-import os
-import cv2
-import math
-import cvzone
-import sys
-from cvzone.PoseModule import PoseDetector
-
-def calculate_size_recommendation(shoulder_dist):
-    """
-    Calculate size recommendation based on shoulder distance.
-    """
-    # Size mapping based on shoulder distance in pixels
-    if shoulder_dist < 80:
-        return "XS"
-    elif shoulder_dist < 100:
-        return "S"
-    elif shoulder_dist < 120:
-        return "M"
-    elif shoulder_dist < 140:
-        return "L"
-    elif shoulder_dist < 160:
-        return "XL"
-    else:
-        return "XXL"
+    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tryon_service.py')
+    return [sys.executable, script_path, '--worker', '--gender', gender, '--shirt', str(shirt_index)]
 
-def calculate_confidence_score(lmList, shoulder_dist):
+def process_registry():
     """
-    Calculate confidence/accuracy score based on pose detection quality.
+    Registry of the running try-on worker for the current app.
     """
-    if not lmList or len(lmList) < 25:
-        return 0.0
-    
-    # Check visibility of key landmarks
-    key_landmarks = [11, 12, 23, 24]  # shoulders and hips
-    visible_count = 0
-    
-    for idx in key_landmarks:
-        if idx < len(lmList) and len(lmList[idx]) >= 3:
-            # Check if landmark is visible (confidence > 0.5)
-            if len(lmList[idx]) > 3 and lmList[idx][3] > 0.5:
-                visible_count += 1
-            elif len(lmList[idx]) == 3:  # No confidence score available
-                visible_count += 1
-    
-    visibility_score = visible_count / len(key_landmarks)
-    
-    # Check shoulder distance stability (good pose)
-    shoulder_stability = min(1.0, shoulder_dist / 50.0) if shoulder_dist > 0 else 0.0
-    
-    # Combine scores
-    confidence = (visibility_score * 0.7 + shoulder_stability * 0.3) * 100
-    return min(100.0, confidence)
+    return current_app.extensions['tryon_processes']
 
-def draw_info_panel(img, size_rec, confidence, gender, shirt_index):
+class WorkerSupervisor:
     """
-    Draw size recommendation and confidence score at bottom right corner.
+    Starts the try-on worker processes of an app and keeps them healthy.
+    Every worker gets a heartbeat block that the watchdog checks; a worker
+    that stalls, never shows a frame or stays below TRYON_MIN_FPS is
+    replaced by a new session for the same shirt, up to TRYON_MAX_RESTARTS
+    times. With TRYON_WARM_SPARE=1 (the default) an idle worker is kept
+    ready for the next start or restart.
     """
-    h, w = img.shape[:2]
-    
-    # Panel dimensions
-    panel_width = 280
-    panel_height = 120
-    panel_x = w - panel_width - 20
-    panel_y = h - panel_height - 20
-    
-    # Draw semi-transparent background
-    overlay = img.copy()
-    cv2.rectangle(overlay, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.7, img, 0.3, 0, img)
-    
-    # Draw border
-    cv2.rectangle(img, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (255, 255, 255), 2)
-    
-    # Text properties
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 0.6
-    thickness = 2
-    
-    # Title
-    title_text = f"{{gender.upper()}} SHIRT {{shirt_index}}"
-    cv2.putText(img, title_text, (panel_x + 10, panel_y + 25), font, 0.5, (255, 255, 255), 1)
-    
-    # Size recommendation
-    size_text = f"Recommended Size: {{size_rec}}"
-    cv2.putText(img, size_text, (panel_x + 10, panel_y + 50), font, font_scale, (0, 255, 0), thickness)
-    
-    # Confidence score with color coding
-    conf_text = f"Accuracy: {{confidence:.1f}}%"
-    if confidence >= 80:
-        conf_color = (0, 255, 0)  # Green
-    elif confidence >= 60:
-        conf_color = (0, 255, 255)  # Yellow
-    else:
-        conf_color = (0, 0, 255)  # Red
-    
-    cv2.putText(img, conf_text, (panel_x + 10, panel_y + 75), font, font_scale, conf_color, thickness)
-    
-    # Confidence bar
-    bar_x = panel_x + 10
-    bar_y = panel_y + 90
-    bar_width = 200
-    bar_height = 15
-    
-    # Background bar
-    cv2.rectangle(img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (50, 50, 50), -1)
     
-    # Confidence bar fill
-    fill_width = int((confidence / 100.0) * bar_width)
-    cv2.rectangle(img, (bar_x, bar_y), (bar_x + fill_width, bar_y + bar_height), conf_color, -1)
+    def __init__(self, registry):
+        self.registry = registry
+        self.watchdog = WorkerWatchdog(
+            self.restart,
+            stall_timeout=float(os.getenv('TRYON_STALL_TIMEOUT', '5')),
+            min_fps=float(os.getenv('TRYON_MIN_FPS', '0')),
+            slo_window=float(os.getenv('TRYON_FPS_WINDOW', '30')),
+            startup_timeout=float(os.getenv('TRYON_STARTUP_TIMEOUT', '60'))
+        )
+        self.max_restarts = int(os.getenv('TRYON_MAX_RESTARTS', '3'))
+        self.governor = create_resource_governor()
+        self.slot_timeout = float(os.getenv('TRYON_SLOT_TIMEOUT', '10'))
+        self.spare = None
+        if os.getenv('TRYON_WARM_SPARE', '1') == '1':
+            # The spare learns its shirt from the start command
+            self.spare = WarmSpare(lambda: self.spawn('male', 1), discard=self.discard)
     
-    # Bar border
-    cv2.rectangle(img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (255, 255, 255), 1)
-    
-    return img
-
-def main():
-    gender = "{gender}"
-    shirt_index = {shirt_index}
+    def spawn(self, gender, shirt_index, env=None):
+        """
+        A new worker process that waits for its start command on stdin,
+        with its heartbeat block attached as process.heartbeat.
+        """
+        heartbeat = Heartbeat()
+        if self.governor:
+            env = dict(self.governor.thread_env(), **(env or {}))
+        try:
+            process = subprocess.Popen(
+                build_worker_command(gender, shirt_index),
+                cwd=os.path.dirname(__file__),
+                env=dict(os.environ, TRYON_WAIT_FOR_START='1', TRYON_HEARTBEAT=heartbeat.name, **(env or {})),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                universal_newlines=True
+            )
+        except Exception:
+            heartbeat.close()
+            raise
+        process.heartbeat = heartbeat
+        process.cpu_slot = None
+        return process
     
-    print(f"[INFO] Starting Virtual Try-On for {{gender}} shirt {{shirt_index}}")
+    def take_or_spawn(self, gender, shirt_index, env=None):
+        """The warm spare if one is waiting, else a new worker"""
+        process = self.spare.take() if self.spare else None
+        service_metrics.count('trylia_worker_spawns_total', [('source', 'spare' if process else 'new')])
+        return process or self.spawn(gender, shirt_index, env)
     
-    # --- Camera and Pose Detector ---
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("[ERROR] Could not open camera")
-        return 1
+    def reserve_cpus(self, process):
+        """
+        Hold a CPU slot for the worker until it exits, waiting up to
+        TRYON_SLOT_TIMEOUT seconds for one to free up.
+        """
+        if self.governor is None:
+            return True, "CPU governor disabled"
+        slot = self.governor.acquire(self.slot_timeout)
+        if slot is None:
+            return False, f"All {self.governor.max_sessions} try-on CPU slots are busy"
+        process.cpu_slot = slot
+        return True, f"CPUs {format_cpu_list(slot.cpus)}"
     
-    print("[INFO] Camera opened successfully")
+    def released(self, process):
+        """The worker has been sent its start command: watch it and prepare the next spare"""
+        self.watchdog.watch(process.pid, process.heartbeat)
+        self.watchdog.start()
+        if self.spare:
+            self.spare.refill()
     
-    detector = PoseDetector()
-    shirtRatio = 581 / 440  # Height/Width ratio of shirt images
-    selected_shirt = None
+    def exited(self, process):
+        self.watchdog.forget(process.pid)
+        process.heartbeat.close()
+        if process.cpu_slot:
+            process.cpu_slot.release()
     
-    # --- Shirt lists ---
-    try:
-        male_shirts = [f"male/{{f}}" for f in os.listdir("static/male") if f.lower().endswith((".png", ".jpg", ".jpeg"))]
-        female_shirts = [f"female/{{f}}" for f in os.listdir("static/female") if f.lower().endswith((".png", ".jpg", ".jpeg"))]
-    except Exception as e:
-        print(f"[ERROR] Could not load shirt lists: {{e}}")
-        cap.release()
-        return 1
+    def discard(self, process):
+        stop_process(process)
+        self.exited(process)
     
-    # --- Select shirt ---
-    try:
-        if gender == "male":
-            if 1 <= shirt_index <= len(male_shirts):
-                selected_shirt = male_shirts[shirt_index - 1]
-            else:
-                raise ValueError(f"Invalid male shirt index: {{shirt_index}} (available: 1-{{len(male_shirts)}})")
-        elif gender == "female":
-            if 1 <= shirt_index <= len(female_shirts):
-                selected_shirt = female_shirts[shirt_index - 1]
-            else:
-                raise ValueError(f"Invalid female shirt index: {{shirt_index}} (available: 1-{{len(female_shirts)}})")
+    def restart(self, pid, reason):
+        """
+        Watchdog callback: replace an unhealthy worker with a new session
+        for the same shirt.
+        """
+        service_metrics.count('trylia_worker_unhealthy_total', [('reason', reason)])
+        status_broadcaster.publish('unhealthy', pid=pid, reason=reason)
+        selection = tryon_sessions.report_unhealthy(pid, reason)
+        if selection is None:
+            logger.warning(f"Try-on worker {pid} is unhealthy ({reason}) but belongs to no session")
+            return
+        gender, shirt_index, restarts = selection
+        if restarts >= self.max_restarts:
+            logger.error(f"Try-on worker {pid} is unhealthy ({reason}), giving up after {restarts} restarts")
+            if self.registry.status()['pid'] == pid:
+                self.registry.stop()
+            return
         
-        print(f"[INFO] Selected shirt: {{selected_shirt}}")
-        
-        # Check if shirt file exists
-        shirt_path = os.path.join("static", selected_shirt)
-        if not os.path.exists(shirt_path):
-            raise ValueError(f"Shirt file not found: {{shirt_path}}")
-        
-    except Exception as e:
-        print(f"[ERROR] Shirt selection failed: {{e}}")
-        cap.release()
-        return 1
-    
-    # --- Smoothing variables for stable overlay ---
-    prev_cx, prev_cy, prev_w, prev_h = 0, 0, 0, 0
-    smoothing = 0.2  # smaller = smoother
-    
-    # --- Size and confidence tracking ---
-    size_recommendation = "M"
-    confidence_score = 0.0
-    
-    print("[INFO] Virtual Try-On started! Press 'q' to quit.")
-    
-    try:
-        while True:
-            success, img = cap.read()
-            if not success:
-                print("[ERROR] Could not read frame from camera")
-                break
-            
-            img = detector.findPose(img, draw=False)
-            lmList, _ = detector.findPosition(img, bboxWithHands=False, draw=False)
-            
-            # Calculate confidence score
-            confidence_score = calculate_confidence_score(lmList, 0)
-            
-            if lmList and selected_shirt:
-                try:
-                    # Shoulder and hip landmarks
-                    lm11, lm12 = lmList[11], lmList[12]
-                    lm23, lm24 = lmList[23], lmList[24]
-                    
-                    shoulderDist = math.hypot(lm12[0]-lm11[0], lm12[1]-lm11[1])
-                    
-                    # Update confidence score with shoulder distance
-                    confidence_score = calculate_confidence_score(lmList, shoulderDist)
-                    
-                    # Calculate size recommendation
-                    size_recommendation = calculate_size_recommendation(shoulderDist)
-                    
-                    if shoulderDist < 50:
-                        # Draw info panel even when pose is not good enough for overlay
-                        img = draw_info_panel(img, size_recommendation, confidence_score, gender, shirt_index)
-                        cv2.imshow("Virtual Try-On", img)
-                        if cv2.waitKey(1) & 0xFF == ord('q'):
-                            break
-                        continue
-                    
-                    # Shirt size
-                    w = int(shoulderDist * 1.6)
-                    h = int(w * shirtRatio)
-                    
-                    # Midpoint for overlay
-                    cx = (lm11[0]+lm12[0])//2
-                    cy = (lm11[1]+lm12[1])//2
-                    torso_y = (lm23[1]+lm24[1])//2
-                    cy_torso = (cy+torso_y)//2
-                    
-                    # Smooth overlay
-                    cx = int(prev_cx + (cx-prev_cx)*smoothing)
-                    cy_torso = int(prev_cy + (cy_torso-prev_cy)*smoothing)
-                    w = int(prev_w + (w-prev_w)*smoothing)
-                    h = int(prev_h + (h-prev_h)*smoothing)
-                    prev_cx, prev_cy, prev_w, prev_h = cx, cy_torso, w, h
-                    
-                    # Load and overlay shirt
-                    path = os.path.join("static", selected_shirt)
-                    if os.path.exists(path):
-                        imgShirt = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-                        if imgShirt is not None:
-                            imgShirt = cv2.resize(imgShirt, (w, h))
-                            imgShirt = cv2.flip(imgShirt, 1)
-                            
-                            dx = lm12[0] - lm11[0]
-                            dy = lm12[1] - lm11[1]
-                            angle = math.degrees(math.atan2(dy, dx))
-                            
-                            if dx < 0:
-                                angle += 180
-                            
-                            M = cv2.getRotationMatrix2D((w//2, h//2), angle, 1)
-                            imgShirt = cv2.warpAffine(imgShirt, M, (w, h), borderMode=cv2.BORDER_TRANSPARENT)
-                            
-                            x = max(cx - w//2, 0)
-                            y = max(cy_torso - h//2, 0)
-                            img = cvzone.overlayPNG(img, imgShirt, [x, y])
-                
-                except Exception as e:
-                    print(f"[WARN] Shirt overlay skipped: {{e}}")
-            
-            # Always draw the info panel
-            img = draw_info_panel(img, size_recommendation, confidence_score, gender, shirt_index)
-            
-            cv2.imshow("Virtual Try-On", img)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-    
-    except KeyboardInterrupt:
-        print("\\n[INFO] Interrupted by user")
-    except Exception as e:
-        print(f"[ERROR] Unexpected error: {{e}}")
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
-        print("[INFO] Virtual Try-On stopped.")
-    
-    return 0
-
-if __name__ == "__main__":
-    sys.exit(main())
-'''
-    
-    # Write the script
-    script_path = os.path.join(os.path.dirname(__file__), 'temp_tryon_service.py')
-    with open(script_path, 'w') as f:
-        f.write(script_content)
+        logger.warning(f"Try-on worker {pid} is unhealthy ({reason}), restarting it")
+        service_metrics.count('trylia_worker_restarts_total')
+        tryon_sessions.submit(gender, shirt_index, lambda session: start_tryon_service(session, self),
+                              restarts=restarts + 1, store=self.registry)
     
-    return script_path
+    def stop(self):
+        self.watchdog.stop()
+        if self.spare:
+            self.spare.stop()
 
-def start_tryon_service(gender, shirt_index):
+def start_tryon_service(session, supervisor, trace_parent=None):
     """
-    Start the try-on service with the selected shirt.
+    Start the try-on worker for a session. Runs on the session executor and
+    records each step on the session. The new worker is spawned (or taken
+    from the warm spare) before the previous one is stopped, so its
+    interpreter start and imports overlap the stop; it waits on stdin until
+    the camera has been probed and only then opens it.
     """
-    global current_process
-    
+    span = tracer.start_span('tryon.session_start', parent=trace_parent,
+                             attributes={'tryon.session_id': session.id, 'tryon.restarts': session.restarts})
+    token = tracer.activate(span)
+    process = None
     try:
-        # Stop any existing process
-        stop_current_process()
+        tryon_sessions.advance(session, 'preparing')
         
-        # Test camera access first
-        camera_ok, camera_msg = test_camera_access()
-        if not camera_ok:
-            logger.error(f"Camera test failed: {camera_msg}")
-            return False, camera_msg
+        # A new worker continues the request's trace
+        def spawn():
+            with service_metrics.operation('worker_spawn'), tracer.span('worker_spawn') as spawn_span:
+                process = supervisor.take_or_spawn(session.gender, session.shirt_index, tracer.child_env())
+                spawn_span.set_attribute('process.pid', process.pid)
+            tryon_sessions.attach(session, process.pid)
+            return process
         
-        logger.info(f"Camera test passed: {camera_msg}")
+        with tracer.span('replace_previous'):
+            process = supervisor.registry.replace(spawn)
         
-        # Create the try-on script with arguments
-        script_path = create_tryon_script_with_args(gender, shirt_index)
-        
-        # Start the new process
-        with process_lock:
-            current_process = subprocess.Popen([
-                sys.executable, script_path
-            ], 
-            cwd=os.path.dirname(__file__),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-            )
-            
-        logger.info(f"Started try-on service for {gender} shirt {shirt_index} (PID: {current_process.pid})")
+        logger.info(f"Started try-on service for {session.gender} shirt {session.shirt_index} (PID: {process.pid})")
+        status_broadcaster.publish('starting', pid=process.pid, gender=session.gender,
+                                   shirtIndex=session.shirt_index, sessionId=session.id)
         
         # Start a thread to monitor the process output
-        monitor_thread = threading.Thread(target=monitor_process_output, daemon=True)
+        monitor_thread = threading.Thread(target=monitor_process_output, args=(process, supervisor), daemon=True)
         monitor_thread.start()
         
-        return True, f"Try-on service started successfully"
+        # Test camera access now that the previous worker has released it
+        if tryon_sessions.advance(session, 'probing_camera'):
+            camera_ok, camera_msg = test_camera_access()
+            if not camera_ok:
+                logger.error(f"Camera test failed: {camera_msg}")
+                tryon_sessions.advance(session, 'failed', error=camera_msg)
+                span.set_error(camera_msg)
+            else:
+                logger.info(f"Camera test passed: {camera_msg}")
+                with tracer.span('reserve_cpus'):
+                    cpus_ok, cpus_msg = supervisor.reserve_cpus(process)
+                if not cpus_ok:
+                    logger.error(f"No CPUs for the try-on worker: {cpus_msg}")
+                    tryon_sessions.advance(session, 'failed', error=cpus_msg)
+                    span.set_error(cpus_msg)
         
+        if not tryon_sessions.advance(session, 'starting'):
+            # Failed, or stopped while starting
+            stop_process(process)
+            return
+        cpus = f' {format_cpu_list(process.cpu_slot.cpus)}' if process.cpu_slot else ''
+        process.stdin.write(f'start {session.gender} {session.shirt_index}{cpus}\n')
+        process.stdin.close()
+        supervisor.released(process)
     except Exception as e:
         logger.error(f"Failed to start try-on service: {e}")
-        return False, f"Failed to start try-on service: {str(e)}"
+        if process is not None:
+            stop_process(process)
+        tryon_sessions.advance(session, 'failed', error=f"Failed to start try-on service: {str(e)}")
+        span.set_error(repr(e))
+    finally:
+        tracer.deactivate(token)
+        span.end()
 
-def monitor_process_output():
+def monitor_process_output(process, supervisor=None):
     """
     Monitor the output of the try-on process for debugging.
+    Metrics lines are collected into tryon_metrics and session events are
+    published to status_broadcaster instead of being logged. The process
+    is reaped once its output ends, and its exit is published as stopped
+    or crashed.
     """
-    global current_process
-    
-    if current_process is None:
-        return
+    # stderr gets its own reader so a quiet stream never blocks the other
+    if process.stderr:
+        threading.Thread(target=relay_process_errors, args=(process,), daemon=True).start()
     
+    error = None
     try:
-        # Read stdout and stderr
-        while current_process.poll() is None:
-            if current_process.stdout:
-                line = current_process.stdout.readline()
-                if line:
-                    logger.info(f"TryOn Process: {line.strip()}")
-            
-            if current_process.stderr:
-                line = current_process.stderr.readline()
-                if line:
-                    logger.error(f"TryOn Process Error: {line.strip()}")
-            
-            time.sleep(0.1)
+        for line in process.stdout:
+            line = line.strip()
+            snapshot = parse_metrics_line(line)
+            if snapshot is not None:
+                tryon_metrics.update(process.pid, snapshot)
+                continue
+            event = parse_event_line(line)
+            if event is not None:
+                name, data = event
+                if name == 'error':
+                    error = data.get('error')
+                status_broadcaster.publish(name, pid=process.pid, **data)
+            elif line:
+                logger.info(f"TryOn Process: {line}")
     except Exception as e:
         logger.error(f"Error monitoring process output: {e}")
+    finally:
+        tryon_metrics.retire(process.pid)
+        returncode = process.wait()
+        if supervisor is not None:
+            supervisor.exited(process)
+        # A worker we stopped exited as asked; one stopped by another API
+        # worker gets SIGTERM
+        if getattr(process, 'stop_requested', False) or (error is None and returncode in (0, -signal.SIGTERM)):
+            status_broadcaster.publish('stopped', pid=process.pid, returncode=returncode)
+        else:
+            status_broadcaster.publish('crashed', pid=process.pid, returncode=returncode,
+                                       error=error or f"Exited with status {returncode}")
+
+def relay_process_errors(process):
+    """
+    Log the stderr output of the try-on process.
+    """
+    try:
+        for line in process.stderr:
+            if line.strip():
+                logger.error(f"TryOn Process Error: {line.strip()}")
+    except Exception as e:
+        logger.error(f"Error monitoring process errors: {e}")
 
 def stop_current_process():
     """
-    Stop the current try-on process if it's running.
-    """
-    global current_process
-    
-    with process_lock:
-        if current_process and current_process.poll() is None:
-            try:
-                logger.info(f"Stopping try-on process (PID: {current_process.pid})")
-                # Try graceful termination first
-                current_process.terminate()
-                current_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                # Force kill if graceful termination fails
-                logger.warning("Graceful termination failed, force killing process")
-                current_process.kill()
-                current_process.wait()
-            except Exception as e:
-                logger.error(f"Error stopping process: {e}")
-            finally:
-                current_process = None
-                logger.info("Try-on process stopped")
-
-@app.route('/api/try-on', methods=['POST'])
+    Stop the current try-on process if it's running, whichever API worker
+    started it.
+    """
+    process_registry().stop()
+
+@api.route('/api/try-on', methods=['POST'])
 def try_on():
     """
     API endpoint to start virtual try-on for a specific shirt.
+    Returns 202 with a session ID at once; the worker is started in the
+    background and GET /api/try-on/<sessionId> reports its progress.
     """
     try:
         data = request.get_json()
@@ -484,21 +405,23 @@ def try_on():
                 'message': str(e)
             }), 400
         
-        # Start the try-on service
-        success, message = start_tryon_service(gender, shirt_index)
+        # Start the try-on service in the background
+        supervisor, trace_parent = current_app.extensions['tryon_supervisor'], g.get('trace_span')
+        session = tryon_sessions.submit(
+            gender, shirt_index, lambda session: start_tryon_service(session, supervisor, trace_parent),
+            store=supervisor.registry
+        )
+        status_url = f"/api/try-on/{session.id}"
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': message,
-                'gender': gender,
-                'shirtIndex': shirt_index
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': message
-            }), 500
+        return jsonify({
+            'success': True,
+            'message': 'Try-on service is starting',
+            'sessionId': session.id,
+            'state': session.state,
+            'statusUrl': status_url,
+            'gender': gender,
+            'shirtIndex': shirt_index
+        }), 202, {'Location': status_url}
             
     except Exception as e:
         logger.error(f"API error: {e}")
@@ -507,13 +430,30 @@ def try_on():
             'message': f'Server error: {str(e)}'
         }), 500
 
-@app.route('/api/stop', methods=['POST'])
+@api.route('/api/try-on/<session_id>', methods=['GET'])
+def get_tryon_session(session_id):
+    """
+    API endpoint for the progress of a try-on session: its state and when
+    it entered each state. With the shared state backend any API process
+    can answer for a session another one accepted.
+    """
+    session = tryon_sessions.get(session_id) or process_registry().load_session(session_id)
+    if session is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown try-on session'
+        }), 404
+    
+    return jsonify(dict(session, success=True))
+
+@api.route('/api/stop', methods=['POST'])
 def stop_tryon():
     """
     API endpoint to stop the current virtual try-on session.
     """
     try:
         logger.info("Received stop request")
+        tryon_sessions.cancel()
         stop_current_process()
         return jsonify({
             'success': True,
@@ -526,24 +466,90 @@ def stop_tryon():
             'message': f'Error stopping try-on: {str(e)}'
         }), 500
 
-@app.route('/api/status', methods=['GET'])
+@api.route('/api/status', methods=['GET'])
 def get_status():
     """
     API endpoint to check if try-on service is running.
     """
-    global current_process
+    status = process_registry().status()
+    # Only workers started by this API process have a heartbeat here
+    heartbeat = current_app.extensions['tryon_supervisor'].watchdog.status(status['pid'])
+    
+    return jsonify({
+        'isRunning': status['isRunning'],
+        'pid': status['pid'],
+        'heartbeat': heartbeat,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@api.route('/api/status/stream', methods=['GET'])
+def stream_status():
+    """
+    Server-Sent Events stream of the try-on session. The first event,
+    status, has the current state; after it come the lifecycle events
+    (starting, camera_ready, model_loaded, first_frame, stopped, crashed)
+    and live readings (fps, size recommendation, confidence) as the
+    worker reports them. Only sessions started by this API process are
+    reported.
+    """
+    subscription = status_broadcaster.subscribe()
+    status = dict(process_registry().status(), session=status_broadcaster.session())
+    
+    def generate():
+        try:
+            yield f"retry: 3000\nevent: status\ndata: {json.dumps(status, separators=(',', ':'))}\n\n"
+            while not subscription.closed:
+                events = subscription.get(timeout=STATUS_STREAM_KEEPALIVE)
+                if not events:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                for event in events:
+                    yield format_sse(event)
+        finally:
+            subscription.close()
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/api/tryon/metrics', methods=['GET'])
+def get_tryon_metrics():
+    """
+    API endpoint for try-on frame metrics: per-stage timing histograms,
+    dropped frames and end-to-end frame age. Returns Prometheus text with
+    ?format=prometheus or an Accept header preferring text/plain.
+    """
+    output_format = request.args.get('format')
+    if output_format is None:
+        accept = request.headers.get('Accept', '')
+        wants_text = 'text/plain' in accept or 'openmetrics' in accept
+        output_format = 'prometheus' if wants_text and 'application/json' not in accept else 'json'
     
-    with process_lock:
-        is_running = current_process is not None and current_process.poll() is None
-        pid = current_process.pid if current_process else None
+    if output_format == 'prometheus':
+        return Response(tryon_metrics.to_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
     
     return jsonify({
-        'isRunning': is_running,
-        'pid': pid,
+        'success': True,
+        'metrics': tryon_metrics.to_json(),
         'timestamp': datetime.now().isoformat()
     })
 
-@app.route('/api/test-camera', methods=['GET'])
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: request latency by route and status,
+    requests in flight, internal operation timings and try-on frame metrics.
+    Values are for this API process only.
+    """
+    body = service_metrics.to_prometheus() + tryon_metrics.to_prometheus()
+    body += '\n'.join(render_counter('trylia_log_records_dropped_total',
+                                      'Log records dropped because the log queue was full',
+                                      async_logging.stats()['dropped'])) + '\n'
+    body += '\n'.join(render_counter('trylia_spans_dropped_total',
+                                      'Trace spans dropped because the trace queue was full or the write failed',
+                                      getattr(tracer.exporter, 'dropped', 0))) + '\n'
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api.route('/api/test-camera', methods=['GET'])
 def test_camera():
     """
     API endpoint to test camera access.
@@ -560,38 +566,70 @@ def test_camera():
             'message': f'Camera test error: {str(e)}'
         }), 500
 
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint.
+    Reports 'degraded' while the SMTP circuit breaker is open.
     """
+    email_stats = email_service.get_stats()
+    email_stats['queue'] = email_queue.stats()
+    breaker_open = email_stats['circuitBreaker']['state'] != 'closed'
+    
     return jsonify({
-        'status': 'healthy',
+        'status': 'degraded' if breaker_open else 'healthy',
         'message': 'Virtual Try-On API Server is running',
+        'email': email_stats,
+        'contactAdmission': contact_admission.stats(),
+        'logging': async_logging.stats(),
         'timestamp': datetime.now().isoformat()
     })
 
-@app.route('/api/contact', methods=['POST'])
+@api.route('/api/contact', methods=['POST'])
 def contact_form():
     """
     API endpoint to handle contact form submissions.
+    Repeats of a recent submission get the original tracking ID back, and
+    senders over the per-IP or per-email rate get 429, before any validation
+    or email work is done.
     """
+    decision = None
     try:
         # Get form data
-        form_data = request.get_json()
+        form_data = request.get_json(silent=True)
         
-        if not form_data:
+        if not form_data or not isinstance(form_data, dict):
             return jsonify({
                 'success': False,
                 'message': 'No form data provided'
             }), 400
         
+        decision = contact_admission.check(request.remote_addr, form_data)
+        if decision.status == 'duplicate':
+            logger.info(f"Duplicate contact form submission from {form_data.get('companyName', 'Unknown')}")
+            return jsonify({
+                'success': True,
+                'message': 'Thank you for your inquiry! We have already received it.',
+                'trackingId': decision.tracking_id,
+                'duplicate': True
+            }), 200
+        if decision.status == 'rate_limited':
+            logger.warning(f"Rate limited contact form submission from {request.remote_addr}")
+            response = jsonify({
+                'success': False,
+                'message': 'Too many submissions. Please try again later.'
+            })
+            response.headers['Retry-After'] = str(max(1, int(decision.retry_after + 0.999)))
+            return response, 429
+        
         logger.info(f"Received contact form submission from {form_data.get('companyName', 'Unknown')}")
         
         # Validate form data
-        is_valid, errors, validated_data = ContactFormValidator.validate_contact_form(form_data)
+        with service_metrics.operation('validation'):
+            is_valid, errors, validated_data = ContactFormValidator.validate_contact_form(form_data)
         
         if not is_valid:
+            contact_admission.rejected(decision)
             logger.warning(f"Contact form validation failed: {errors}")
             return jsonify({
                 'success': False,
@@ -599,23 +637,29 @@ def contact_form():
                 'errors': errors
             }), 400
         
-        # Send email notification (optional - don't fail if email fails)
-        email_sent, email_message = email_service.send_contact_email(validated_data)
+        # Queue the notification and confirmation emails; delivery happens in
+        # the background and is reported by /api/contact/status/<trackingId>
+        try:
+            tracking_id = email_queue.submit(validated_data)
+        except queue.Full:
+            contact_admission.rejected(decision)
+            logger.error("Email queue is full, rejecting contact form submission")
+            return jsonify({
+                'success': False,
+                'message': 'We are receiving a high volume of inquiries. Please try again in a few minutes.'
+            }), 503
         
-        if not email_sent:
-            logger.warning(f"Email sending failed: {email_message}")
-            # Don't fail the entire request if email fails
-            # Just log the issue and continue
+        contact_admission.accepted(decision, tracking_id)
         
-        # Send confirmation email to customer (optional, don't fail if this fails)
-        confirmation_sent, confirmation_message = email_service.send_confirmation_email(validated_data)
-        if not confirmation_sent:
-            logger.warning(f"Failed to send confirmation email: {confirmation_message}")
+        try:
+            submission_store.add(validated_data, tracking_id=tracking_id)
+        except Exception as e:
+            logger.error(f"Failed to store contact form submission {tracking_id}: {e}")
         
-        logger.info(f"Contact form processed successfully for {validated_data.get('companyName')}")
+        logger.info(f"Contact form processed successfully for {validated_data.get('companyName')} (tracking ID: {tracking_id})")
         
         # Determine success message based on email status
-        if email_sent:
+        if email_service.enabled:
             message = 'Thank you for your inquiry! We will get back to you within 24 hours.'
         else:
             message = 'Thank you for your inquiry! Your form has been submitted successfully. (Email notification temporarily unavailable)'
@@ -623,32 +667,263 @@ def contact_form():
         return jsonify({
             'success': True,
             'message': message,
-            'emailSent': email_sent,
-            'confirmationSent': confirmation_sent
-        })
+            'trackingId': tracking_id,
+            'emailQueued': email_service.enabled
+        }), 202
         
     except Exception as e:
+        if decision is not None and decision.admitted:
+            contact_admission.rejected(decision)
         logger.error(f"Contact form API error: {e}")
         return jsonify({
             'success': False,
             'message': 'An unexpected error occurred. Please try again later.'
         }), 500
 
-@app.route('/api/contact/options', methods=['GET'])
+@api.route('/api/contact/status/<tracking_id>', methods=['GET'])
+def contact_status(tracking_id):
+    """
+    API endpoint to check email delivery for a contact form submission.
+    """
+    status = email_queue.get_status(tracking_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown tracking ID'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'submission': status
+    })
+
+def submissions_access_allowed():
+    """
+    Submission history contains personal data. Require CONTACT_ADMIN_TOKEN
+    as a bearer token when it is set, otherwise only allow local requests.
+    """
+    token = os.getenv('CONTACT_ADMIN_TOKEN')
+    if token:
+        # Constant-time, so the token cannot be guessed from response timings
+        supplied = request.headers.get('Authorization', '').encode('utf-8')
+        return hmac.compare_digest(supplied, f'Bearer {token}'.encode('utf-8'))
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+def submission_filters():
+    return {key: request.args.get(key) for key in ('email', 'country', 'inquiryType', 'since', 'until')}
+
+@api.route('/api/contact/submissions', methods=['GET'])
+def list_submissions():
+    """
+    API endpoint to page through stored contact submissions, newest first.
+    Filters: email, country, inquiryType, since, until (ISO timestamps).
+    Pass nextCursor from the previous page as ?cursor= for the next one.
+    """
+    if not submissions_access_allowed():
+        return jsonify({
+            'success': False,
+            'message': 'Not authorized'
+        }), 403
+    
+    try:
+        page = submission_store.query(
+            submission_filters(),
+            limit=request.args.get('limit', 50),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid limit or cursor'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'submissions': page['submissions'],
+        'nextCursor': page['nextCursor']
+    })
+
+@api.route('/api/contact/submissions/search', methods=['GET'])
+def search_submissions():
+    """
+    API endpoint to search stored contact submissions, newest first.
+    ?q= words that must all appear in the message or company name, plus
+    optional country, inquiryType, companySize, meetingMode, since and until.
+    Pass nextCursor from the previous page as ?cursor= for the next one.
+    """
+    if not submissions_access_allowed():
+        return jsonify({
+            'success': False,
+            'message': 'Not authorized'
+        }), 403
+    
+    facets = {key: request.args.get(key) for key in ('country', 'inquiryType', 'companySize', 'meetingMode')}
+    try:
+        page = submission_store.search(
+            request.args.get('q'),
+            facets,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            limit=request.args.get('limit', 20),
+            cursor=request.args.get('cursor')
+        )
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid limit or cursor'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'total': page['total'],
+        'submissions': page['submissions'],
+        'nextCursor': page['nextCursor'],
+        'tookMs': page['tookMs']
+    })
+
+@api.route('/api/contact/submissions/export', methods=['GET'])
+def export_submissions():
+    """
+    API endpoint to stream stored contact submissions as CSV or NDJSON
+    (?format=csv|ndjson), oldest first. Accepts the same filters as
+    /api/contact/submissions.
+    """
+    if not submissions_access_allowed():
+        return jsonify({
+            'success': False,
+            'message': 'Not authorized'
+        }), 403
+    
+    output_format = request.args.get('format', 'ndjson')
+    rows = submission_store.iter_submissions(submission_filters())
+    if output_format == 'csv':
+        body, content_type = iter_csv(rows), 'text/csv; charset=utf-8'
+    elif output_format == 'ndjson':
+        body, content_type = iter_ndjson(rows), 'application/x-ndjson'
+    else:
+        return jsonify({
+            'success': False,
+            'message': 'Unsupported export format'
+        }), 400
+    
+    filename = f"contact_submissions.{output_format}"
+    return Response(body, content_type=content_type,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def batch_result_line(result):
+    return json.dumps(result, separators=(',', ':')) + '\n'
+
+def queue_batch_records(pending, totals):
+    """
+    Hand a chunk of validated batch records to email delivery and the
+    submission store in bulk, yielding one result line per record.
+    """
+    if not pending:
+        return
+    tracking_ids = email_queue.submit_many([data for _, data in pending])
+    accepted = [(data, tracking_id) for (_, data), tracking_id in zip(pending, tracking_ids) if tracking_id]
+    try:
+        submission_store.add_many(accepted)
+    except Exception as e:
+        logger.error(f"Failed to store {len(accepted)} batch contact submissions: {e}")
+    
+    for (number, _), tracking_id in zip(pending, tracking_ids):
+        if tracking_id:
+            totals['accepted'] += 1
+            yield batch_result_line({'record': number, 'success': True, 'trackingId': tracking_id})
+        else:
+            totals['rejected'] += 1
+            yield batch_result_line({'record': number, 'success': False, 'message': 'Email queue is full'})
+
+@api.route('/api/contact/batch', methods=['POST'])
+def contact_batch():
+    """
+    API endpoint for bulk lead import. Accepts an NDJSON or CSV body
+    (Content-Type application/x-ndjson or text/csv) and streams back one
+    NDJSON result line per record, followed by a summary line.
+    """
+    if not submissions_access_allowed():
+        return jsonify({
+            'success': False,
+            'message': 'Not authorized'
+        }), 403
+    
+    record_format = batch_format(request.content_type)
+    if record_format is None:
+        return jsonify({
+            'success': False,
+            'message': 'Send the batch as application/x-ndjson or text/csv'
+        }), 415
+    
+    max_bytes = int(os.getenv('CONTACT_BATCH_MAX_BYTES', str(5 * 1024 * 1024)))
+    max_records = int(os.getenv('CONTACT_BATCH_MAX_RECORDS', '1000'))
+    chunk_size = int(os.getenv('CONTACT_BATCH_CHUNK_SIZE', '100'))
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({
+            'success': False,
+            'message': f'Batch body exceeds {max_bytes} bytes'
+        }), 413
+    
+    def generate():
+        started = time.monotonic()
+        totals = {'records': 0, 'accepted': 0, 'rejected': 0}
+        pending = []
+        limit_error = None
+        
+        try:
+            for number, form_data, error in iter_batch_records(request.stream, record_format, max_bytes, max_records):
+                totals['records'] += 1
+                if error is None:
+                    with service_metrics.operation('validation'):
+                        is_valid, errors, validated_data = ContactFormValidator.validate_contact_form(form_data)
+                    if is_valid:
+                        pending.append((number, validated_data))
+                        if len(pending) >= chunk_size:
+                            yield from queue_batch_records(pending, totals)
+                            pending = []
+                        continue
+                    result = {'record': number, 'success': False, 'errors': errors}
+                else:
+                    result = {'record': number, 'success': False, 'message': error}
+                totals['rejected'] += 1
+                yield batch_result_line(result)
+        except BatchLimitExceeded as e:
+            limit_error = str(e)
+        
+        yield from queue_batch_records(pending, totals)
+        
+        elapsed = time.monotonic() - started
+        summary = dict(totals,
+                       elapsedSeconds=round(elapsed, 3),
+                       recordsPerSecond=round(totals['records'] / elapsed, 1) if elapsed > 0 else 0.0)
+        if limit_error:
+            summary['error'] = limit_error
+        logger.info(f"Contact batch: {totals['accepted']}/{totals['records']} records accepted "
+                    f"({summary['recordsPerSecond']} records/s){' - ' + limit_error if limit_error else ''}")
+        yield batch_result_line({'summary': summary})
+    
+    return Response(stream_with_context(generate()), content_type='application/x-ndjson')
+
+# The dropdown options never change while the server runs, so the response
+# is serialized and compressed once
+CONTACT_OPTIONS_RESPONSE = PrecomputedResponse({
+    'success': True,
+    'options': {
+        'companySizes': ContactFormValidator.COMPANY_SIZES,
+        'inquiryTypes': ContactFormValidator.INQUIRY_TYPES,
+        'meetingModes': ContactFormValidator.MEETING_MODES,
+        'countries': ContactFormValidator.COUNTRIES
+    }
+}, codec=load_json_codec())
+
+@api.route('/api/contact/options', methods=['GET'])
 def get_contact_options():
     """
     API endpoint to get dropdown options for the contact form.
+    Served with an ETag; revalidation with If-None-Match gets 304.
     """
     try:
-        return jsonify({
-            'success': True,
-            'options': {
-                'companySizes': ContactFormValidator.COMPANY_SIZES,
-                'inquiryTypes': ContactFormValidator.INQUIRY_TYPES,
-                'meetingModes': ContactFormValidator.MEETING_MODES,
-                'countries': ContactFormValidator.COUNTRIES
-            }
-        })
+        return CONTACT_OPTIONS_RESPONSE.serve(request)
     except Exception as e:
         logger.error(f"Error getting contact options: {e}")
         return jsonify({
@@ -656,48 +931,140 @@ def get_contact_options():
             'message': 'Failed to load form options'
         }), 500
 
-# Cleanup on exit
-def cleanup():
+def init_request_metrics(app):
     """
-    Cleanup function to stop any running processes.
+    Record each request's latency by method, route and status, and the
+    number of requests in flight. Timing ends in teardown, so streamed
+    responses are measured until the last chunk is sent.
     """
-    logger.info("Cleaning up...")
-    stop_current_process()
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_started = time.perf_counter()
+        service_metrics.request_started(request.method, g.metrics_route)
     
-    # Clean up temporary files
-    temp_script = os.path.join(os.path.dirname(__file__), 'temp_tryon_service.py')
-    if os.path.exists(temp_script):
-        try:
-            os.remove(temp_script)
-            logger.info("Removed temporary script")
-        except Exception as e:
-            logger.error(f"Error removing temporary script: {e}")
+    @app.after_request
+    def record_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+    
+    @app.teardown_request
+    def finish_request_metrics(error=None):
+        if 'metrics_started' not in g:
+            return
+        elapsed_ms = (time.perf_counter() - g.metrics_started) * 1000.0
+        service_metrics.request_finished(request.method, g.metrics_route, g.get('metrics_status', 500), elapsed_ms)
 
-def signal_handler(sig, frame):
+def init_request_tracing(app):
     """
-    Handle shutdown signals.
+    Run each request in a server span, continuing the caller's trace when
+    it sent a traceparent header. The trace ID is returned as X-Trace-ID.
     """
-    logger.info("Received shutdown signal")
-    cleanup()
-    sys.exit(0)
+    @app.before_request
+    def start_request_span():
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        span = tracer.start_span(
+            f"{request.method} {route}",
+            parent=parse_traceparent(request.headers.get('traceparent')) or False,
+            kind='server',
+            attributes={'http.method': request.method, 'http.route': route,
+                        'http.request_id': g.get('request_id', '')}
+        )
+        g.trace_span = span
+        g.trace_token = tracer.activate(span)
+    
+    @app.after_request
+    def add_trace_header(response):
+        if 'trace_span' in g:
+            response.headers['X-Trace-ID'] = g.trace_span.trace_id
+            g.trace_span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                g.trace_span.set_error(f"HTTP {response.status_code}")
+        return response
+    
+    @app.teardown_request
+    def end_request_span(error=None):
+        span = g.pop('trace_span', None)
+        if span is None:
+            return
+        if error is not None:
+            span.set_error(repr(error))
+        try:
+            tracer.deactivate(g.pop('trace_token'))
+        except ValueError:
+            # Streamed responses finish in a different context
+            pass
+        span.end()
 
-# Register signal handlers
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+def create_app(config=None):
+    """
+    Build the API application.
+    config overrides the environment:
+      STATE_BACKEND - 'memory' for a single API process, 'sqlite' to share
+                      the try-on session between worker processes
+                      (TRYON_STATE_BACKEND, default 'memory')
+      STATE_PATH    - SQLite file for the shared backend
+                      (TRYON_STATE_PATH, default 'tryon_state.db')
+    Shutdown work is registered on app.extensions['lifecycle'].
+    """
+    app = Flask(__name__)
+    app.config.update(
+        STATE_BACKEND=os.getenv('TRYON_STATE_BACKEND', 'memory'),
+        STATE_PATH=os.getenv('TRYON_STATE_PATH', 'tryon_state.db')
+    )
+    app.config.update(config or {})
+    app.json = CodecJSONProvider(app)  # orjson for jsonify() when installed
+    CORS(app)  # Enable CORS for all routes
+    init_request_logging(app)  # X-Request-ID and one log line per request
+    init_request_metrics(app)  # latency histograms for /metrics
+    init_request_tracing(app)  # request spans in TRACE_FILE
+    app.register_blueprint(api)
+    
+    registry = create_process_registry(app.config['STATE_BACKEND'], app.config['STATE_PATH'])
+    app.extensions['tryon_processes'] = registry
+    supervisor = WorkerSupervisor(registry)
+    app.extensions['tryon_supervisor'] = supervisor
+    
+    # Hooks run in reverse order: session startups, watchdog and warm
+    # spare, try-on worker, status streams, email queue, SMTP pool
+    lifecycle = Lifecycle()
+    lifecycle.on_shutdown(email_service.pool.close_all)
+    lifecycle.on_shutdown(lambda: email_queue.stop(timeout=5))
+    lifecycle.on_shutdown(status_broadcaster.close_all)
+    lifecycle.on_shutdown(registry.stop_owned)
+    lifecycle.on_shutdown(supervisor.stop)
+    lifecycle.on_shutdown(tryon_sessions.shutdown)
+    app.extensions['lifecycle'] = lifecycle
+    
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
+    lifecycle = app.extensions['lifecycle']
+    lifecycle.install_signal_handlers()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # requests are logged by init_request_logging
+    
     logger.info("Starting Virtual Try-On API Server...")
     logger.info("Server will be available at: http://localhost:5000")
     logger.info("API endpoints:")
     logger.info("  POST /api/try-on - Start virtual try-on")
+    logger.info("  GET /api/try-on/<sessionId> - Try-on session progress")
     logger.info("  POST /api/stop - Stop virtual try-on")
     logger.info("  GET /api/status - Check service status")
+    logger.info("  GET /api/status/stream - Session events (Server-Sent Events)")
     logger.info("  GET /api/test-camera - Test camera access")
+    logger.info("  GET /api/tryon/metrics - Try-on frame metrics (JSON or Prometheus)")
     logger.info("  POST /api/contact - Submit contact form")
+    logger.info("  GET /api/contact/status/<trackingId> - Contact email delivery status")
+    logger.info("  POST /api/contact/batch - Bulk contact import (NDJSON or CSV)")
+    logger.info("  GET /api/contact/submissions - Page through stored submissions")
+    logger.info("  GET /api/contact/submissions/search - Search submissions by words and facets")
+    logger.info("  GET /api/contact/submissions/export - Export submissions (CSV or NDJSON)")
     logger.info("  GET /api/contact/options - Get form dropdown options")
+    logger.info("  GET /metrics - Prometheus metrics (request latency, operations, try-on frames)")
     logger.info("  GET /health - Health check")
     
     try:
         app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
     finally:
-        cleanup()
\ No newline at end of file
+        lifecycle.shutdown()
\ No newline at end of file
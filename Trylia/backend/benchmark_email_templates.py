@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Benchmark email rendering: precompiled templates vs the previous f-strings
+Reports messages/sec for rendering alone and for building the MIME message
+"""
+
+import time
+import argparse
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+from email_service import EmailService
+
+SAMPLE_FORM = {
+    'companyName': 'Acme Fashion <Outlet>',
+    'websiteUrl': 'https://acme.example.com',
+    'contactPerson': 'Jane Doe',
+    'businessEmail': 'jane@acme.example.com',
+    'phoneNumber': '+1 555 123 4567',
+    'companySize': '51-200 employees',
+    'inquiryType': 'Integration Request',
+    'message': 'We would like to add virtual try-on to our store.\nCan we schedule a call?',
+    'meetingMode': 'Google Meet',
+    'country': 'United States',
+    'meetingTime': '2025-01-15T10:30:00Z'
+}
+
+
+def legacy_contact_email(form_data):
+    """The f-string renderer used before templating.py, kept for comparison"""
+    
+    # Format meeting time if provided
+    meeting_time = form_data.get('meetingTime', '')
+    if meeting_time:
+        try:
+            # Parse ISO datetime string
+            dt = datetime.fromisoformat(meeting_time.replace('Z', '+00:00'))
+            meeting_time_formatted = dt.strftime('%B %d, %Y at %I:%M %p UTC')
+        except:
+            meeting_time_formatted = meeting_time
+    else:
+        meeting_time_formatted = 'Not specified'
+    
+    message_html = form_data.get('message', 'No message provided').replace('\n', '<br>')
+    
+    # Create HTML email template
+    html_template = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .header {{ background-color: #2c3e50; color: white; padding: 20px; text-align: center; }}
+            .content {{ padding: 20px; background-color: #f9f9f9; }}
+            .section {{ margin-bottom: 20px; padding: 15px; background-color: white; border-radius: 5px; }}
+            .label {{ font-weight: bold; color: #2c3e50; }}
+            .value {{ margin-left: 10px; }}
+            .footer {{ background-color: #34495e; color: white; padding: 15px; text-align: center; font-size: 12px; }}
+            .priority {{ background-color: #e74c3c; color: white; padding: 5px 10px; border-radius: 3px; display: inline-block; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>🎯 Trylia - New Business Inquiry</h1>
+            <p>Virtual Dressing Room Solutions for E-commerce</p>
+        </div>
+        
+        <div class="content">
+            <div class="section">
+                <h2>📋 Contact Information</h2>
+                <p><span class="label">Company Name:</span><span class="value">{form_data.get('companyName', 'N/A')}</span></p>
+                <p><span class="label">Website:</span><span class="value"><a href="{form_data.get('websiteUrl', '#')}">{form_data.get('websiteUrl', 'N/A')}</a></span></p>
+                <p><span class="label">Contact Person:</span><span class="value">{form_data.get('contactPerson', 'N/A')}</span></p>
+                <p><span class="label">Business Email:</span><span class="value"><a href="mailto:{form_data.get('businessEmail', '')}">{form_data.get('businessEmail', 'N/A')}</a></span></p>
+                <p><span class="label">Phone Number:</span><span class="value">{form_data.get('phoneNumber', 'N/A')}</span></p>
+                <p><span class="label">Country/Region:</span><span class="value">{form_data.get('country', 'N/A')}</span></p>
+            </div>
+            
+            <div class="section">
+                <h2>🏢 Company Details</h2>
+                <p><span class="label">Company Size:</span><span class="value">{form_data.get('companySize', 'N/A')}</span></p>
+                <p><span class="label">Inquiry Type:</span><span class="value"><span class="priority">{form_data.get('inquiryType', 'N/A')}</span></span></p>
+            </div>
+            
+            <div class="section">
+                <h2>💬 Message & Requirements</h2>
+                <div style="background-color: #ecf0f1; padding: 15px; border-radius: 5px; border-left: 4px solid #3498db;">
+                    {message_html}
+                </div>
+            </div>
+            
+            <div class="section">
+                <h2>📅 Meeting Preferences</h2>
+                <p><span class="label">Preferred Meeting Mode:</span><span class="value">{form_data.get('meetingMode', 'N/A')}</span></p>
+                <p><span class="label">Preferred Meeting Time:</span><span class="value">{meeting_time_formatted}</span></p>
+            </div>
+            
+            <div class="section">
+                <h2>⚡ Next Steps</h2>
+                <ul>
+                    <li>Response within 24 hours during business days</li>
+                    <li>Technical consultation if integration request</li>
+                    <li>Custom demo preparation if demo requested</li>
+                    <li>Pricing proposal if pricing inquiry</li>
+                </ul>
+            </div>
+        </div>
+        
+        <div class="footer">
+            <p><strong>Trylia - Virtual Dressing Room Solutions</strong></p>
+            <p>Revolutionizing E-commerce with AI-Powered Virtual Try-On Technology</p>
+            <p>Submitted on: {datetime.now().strftime('%B %d, %Y at %I:%M %p UTC')}</p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Create plain text version
+    text_template = f"""
+TRYLIA - NEW BUSINESS INQUIRY
+Virtual Dressing Room Solutions for E-commerce
+
+CONTACT INFORMATION:
+Company Name: {form_data.get('companyName', 'N/A')}
+Website: {form_data.get('websiteUrl', 'N/A')}
+Contact Person: {form_data.get('contactPerson', 'N/A')}
+Business Email: {form_data.get('businessEmail', 'N/A')}
+Phone Number: {form_data.get('phoneNumber', 'N/A')}
+Country/Region: {form_data.get('country', 'N/A')}
+
+COMPANY DETAILS:
+Company Size: {form_data.get('companySize', 'N/A')}
+Inquiry Type: {form_data.get('inquiryType', 'N/A')}
+
+MESSAGE & REQUIREMENTS:
+{form_data.get('message', 'No message provided')}
+
+MEETING PREFERENCES:
+Preferred Meeting Mode: {form_data.get('meetingMode', 'N/A')}
+Preferred Meeting Time: {meeting_time_formatted}
+
+NEXT STEPS:
+- Response within 24 hours during business days
+- Technical consultation if integration request
+- Custom demo preparation if demo requested
+- Pricing proposal if pricing inquiry
+
+Submitted on: {datetime.now().strftime('%B %d, %Y at %I:%M %p UTC')}
+    """
+    
+    return html_template, text_template
+
+
+def legacy_message(form_data):
+    html_content, text_content = legacy_contact_email(form_data)
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = f"🎯 Trylia Business Inquiry - {form_data.get('inquiryType', 'General')} from {form_data.get('companyName', 'Unknown Company')}"
+    msg['From'] = 'noreply@example.com'
+    msg['To'] = 'sales@example.com'
+    msg['Reply-To'] = form_data['businessEmail']
+    msg.attach(MIMEText(text_content, 'plain'))
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg
+
+
+def measure(func, count):
+    func()
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark contact email rendering")
+    parser.add_argument('--count', type=int, default=5000, help="Messages per measurement")
+    args = parser.parse_args()
+
+    service = EmailService()
+    service.from_email, service.to_email = 'noreply@example.com', 'sales@example.com'
+
+    def compiled_message():
+        html_content, text_content = service.create_contact_email_template(SAMPLE_FORM)
+        return service.contact_skeleton.build(
+            html_content, text_content,
+            Subject=f"🎯 Trylia Business Inquiry - {SAMPLE_FORM['inquiryType']} from {SAMPLE_FORM['companyName']}",
+            Reply_To=SAMPLE_FORM['businessEmail']
+        )
+
+    cases = [
+        ('render (f-strings)', lambda: legacy_contact_email(SAMPLE_FORM)),
+        ('render (compiled)', lambda: service.create_contact_email_template(SAMPLE_FORM)),
+        ('render + MIME (f-strings)', lambda: legacy_message(SAMPLE_FORM).as_bytes()),
+        ('render + MIME (compiled)', lambda: compiled_message().data),
+    ]
+
+    print(f"📊 Contact email rendering, {args.count} messages per case")
+    print("=" * 50)
+    for name, func in cases:
+        print(f"{name:<28} {measure(func, args.count):>10.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
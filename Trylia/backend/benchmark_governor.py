@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark try-on workers with and without the resource governor
+Records a landmark trace of synthetic frames, then runs 1, 2, 4 and 8
+concurrent headless workers replaying it at full speed, the way the API
+server starts them (waiting on stdin for their start command). Without the
+governor every session starts at once with default thread pools; with it,
+sessions wait for a CPU slot and run pinned with pools sized to the slot.
+Reports aggregate frames per second over all sessions.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from calibration import make_synthetic_frame
+from landmark_trace import TraceRecorder
+from resource_governor import ResourceGovernor, format_cpu_list
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_landmarks(index, width, height):
+    sway = int(20 * ((index % 60) / 30 - 1))
+    landmarks = [[0, 0, 0] for _ in range(33)]
+    landmarks[11] = [width // 2 - width // 8 + sway, height // 3, -5]
+    landmarks[12] = [width // 2 + width // 8 + sway, height // 3, -5]
+    landmarks[23] = [width // 2 - width // 12, height * 2 // 3, 0]
+    landmarks[24] = [width // 2 + width // 12, height * 2 // 3, 0]
+    return landmarks
+
+
+def record_trace(path, frames, width, height):
+    with TraceRecorder(path, (width, height), thumbnail_width=width) as recorder:
+        for i in range(frames):
+            recorder.record(make_landmarks(i, width, height), timestamp=i / 30.0,
+                            frame=make_synthetic_frame(i, width, height))
+
+
+def run_session(trace, env, cpus, results):
+    process = subprocess.Popen(
+        [sys.executable, 'tryon_service.py', '--worker', '--headless', '--source', f'trace:{trace}'],
+        cwd=HERE, env=env, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    process.stdin.write(f"start male 1{' ' + format_cpu_list(cpus) if cpus else ''}\n")
+    process.stdin.close()
+    stderr = process.stderr.read()
+    results.append((process.wait(), stderr))
+
+
+def run(sessions, trace, frames, governor):
+    env = dict(os.environ, TRYON_WAIT_FOR_START='1', TRYON_REPLAY_SPEED='max', TRACE_FILE='')
+    if governor:
+        env.update(governor.thread_env())
+    results = []
+
+    def session():
+        slot = governor.acquire(timeout=None) if governor else None
+        try:
+            run_session(trace, env, slot.cpus if slot else None, results)
+        finally:
+            if slot:
+                slot.release()
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    failed = [stderr for returncode, stderr in results if returncode != 0]
+    if failed:
+        raise RuntimeError(f"{len(failed)} worker(s) failed:\n{failed[0][-2000:]}")
+    return sessions * frames / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark try-on workers with and without the resource governor")
+    parser.add_argument('--sessions', default='1,2,4,8', help="Comma-separated concurrent session counts")
+    parser.add_argument('--frames', type=int, default=300, help="Frames per session")
+    parser.add_argument('--size', default='1280x720', help="Frame size")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split('x'))
+    trace = os.path.join(tempfile.mkdtemp(prefix='trylia-govbench-'), 'session.trace')
+    print(f"Recording {args.frames} frames at {width}x{height}...")
+    record_trace(trace, args.frames, width, height)
+
+    # Slots sized for the largest session count, up to one per CPU
+    max_sessions = max(int(value) for value in args.sessions.split(','))
+    governor = ResourceGovernor(max_sessions=max_sessions, slot_dir=os.path.join(os.path.dirname(trace), 'slots'))
+    print(f"Governor: {governor.max_sessions} slot(s) of {governor.threads} CPU(s) "
+          f"on CPUs {format_cpu_list(set().union(*governor.slots))}")
+    print()
+    print(f"{'sessions':>8}  {'ungoverned fps':>14}  {'governed fps':>12}  {'speedup':>7}")
+    for sessions in (int(value) for value in args.sessions.split(',')):
+        plain_fps, _ = run(sessions, trace, args.frames, None)
+        governed_fps, _ = run(sessions, trace, args.frames, governor)
+        print(f"{sessions:>8}  {plain_fps:>14.1f}  {governed_fps:>12.1f}  {governed_fps / plain_fps:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark request latency under a burst of log traffic
+Compares the previous synchronous FileHandler + stdout setup with the
+queue-based handler from log_setup.py. Background threads log continuously,
+like monitor_process_output() relaying a chatty try-on worker, while a
+Flask route that logs a few lines per request is timed. The log file can be
+made to stall periodically (--stall-ms) to model a busy or network disk.
+"""
+
+import os
+import sys
+import time
+import queue
+import logging
+import tempfile
+import argparse
+import threading
+
+from flask import Flask
+
+from log_setup import (TEXT_FORMAT, JsonFormatter, DroppingQueueHandler, LogListener,
+                       SizeAndTimeRotatingFileHandler, init_request_logging)
+
+
+class StallingFile:
+    """File wrapper that blocks for stall_ms on every stall_every-th write"""
+
+    def __init__(self, stream, stall_ms, stall_every):
+        self._stream = stream
+        self._stall = stall_ms / 1000
+        self._every = stall_every
+        self._writes = 0
+
+    def write(self, data):
+        self._writes += 1
+        if self._stall and self._writes % self._every == 0:
+            time.sleep(self._stall)
+        return self._stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def stalling(handler_class, stall_ms, stall_every):
+    class StallingHandler(handler_class):
+        def _open(self):
+            return StallingFile(super()._open(), stall_ms, stall_every)
+    return StallingHandler
+
+
+def sync_handlers(log_file, console, args):
+    file_handler = stalling(logging.FileHandler, args.stall_ms, args.stall_every)(log_file)
+    console_handler = logging.StreamHandler(console)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return [file_handler, console_handler], None
+
+
+def async_handlers(log_file, console, args):
+    handler_class = stalling(SizeAndTimeRotatingFileHandler, args.stall_ms, args.stall_every)
+    file_handler = handler_class(log_file, max_bytes=50 * 1024 * 1024, interval=3600, backup_count=1)
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler(console)
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handler = DroppingQueueHandler(queue.Queue(maxsize=args.queue_size))
+    listener = LogListener(handler.queue, file_handler, console_handler)
+    return [handler], listener
+
+
+def make_client(lines_per_request):
+    app = Flask(__name__)
+    init_request_logging(app)
+    logger = logging.getLogger('benchmark.request')
+
+    @app.route('/work')
+    def work():
+        for i in range(lines_per_request):
+            logger.info("Handling step %d of %d", i, lines_per_request)
+        return 'ok'
+
+    return app.test_client()
+
+
+def burst(stop, logger, rate):
+    """Log rate lines per second, in groups of 50"""
+    i = 0
+    while not stop.is_set():
+        for _ in range(50):
+            logger.info(f"TryOn Process: frame {i} processed")
+            i += 1
+        stop.wait(50 / rate)
+
+
+def measure(handlers, listener, args):
+    root = logging.getLogger()
+    root.handlers = handlers
+    root.setLevel(logging.INFO)
+    if listener:
+        listener.start()
+
+    client = make_client(args.lines)
+    stop = threading.Event()
+    bursters = [threading.Thread(target=burst, args=(stop, logging.getLogger('benchmark.burst'), args.burst_rate),
+                                 daemon=True)
+                for _ in range(args.burst_threads)]
+    for thread in bursters:
+        thread.start()
+
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        client.get('/work')
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    stop.set()
+    for thread in bursters:
+        thread.join()
+    if listener:
+        listener.stop()
+    for handler in handlers + (list(listener.handlers) if listener else []):
+        handler.close()
+    root.handlers = []
+
+    latencies.sort()
+    dropped = handlers[0].dropped if isinstance(handlers[0], DroppingQueueHandler) else 0
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request latency under log bursts")
+    parser.add_argument('--requests', type=int, default=2000, help="Timed requests per case")
+    parser.add_argument('--lines', type=int, default=5, help="Log lines written by each request")
+    parser.add_argument('--burst-threads', type=int, default=2, help="Threads logging continuously")
+    parser.add_argument('--stall-ms', type=float, default=20, help="Disk stall length (0 disables)")
+    parser.add_argument('--stall-every', type=int, default=500, help="Writes between disk stalls")
+    parser.add_argument('--burst-rate', type=int, default=2000, help="Lines per second per burst thread")
+    parser.add_argument('--queue-size', type=int, default=10000, help="Log queue bound for the async case")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='trylia-logbench-')
+    with open(os.devnull, 'w') as console:
+        cases = [
+            ('synchronous', *sync_handlers(os.path.join(directory, 'sync.log'), console, args)),
+            ('queue + listener', *async_handlers(os.path.join(directory, 'async.log'), console, args)),
+        ]
+        results = [(label, measure(handlers, listener, args)) for label, handlers, listener in cases]
+
+    print(f"📊 Request latency, {args.requests} requests, {args.lines} lines each, "
+          f"{args.burst_threads} x {args.burst_rate} lines/s in the background, "
+          f"{args.stall_ms:g} ms disk stall every {args.stall_every} writes")
+    print("=" * 60)
+    for label, (p50, p99, dropped) in results:
+        print(f"{label:<18} p50 {p50:>7.3f} ms   p99 {p99:>7.3f} ms   dropped: {dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark submission search at scale
+Fills a temporary submission store with synthetic submissions, then times
+typical sales queries through the search index and, for comparison, the
+same queries as plain SQL with LIKE over the message column.
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from submission_store import SubmissionStore
+from validation_utils import ContactFormValidator
+
+WORDS = ("we would like to add virtual try on to our online store and website please share pricing "
+         "details demo timeline integration api support for mobile app customers fashion brand "
+         "catalog shirts dresses sizes returns conversion team").split()
+PLATFORMS = ['Shopify', 'Magento', 'WooCommerce', 'BigCommerce', 'Salesforce']
+
+QUERIES = [
+    ('shopify', {}),
+    ('shopify', {'country': 'Germany', 'inquiryType': 'Integration Request'}),
+    ('pricing demo', {'companySize': '51-200 employees'}),
+    ('', {'country': 'India', 'meetingMode': 'Google Meet'}),
+    ('magento returns', {'inquiryType': 'Demo Request'}),
+]
+
+
+def make_submission(rng, i):
+    words = rng.choices(WORDS, k=rng.randint(10, 30))
+    if rng.random() < 0.05:
+        words.insert(rng.randrange(len(words)), rng.choice(PLATFORMS))
+    return {
+        'companyName': f'Company {i % 50000} {rng.choice(["Fashion", "Apparel", "Retail", "Store"])}',
+        'websiteUrl': f'https://company{i}.example.com',
+        'contactPerson': 'Jane Doe',
+        'businessEmail': f'lead{i}@example.com',
+        'phoneNumber': '+1 555 123 4567',
+        'companySize': rng.choice(ContactFormValidator.COMPANY_SIZES),
+        'inquiryType': rng.choice(ContactFormValidator.INQUIRY_TYPES),
+        'message': ' '.join(words),
+        'meetingMode': rng.choice(ContactFormValidator.MEETING_MODES),
+        'country': rng.choice(ContactFormValidator.COUNTRIES[:40]),
+    }
+
+
+def fill(store, count, batch_size):
+    """Insert count submissions spread over the last year, one batch per transaction"""
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=365)
+    step = timedelta(days=365) / count
+    conn = store._connection()
+    for first in range(0, count, batch_size):
+        batch = [(make_submission(rng, i), f'bench-{i}') for i in range(first, min(first + batch_size, count))]
+        store.add_many(batch)
+        # Spread the batch over the year so date ranges select a slice
+        conn.execute("UPDATE submissions SET submitted_at = ? WHERE id > ?",
+                     ((start + step * first).isoformat(), first))
+        conn.commit()
+
+
+def like_query(store, text, facets, since):
+    clauses, params = ["submitted_at >= ?"], [since]
+    for word in text.split():
+        clauses.append("(message LIKE ? OR company_name LIKE ?)")
+        params += [f'%{word}%', f'%{word}%']
+    for field, column in (('country', 'country'), ('inquiryType', 'inquiry_type'),
+                          ('companySize', 'company_size'), ('meetingMode', 'meeting_mode')):
+        if facets.get(field):
+            clauses.append(f"{column} = ?")
+            params.append(facets[field])
+    conn = store._connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM submissions WHERE {' AND '.join(clauses)}", params).fetchone()[0]
+    conn.execute(f"SELECT * FROM submissions WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT 20",
+                 params).fetchall()
+    return total
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark submission search")
+    parser.add_argument('--count', type=int, default=1_000_000, help="Synthetic submissions")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Submissions per insert transaction")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per query (best is reported)")
+    parser.add_argument('--skip-like', action='store_true', help="Do not time the LIKE baseline")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='trylia-search-'), 'contact_submissions.db')
+    store = SubmissionStore(path)
+    start = time.perf_counter()
+    fill(store, args.count, args.batch_size)
+    elapsed = time.perf_counter() - start
+    database_mb = os.path.getsize(path) / 1e6
+    index_mb = store._connection().execute(
+        "SELECT SUM(LENGTH(ids)) FROM search_postings").fetchone()[0] / 1e6
+
+    print(f"📊 Submission search, {args.count} submissions")
+    print(f"   indexed in {elapsed:.1f}s ({args.count / elapsed:.0f}/s), "
+          f"posting data {index_mb:.1f} MB of a {database_mb:.0f} MB database")
+    print("=" * 72)
+    since = (datetime.now() - timedelta(days=91)).isoformat()
+    for text, facets in QUERIES:
+        label = ' '.join(filter(None, [f'"{text}"' if text else ''] + [f'{k}={v}' for k, v in facets.items()]))
+        index_ms, page = timed(lambda: store.search(text, facets, since=since), args.repeat)
+        line = f"{label[:52]:<52} {page['total']:>7} hits  index {index_ms:>7.2f} ms"
+        if not args.skip_like:
+            like_ms, total = timed(lambda: like_query(store, text, facets, since), 1)
+            assert total >= page['total']
+            line += f"  LIKE {like_ms:>7.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
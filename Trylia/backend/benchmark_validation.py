@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark contact form validation throughput
+Compares the compiled schema validator with the previous hand-written checks,
+including the email re-validation EmailService did for each of its two sends
+"""
+
+import re
+import time
+import argparse
+from email_validator import validate_email, EmailNotValidError # type: ignore
+
+from validation_utils import ContactFormValidator, normalize_email
+from email_service import EmailService
+
+
+class LegacyValidator(ContactFormValidator):
+    """The checks as they were before the compiled schema, kept for comparison"""
+
+    COMPANY_SIZES = list(ContactFormValidator.COMPANY_SIZES)
+    INQUIRY_TYPES = list(ContactFormValidator.INQUIRY_TYPES)
+    MEETING_MODES = list(ContactFormValidator.MEETING_MODES)
+    COUNTRIES = list(ContactFormValidator.COUNTRIES)
+
+    @staticmethod
+    def validate_email(email):
+        try:
+            valid = validate_email(email, check_deliverability=False)
+            return True, valid.email
+        except EmailNotValidError as e:
+            return False, f"Invalid email format: {str(e)}"
+
+    @staticmethod
+    def validate_phone(phone):
+        if not phone or not phone.strip():
+            return False, "Phone number is required"
+        phone = phone.strip()
+        cleaned_phone = re.sub(r'[\s\-\(\)\+\.]', '', phone)
+        if not cleaned_phone.isdigit():
+            return False, "Phone number should contain only digits, spaces, hyphens, parentheses, and plus sign"
+        if len(cleaned_phone) < 7 or len(cleaned_phone) > 15:
+            return False, "Phone number should be between 7 and 15 digits"
+        return True, phone
+
+    @classmethod
+    def validate_contact_form(cls, form_data):
+        checks = [
+            ('companyName', lambda v: cls.validate_required_field(v, 'Company Name', 2, 100)),
+            ('websiteUrl', cls.validate_url),
+            ('contactPerson', lambda v: cls.validate_required_field(v, 'Contact Person Name', 2, 50)),
+            ('businessEmail', cls.validate_email),
+            ('phoneNumber', cls.validate_phone),
+            ('companySize', lambda v: cls.validate_dropdown_choice(v, cls.COMPANY_SIZES, 'company size')),
+            ('inquiryType', lambda v: cls.validate_dropdown_choice(v, cls.INQUIRY_TYPES, 'inquiry type')),
+            ('message', lambda v: cls.validate_required_field(v, 'Message', 10, 1000)),
+            ('meetingMode', lambda v: cls.validate_dropdown_choice(v, cls.MEETING_MODES, 'meeting mode')),
+            ('country', lambda v: cls.validate_dropdown_choice(v, cls.COUNTRIES, 'country')),
+        ]
+        errors, validated_data = {}, {}
+        for name, check in checks:
+            is_valid, result = check(form_data.get(name))
+            if is_valid:
+                validated_data[name] = result
+            else:
+                errors[name] = result
+        return len(errors) == 0, errors, validated_data
+
+
+def make_forms(count, distinct_emails):
+    return [{
+        'companyName': 'Acme Fashion',
+        'websiteUrl': 'acme.example.com',
+        'contactPerson': 'Jane Doe',
+        'businessEmail': f'jane{i % distinct_emails}@acme.example.com',
+        'phoneNumber': '+1 (555) 123-4567',
+        'companySize': '51-200 employees',
+        'inquiryType': 'Integration Request',
+        'message': 'We would like to add virtual try-on to our store.',
+        'meetingMode': 'Google Meet',
+        'country': 'Ukraine'
+    } for i in range(count)]
+
+
+def legacy_submission(form_data):
+    is_valid, _, data = LegacyValidator.validate_contact_form(form_data)
+    # EmailService validated the address again for each of its two emails
+    LegacyValidator.validate_email(data['businessEmail'])
+    LegacyValidator.validate_email(data['businessEmail'])
+    return is_valid
+
+
+def compiled_submission(service, form_data):
+    is_valid, _, data = ContactFormValidator.validate_contact_form(form_data)
+    service.customer_email(data)
+    service.customer_email(data)
+    return is_valid
+
+
+def measure(func, forms):
+    start = time.perf_counter()
+    for form_data in forms:
+        assert func(form_data)
+    return len(forms) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark contact form validation")
+    parser.add_argument('--count', type=int, default=5000, help="Submissions per measurement")
+    args = parser.parse_args()
+
+    service = EmailService()
+
+    print(f"📊 Contact form validation, {args.count} submissions per case")
+    print("=" * 60)
+    for label, distinct in (('all distinct emails', args.count), ('100 repeat submitters', 100)):
+        forms = make_forms(args.count, distinct)
+        normalize_email.cache_clear()
+        legacy = measure(legacy_submission, forms)
+        compiled = measure(lambda form_data: compiled_submission(service, form_data), forms)
+        print(f"{label:<24} legacy {legacy:>9.0f}/s   compiled {compiled:>9.0f}/s   ({compiled / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Load test the API under gunicorn with an increasing number of workers
+Starts gunicorn (gunicorn.conf.py, wsgi:app) for each worker count, drives it
+from several client processes over keep-alive connections and reports
+requests per second, so throughput scaling with worker count can be checked
+on the target machine. Requires gunicorn (POSIX only).
+"""
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import subprocess
+import http.client
+import multiprocessing
+
+HOST = '127.0.0.1'
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def client(port, paths, duration, results):
+    """Issue requests in a loop for duration seconds, report (count, errors)"""
+    conn = http.client.HTTPConnection(HOST, port, timeout=10)
+    count = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        path = paths[count % len(paths)]
+        try:
+            conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=10)
+        count += 1
+    results.put((count, errors))
+
+
+def run(workers, port, paths, clients, duration, threads):
+    state_dir = tempfile.mkdtemp(prefix='trylia-load-')
+    env = dict(os.environ,
+               TRYON_STATE_PATH=os.path.join(state_dir, 'tryon_state.db'),
+               CONTACT_DB_PATH=os.path.join(state_dir, 'contact_submissions.db'))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+         '--threads', str(threads), '--bind', f'{HOST}:{port}', '--log-level', 'warning', 'wsgi:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client, args=(port, paths, duration, results))
+                 for _ in range(clients)]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    requests = sum(count for count, _ in totals)
+    return requests / duration, sum(errors for _, errors in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API at several worker counts")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent client processes")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per measurement")
+    parser.add_argument('--threads', type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--path', action='append', dest='paths',
+                        help="Endpoint to request (repeatable, default: options, status, health)")
+    args = parser.parse_args()
+    paths = args.paths or ['/api/contact/options', '/api/status', '/health']
+
+    print(f"📊 API throughput, {args.clients} clients, {args.duration:.0f}s per run, "
+          f"{os.cpu_count()} CPUs")
+    print("=" * 60)
+    baseline = None
+    for workers in args.workers:
+        rate, errors = run(workers, args.port, paths, args.clients, args.duration, args.threads)
+        baseline = baseline or rate
+        print(f"{workers:>2} worker(s)  {rate:>9.0f} req/s   ({rate / baseline:.2f}x)   errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Hardware calibration for the Trylia try-on worker
+Times the pose model on synthetic frames and picks the most accurate
+configuration that still meets the target frame rate on this host
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Candidate settings, most accurate first
+MODEL_COMPLEXITIES = (2, 1, 0)
+INFERENCE_WIDTHS = (640, 480, 320)
+
+# Synthetic frame size, matches the default webcam capture size
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+# Pose inference must leave room for compositing and the HUD
+FPS_HEADROOM = 1.25
+
+WARMUP_FRAMES = 3
+CACHE_VERSION = 1
+
+DEFAULT_CONFIG = {'model_complexity': 1, 'inference_width': FRAME_WIDTH}
+
+
+def get_target_fps():
+    """Target frame rate for the try-on loop"""
+    return float(os.getenv('TRYON_TARGET_FPS', '24'))
+
+
+def get_cache_path():
+    """Calibration cache file for this host"""
+    cache_dir = os.getenv(
+        'TRYON_CALIBRATION_DIR',
+        os.path.join(os.path.expanduser('~'), '.trylia', 'calibration')
+    )
+    return os.path.join(cache_dir, f"{socket.gethostname()}.json")
+
+
+def make_synthetic_frame(index, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    """
+    Draw a noisy frame with a simple standing figure so the pose model
+    does realistic work. Frames are deterministic for a given index.
+    """
+    rng = np.random.default_rng(index)
+    img = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+
+    sway = int(10 * np.sin(index / 3.0))
+    cx = width // 2 + sway
+    head_y = height // 5
+    shoulder_y = head_y + height // 10
+    hip_y = shoulder_y + height // 4
+    shoulder_half = width // 10
+    hip_half = width // 14
+
+    color = (200, 180, 160)
+    cv2.circle(img, (cx, head_y), height // 14, color, -1)
+    cv2.line(img, (cx - shoulder_half, shoulder_y), (cx + shoulder_half, shoulder_y), color, 12)
+    cv2.line(img, (cx - shoulder_half, shoulder_y), (cx - hip_half, hip_y), color, 12)
+    cv2.line(img, (cx + shoulder_half, shoulder_y), (cx + hip_half, hip_y), color, 12)
+    cv2.line(img, (cx - hip_half, hip_y), (cx + hip_half, hip_y), color, 12)
+    cv2.line(img, (cx - shoulder_half, shoulder_y), (cx - shoulder_half - 30, hip_y), color, 10)
+    cv2.line(img, (cx + shoulder_half, shoulder_y), (cx + shoulder_half + 30, hip_y), color, 10)
+    cv2.line(img, (cx - hip_half, hip_y), (cx - hip_half, height - 10), color, 12)
+    cv2.line(img, (cx + hip_half, hip_y), (cx + hip_half, height - 10), color, 12)
+    return img
+
+
+def create_pose_detector(config=None):
+    """Create a PoseDetector for the given calibration config"""
+    from cvzone.PoseModule import PoseDetector
+
+    config = config or DEFAULT_CONFIG
+    return PoseDetector(modelComplexity=config['model_complexity'])
+
+
+def find_landmarks(detector, img, inference_width=None):
+    """
+    Run pose detection on a downscaled copy of the frame and map the
+    landmarks back to full-frame pixel coordinates, so sizing thresholds
+    do not depend on the inference resolution.
+    """
+    h, w = img.shape[:2]
+    if not inference_width or inference_width >= w:
+        detector.findPose(img, draw=False)
+        lmList, _ = detector.findPosition(img, bboxWithHands=False, draw=False)
+        return lmList
+
+    scale = w / float(inference_width)
+    small = cv2.resize(img, (inference_width, int(h / scale)), interpolation=cv2.INTER_AREA)
+    detector.findPose(small, draw=False)
+    lmList, _ = detector.findPosition(small, bboxWithHands=False, draw=False)
+
+    scaled = []
+    for lm in lmList:
+        point = list(lm)
+        point[0] = int(point[0] * scale)
+        point[1] = int(point[1] * scale)
+        scaled.append(point)
+    return scaled
+
+
+def measure_config(model_complexity, inference_width, frames):
+    """Time pose detection for one configuration, returns a table row"""
+    detector = create_pose_detector({
+        'model_complexity': model_complexity,
+        'inference_width': inference_width
+    })
+
+    for i in range(WARMUP_FRAMES):
+        find_landmarks(detector, make_synthetic_frame(i), inference_width)
+
+    timings = []
+    for i in range(frames):
+        img = make_synthetic_frame(WARMUP_FRAMES + i)
+        start = time.perf_counter()
+        find_landmarks(detector, img, inference_width)
+        timings.append((time.perf_counter() - start) * 1000.0)
+
+    timings.sort()
+    mean_ms = sum(timings) / len(timings)
+    p95_ms = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return {
+        'model_complexity': model_complexity,
+        'inference_width': inference_width,
+        'mean_ms': round(mean_ms, 2),
+        'p95_ms': round(p95_ms, 2),
+        'fps': round(1000.0 / mean_ms, 1) if mean_ms > 0 else 0.0
+    }
+
+
+def select_config(table, target_fps):
+    """
+    Pick the most accurate configuration whose pose fps meets the target
+    with headroom. Falls back to the fastest configuration measured.
+    """
+    required_fps = target_fps * FPS_HEADROOM
+    for complexity in MODEL_COMPLEXITIES:
+        for width in INFERENCE_WIDTHS:
+            for row in table:
+                if (row['model_complexity'] == complexity
+                        and row['inference_width'] == width
+                        and row['fps'] >= required_fps):
+                    return {'model_complexity': complexity, 'inference_width': width}
+
+    if not table:
+        return dict(DEFAULT_CONFIG)
+
+    fastest = max(table, key=lambda row: row['fps'])
+    return {
+        'model_complexity': fastest['model_complexity'],
+        'inference_width': fastest['inference_width']
+    }
+
+
+def calibrate(target_fps=None, frames=None):
+    """Measure every candidate configuration and select one"""
+    target_fps = target_fps or get_target_fps()
+    frames = frames or int(os.getenv('TRYON_CALIBRATION_FRAMES', '12'))
+
+    table = []
+    for complexity in MODEL_COMPLEXITIES:
+        for width in INFERENCE_WIDTHS:
+            try:
+                row = measure_config(complexity, width, frames)
+            except Exception as e:
+                logger.warning(f"Calibration skipped complexity={complexity} width={width}: {e}")
+                continue
+            table.append(row)
+            logger.info(f"Calibration complexity={complexity} width={width}: {row['fps']} fps")
+
+    return {
+        'version': CACHE_VERSION,
+        'host': socket.gethostname(),
+        'opencv': cv2.__version__,
+        'calibrated_at': datetime.now().isoformat(),
+        'target_fps': target_fps,
+        'table': table,
+        'selected': select_config(table, target_fps)
+    }
+
+
+def load_calibration():
+    """Load the cached calibration for this host, or None if missing or stale"""
+    path = get_cache_path()
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable calibration cache {path}: {e}")
+        return None
+
+    if result.get('version') != CACHE_VERSION or result.get('opencv') != cv2.__version__:
+        return None
+    return result
+
+
+def save_calibration(result):
+    """Write the calibration result for this host"""
+    path = get_cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_pose_config(target_fps=None, force=False):
+    """
+    Pose configuration for this host. Uses explicit environment overrides,
+    then the cached calibration, and only calibrates when neither exists.
+    """
+    complexity = os.getenv('TRYON_POSE_COMPLEXITY')
+    width = os.getenv('TRYON_INFERENCE_WIDTH')
+    if complexity and width:
+        return {'model_complexity': int(complexity), 'inference_width': int(width)}
+
+    target_fps = target_fps or get_target_fps()
+    result = None if force else load_calibration()
+
+    if result is None:
+        print("[INFO] Calibrating pose model for this machine (runs once per host)...")
+        result = calibrate(target_fps)
+        try:
+            save_calibration(result)
+        except OSError as e:
+            logger.warning(f"Could not save calibration cache: {e}")
+    elif result.get('target_fps') != target_fps:
+        # Re-select from the measured table without timing again
+        result['selected'] = select_config(result['table'], target_fps)
+
+    return result['selected']
+
+
+def print_table(result):
+    """Print the measured calibration table"""
+    selected = result['selected']
+    required_fps = result['target_fps'] * FPS_HEADROOM
+
+    print(f"Host: {result['host']}    Target: {result['target_fps']:.0f} fps "
+          f"(pose budget {required_fps:.1f} fps)")
+    print()
+    print(f"  {'Complexity':>10}  {'Width':>6}  {'Mean ms':>8}  {'P95 ms':>8}  {'FPS':>7}  Meets target")
+    for row in result['table']:
+        marker = '*' if (row['model_complexity'] == selected['model_complexity']
+                         and row['inference_width'] == selected['inference_width']) else ' '
+        meets = 'yes' if row['fps'] >= required_fps else 'no'
+        print(f"{marker} {row['model_complexity']:>10}  {row['inference_width']:>6}  "
+              f"{row['mean_ms']:>8.2f}  {row['p95_ms']:>8.2f}  {row['fps']:>7.1f}  {meets}")
+    print()
+    print(f"Selected: model complexity {selected['model_complexity']}, "
+          f"inference width {selected['inference_width']}px")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the try-on pose model for this machine")
+    parser.add_argument('--target-fps', type=float, default=None, help="Target frame rate (default: TRYON_TARGET_FPS or 24)")
+    parser.add_argument('--frames', type=int, default=None, help="Timed frames per configuration")
+    parser.add_argument('--show', action='store_true', help="Print the cached table without re-running")
+    args = parser.parse_args()
+
+    if args.show:
+        result = load_calibration()
+        if result is None:
+            print("No calibration cached for this host. Run without --show to calibrate.")
+            return 1
+    else:
+        result = calibrate(args.target_fps, args.frames)
+        path = save_calibration(result)
+        print(f"Saved calibration to {path}")
+        print()
+
+    print_table(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Bulk contact import for Trylia Contact Us feature
+Reads NDJSON or CSV lead lists incrementally from a request stream, so a
+batch is validated record by record without loading the whole body
+"""
+
+import io
+import csv
+import json
+
+BATCH_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+
+class BatchLimitExceeded(Exception):
+    """The batch body or record count went over the configured limit"""
+
+
+class ByteLimitedStream(io.RawIOBase):
+    """Raw stream wrapper that counts bytes read and stops at max_bytes"""
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Read one byte past the limit so an exactly-full body is accepted
+        size = min(len(buffer), self.max_bytes + 1 - self.bytes_read)
+        if size <= 0:
+            raise BatchLimitExceeded(f"Batch body exceeds {self.max_bytes} bytes")
+        data = self.stream.read(size)
+        if not data:
+            return 0
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise BatchLimitExceeded(f"Batch body exceeds {self.max_bytes} bytes")
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def batch_format(content_type):
+    """'ndjson', 'csv' or None for a request Content-Type"""
+    mimetype = (content_type or '').split(';', 1)[0].strip().lower()
+    return BATCH_FORMATS.get(mimetype)
+
+
+def iter_batch_records(stream, record_format, max_bytes, max_records):
+    """
+    Yield (record_number, form_data, error) for each record in the stream.
+    Exactly one of form_data and error is set. Raises BatchLimitExceeded
+    once the body or record count goes over its limit.
+    """
+    limited = ByteLimitedStream(stream, max_bytes)
+    text = io.TextIOWrapper(io.BufferedReader(limited), encoding='utf-8', errors='replace', newline='')
+
+    if record_format == 'csv':
+        rows = csv.DictReader(text)
+        records = ((row, None) for row in rows)
+    else:
+        records = _iter_ndjson(text)
+
+    count = 0
+    for form_data, error in records:
+        count += 1
+        if count > max_records:
+            raise BatchLimitExceeded(f"Batch exceeds {max_records} records")
+        yield count, form_data, error
+
+
+def _iter_ndjson(text):
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield None, "Each line must be a JSON object"
+            continue
+        yield record, None
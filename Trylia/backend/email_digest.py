@@ -0,0 +1,147 @@
+"""
+Digest mode for Trylia internal inquiry notifications
+Instead of one email to TO_EMAIL per submission, notifications are gathered
+for up to a time window or item count and sent as summary emails over a
+single SMTP session. Customer confirmations are not affected.
+"""
+
+import os
+import time
+import threading
+import logging
+
+from email_service import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+def digest_enabled():
+    return os.getenv('EMAIL_DIGEST_ENABLED', 'false').lower() in ('1', 'true', 'yes', 'on')
+
+
+class NotificationDigest:
+    """
+    Buffer of internal notifications. A digest is flushed when max_items
+    notifications are waiting or the oldest has waited window seconds,
+    whichever comes first. on_result(tracking_id, sent, error) is called for
+    every notification once its digest has been sent or has failed.
+    """
+
+    def __init__(self, service, max_items=None, window=None, on_result=None):
+        self.service = service
+        self.max_items = max_items or int(os.getenv('EMAIL_DIGEST_MAX_ITEMS', '25'))
+        self.window = window or float(os.getenv('EMAIL_DIGEST_WINDOW_SECONDS', '300'))
+        self.on_result = on_result or (lambda tracking_id, sent, error: None)
+        self.digests_sent = 0
+        self.notifications_sent = 0
+        self._items = []
+        self._oldest_at = None
+        self._retry_at = 0.0
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        with self._wakeup:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="email-digest", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the flush thread after sending whatever is still buffered"""
+        with self._wakeup:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._wakeup.notify()
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    def add(self, tracking_id, form_data):
+        with self._wakeup:
+            if not self._items:
+                self._oldest_at = time.monotonic()
+            self._items.append((tracking_id, form_data))
+            if len(self._items) >= self.max_items:
+                self._wakeup.notify()
+
+    def pending(self):
+        with self._wakeup:
+            return len(self._items)
+
+    def stats(self):
+        return {'pending': self.pending(), 'digestsSent': self.digests_sent,
+                'notificationsSent': self.notifications_sent,
+                'maxItems': self.max_items, 'windowSeconds': self.window}
+
+    def _due_in(self, now):
+        """Seconds until the buffer should be flushed (None if it is empty)"""
+        if not self._items:
+            return None
+        if len(self._items) >= self.max_items:
+            due = 0.0
+        else:
+            due = self._oldest_at + self.window - now
+        return max(due, self._retry_at - now)
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while True:
+                    due = self._due_in(time.monotonic())
+                    if self._stopping or (due is not None and due <= 0):
+                        break
+                    self._wakeup.wait(timeout=due)
+                stopping = self._stopping
+            self.flush(final=stopping)
+            if stopping:
+                return
+
+    def flush(self, final=False):
+        """
+        Send everything buffered now, as digests of at most max_items each.
+        While the circuit breaker is open the notifications are kept for a
+        later flush, unless this is the final flush at stop, after which
+        nothing would send them; they are then reported as failed. Digests
+        sent before a failure are reported as sent and never sent again.
+        """
+        with self._wakeup:
+            items, self._items = self._items, []
+            self._oldest_at = None
+        if not items:
+            return
+
+        batches = [items[i:i + self.max_items] for i in range(0, len(items), self.max_items)]
+        sent = 0
+
+        def digest_sent():
+            nonlocal sent
+            batch, sent = batches[sent], sent + 1
+            self.digests_sent += 1
+            self.notifications_sent += len(batch)
+            for tracking_id, _ in batch:
+                self.on_result(tracking_id, True, None)
+
+        try:
+            self.service.send_contact_digest([[form_data for _, form_data in batch] for batch in batches],
+                                             on_sent=digest_sent)
+        except CircuitOpenError as e:
+            items = [item for batch in batches[sent:] for item in batch]
+            if final:
+                logger.error(f"Contact digest not sent before shutdown: {e}")
+                for tracking_id, _ in items:
+                    self.on_result(tracking_id, False, f"Failed to send digest before shutdown: {e}")
+                return
+            # Keep the notifications and try again once the breaker allows it
+            with self._wakeup:
+                self._items = items + self._items
+                self._oldest_at = time.monotonic() - self.window
+                self._retry_at = time.monotonic() + max(e.retry_after, 1.0)
+            logger.warning(f"Contact digest deferred: {e}")
+            return
+        except Exception as e:
+            logger.error(f"Failed to send contact digest: {e}")
+            for batch in batches[sent:]:
+                for tracking_id, _ in batch:
+                    self.on_result(tracking_id, False, f"Failed to send digest: {e}")
@@ -0,0 +1,225 @@
+"""
+Background email dispatch for Trylia Contact Us feature
+Contact submissions are queued and delivered by a pool of sender threads,
+so the HTTP request never waits on the SMTP provider
+"""
+
+import os
+import time
+import uuid
+import queue
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+
+from email_service import CircuitOpenError
+from email_digest import NotificationDigest, digest_enabled
+
+logger = logging.getLogger(__name__)
+
+# Message kinds sent for every contact submission, in send order
+MESSAGE_KINDS = ('contact', 'confirmation')
+
+
+class EmailDispatchQueue:
+    """Queue of outgoing contact emails with per-submission delivery status"""
+
+    def __init__(self, service, workers=None, max_queue=None, max_tracked=None, digest=None):
+        self.service = service
+        self.workers = workers or int(os.getenv('EMAIL_QUEUE_WORKERS', '2'))
+        self.max_tracked = max_tracked or int(os.getenv('EMAIL_QUEUE_TRACKED', '10000'))
+        self.senders = {
+            'contact': service.send_contact_email,
+            'confirmation': service.send_confirmation_email
+        }
+        self._queue = queue.Queue(maxsize=max_queue or int(os.getenv('EMAIL_QUEUE_SIZE', '1000')))
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        # Messages held back while the SMTP circuit breaker is open: (ready_at, job)
+        self._parked = []
+        self._stop = threading.Event()
+
+        # In digest mode internal notifications are batched (see email_digest)
+        if digest is None and digest_enabled():
+            digest = NotificationDigest(service)
+        self.digest = digest
+        if digest is not None:
+            digest.on_result = self._digest_result
+
+    def start(self):
+        """Start the sender threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"email-sender-{i + 1}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            threading.Thread(target=self._release_parked, name="email-parking", daemon=True).start()
+            if self.digest is not None:
+                self.digest.start()
+        logger.info(f"Email dispatch queue started with {self.workers} sender(s)")
+
+    def stop(self, timeout=10):
+        """Let queued messages drain, then stop the sender threads"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stop.set()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=timeout)
+        if self.digest is not None:
+            self.digest.stop(timeout=timeout)
+
+    def submit(self, form_data):
+        """
+        Queue the internal notification and the customer confirmation for a
+        validated submission. Returns the tracking ID, or raises queue.Full
+        when the queue is at capacity.
+        """
+        tracking_id = self.submit_many([form_data])[0]
+        if tracking_id is None:
+            raise queue.Full
+        return tracking_id
+
+    def submit_many(self, submissions):
+        """
+        Queue several validated submissions at once, registering them under a
+        single lock acquisition. Returns a tracking ID per submission, or None
+        for those that did not fit in the queue.
+        """
+        self.start()
+        now = datetime.now().isoformat()
+        tracking_ids = [uuid.uuid4().hex for _ in submissions]
+
+        with self._lock:
+            for tracking_id, form_data in zip(tracking_ids, submissions):
+                self._status[tracking_id] = {
+                    'trackingId': tracking_id,
+                    'companyName': form_data.get('companyName'),
+                    'submittedAt': now,
+                    'messages': {
+                        kind: {'status': 'queued', 'attempts': 0, 'error': None, 'sentAt': None}
+                        for kind in MESSAGE_KINDS
+                    }
+                }
+            while len(self._status) > self.max_tracked:
+                self._status.popitem(last=False)
+
+        return [tracking_id if self._enqueue(tracking_id, form_data) else None
+                for tracking_id, form_data in zip(tracking_ids, submissions)]
+
+    def _enqueue(self, tracking_id, form_data):
+        """Put a submission's messages on the queue; False if none fit"""
+        for position, kind in enumerate(MESSAGE_KINDS):
+            try:
+                self._queue.put_nowait((tracking_id, kind, form_data))
+            except queue.Full:
+                if position == 0:
+                    with self._lock:
+                        self._status.pop(tracking_id, None)
+                    return False
+                for skipped in MESSAGE_KINDS[position:]:
+                    self._update(tracking_id, skipped, status='failed', error='Email queue is full')
+                break
+        return True
+
+    def get_status(self, tracking_id):
+        """Delivery status for a submission, or None if unknown"""
+        with self._lock:
+            entry = self._status.get(tracking_id)
+            if entry is None:
+                return None
+            result = dict(entry)
+            result['messages'] = {kind: dict(info) for kind, info in entry['messages'].items()}
+
+        states = {info['status'] for info in result['messages'].values()}
+        if states == {'sent'}:
+            result['status'] = 'delivered'
+        elif 'failed' in states and not states & {'queued', 'sending', 'parked', 'batched'}:
+            result['status'] = 'failed' if states == {'failed'} else 'partial'
+        else:
+            result['status'] = 'pending'
+        return result
+
+    def stats(self):
+        with self._lock:
+            tracked = len(self._status)
+            parked = len(self._parked)
+        stats = {'queued': self._queue.qsize(), 'parked': parked,
+                 'workers': len(self._threads), 'tracked': tracked}
+        if self.digest is not None:
+            stats['digest'] = self.digest.stats()
+        return stats
+
+    def _update(self, tracking_id, kind, **fields):
+        with self._lock:
+            entry = self._status.get(tracking_id)
+            if entry is not None:
+                entry['messages'][kind].update(fields)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            tracking_id, kind, form_data = job
+            self._deliver(tracking_id, kind, form_data)
+
+    def _deliver(self, tracking_id, kind, form_data):
+        if kind == 'contact' and self.digest is not None:
+            self.digest.add(tracking_id, form_data)
+            self._update(tracking_id, kind, status='batched')
+            return
+
+        with self._lock:
+            entry = self._status.get(tracking_id)
+            attempts = entry['messages'][kind]['attempts'] + 1 if entry else 1
+        self._update(tracking_id, kind, status='sending', attempts=attempts)
+
+        try:
+            sent, message = self.senders[kind](form_data)
+        except CircuitOpenError as e:
+            self._park((tracking_id, kind, form_data), e.retry_after, str(e))
+            return
+        except Exception as e:
+            sent, message = False, str(e)
+
+        if sent:
+            self._update(tracking_id, kind, status='sent', error=None, sentAt=datetime.now().isoformat())
+        else:
+            logger.warning(f"Email dispatch failed ({kind}, {tracking_id}): {message}")
+            self._update(tracking_id, kind, status='failed', error=message)
+
+    def _digest_result(self, tracking_id, sent, error):
+        if sent:
+            self._update(tracking_id, 'contact', status='sent', error=None, attempts=1,
+                         sentAt=datetime.now().isoformat())
+        else:
+            self._update(tracking_id, 'contact', status='failed', error=error, attempts=1)
+
+    def _park(self, job, delay, reason):
+        tracking_id, kind, _ = job
+        with self._lock:
+            self._parked.append((time.monotonic() + max(delay, 1.0), job))
+        self._update(tracking_id, kind, status='parked', error=reason)
+
+    def _release_parked(self):
+        """Move parked messages back onto the queue once their wait is over"""
+        while not self._stop.wait(1.0):
+            now = time.monotonic()
+            with self._lock:
+                ready = [job for ready_at, job in self._parked if ready_at <= now]
+                self._parked = [(ready_at, job) for ready_at, job in self._parked if ready_at > now]
+            for position, job in enumerate(ready):
+                try:
+                    self._queue.put_nowait(job)
+                except queue.Full:
+                    with self._lock:
+                        self._parked.extend((now + 1.0, rest) for rest in ready[position:])
+                    break
+                self._update(job[0], job[1], status='queued')
@@ -4,15 +4,276 @@ Handles email sending and template formatting
 """
 
 import smtplib
+import socket
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+import time
+import random
+import threading
+from datetime import datetime, timezone
 import logging
-from email_validator import validate_email, EmailNotValidError # type: ignore
+
+from validation_utils import normalize_email, ValidatedSubmission
+from templating import get_template, MessageSkeleton, PreparedMessage
+from metrics import service_metrics
 
 logger = logging.getLogger(__name__)
 
+# Form fields shown as-is in the contact notification ('N/A' when missing)
+CONTACT_TEMPLATE_FIELDS = (
+    'companyName', 'websiteUrl', 'contactPerson', 'businessEmail', 'phoneNumber',
+    'country', 'companySize', 'inquiryType', 'meetingMode'
+)
+
+_submitted_on_cache = (None, '')
+
+def submitted_on():
+    """Current UTC time as shown in emails; formatted at most once a minute"""
+    global _submitted_on_cache
+    minute = int(time.time() // 60)
+    cached_minute, text = _submitted_on_cache
+    if cached_minute != minute:
+        text = datetime.now(timezone.utc).strftime('%B %d, %Y at %I:%M %p UTC')
+        _submitted_on_cache = (minute, text)
+    return text
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending while the SMTP circuit breaker is open"""
+    
+    def __init__(self, retry_after):
+        super().__init__(f"SMTP circuit breaker is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Stops calling the SMTP provider after repeated failures. While open,
+    calls fail fast; after reset_timeout one trial call is let through
+    (half-open) and its result closes or re-opens the breaker.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def retry_after(self):
+        """Seconds until the breaker will allow a trial call"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.reset_timeout)
+                self._trial_in_flight = True
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.error(f"SMTP circuit breaker opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+    
+    def snapshot(self):
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutiveFailures': self.failures,
+                'timesOpened': self.times_opened,
+                'retryAfterSeconds': round(retry_after, 1)
+            }
+
+def is_transient_smtp_error(error):
+    """Timeouts, dropped connections and 4xx replies are worth retrying"""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException subclasses OSError, but refused recipients, unsupported
+    # extensions and the like fail the same way on every attempt
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, (socket.timeout, ConnectionError, OSError))
+
+class PooledConnection:
+    """Authenticated SMTP session plus the bookkeeping the pool needs"""
+    
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+    
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP sessions alive between messages so the TLS
+    handshake and login are paid once per connection, not once per email.
+    Connections are recycled after max_messages sends or max_idle seconds
+    idle, and checked with NOOP before reuse once they have sat idle.
+    """
+    
+    def __init__(self, connect, max_size=2, max_messages=100, max_idle=60, health_check_after=5):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_messages = max_messages
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.connections_opened = 0
+        self.connections_recycled = 0
+        self.messages_sent = 0
+        self.reused_sends = 0
+    
+    def _open(self):
+        conn = PooledConnection(self._connect())
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+    
+    def _is_usable(self, conn):
+        now = time.monotonic()
+        if conn.messages_sent >= self.max_messages or now - conn.last_used > self.max_idle:
+            return False
+        if now - conn.last_used > self.health_check_after:
+            try:
+                code, _ = conn.smtp.noop()
+                return code == 250
+            except Exception:
+                return False
+        return True
+    
+    def acquire(self):
+        """Take a healthy connection, opening one if none is idle"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._open()
+                if self._is_usable(conn):
+                    return conn
+                conn.close()
+                with self._lock:
+                    self.connections_recycled += 1
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, conn, broken=False):
+        """Return a connection; broken ones are closed instead of kept"""
+        try:
+            if broken or conn.messages_sent >= self.max_messages:
+                conn.close()
+                with self._lock:
+                    self.connections_recycled += 1
+            else:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+    
+    def send(self, messages, on_sent=None):
+        """
+        Send one or more messages (email Message or PreparedMessage) over a
+        single pooled connection. A session the server has dropped is
+        replaced once, transparently. on_sent() is called after each message
+        is accepted, so a caller can tell how far a failed send got.
+        """
+        conn = self.acquire()
+        sent = 0
+        retried = False
+        try:
+            while sent < len(messages):
+                message = messages[sent]
+                try:
+                    with service_metrics.operation('smtp_send'):
+                        if isinstance(message, PreparedMessage):
+                            conn.smtp.sendmail(message.from_addr, message.to_addrs, message.data)
+                        else:
+                            conn.smtp.send_message(message)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    if retried:
+                        raise
+                    retried = True
+                    conn.close()
+                    with self._lock:
+                        self.connections_recycled += 1
+                    conn = self._open()
+                    continue
+                with self._lock:
+                    self.messages_sent += 1
+                    if conn.messages_sent > 0:
+                        self.reused_sends += 1
+                conn.messages_sent += 1
+                sent += 1
+                if on_sent is not None:
+                    on_sent()
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        self.release(conn)
+        return sent
+    
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'connectionsOpened': self.connections_opened,
+                'connectionsRecycled': self.connections_recycled,
+                'idleConnections': len(self._idle),
+                'messagesSent': self.messages_sent,
+                'reuseRate': round(self.reused_sends / self.messages_sent, 3) if self.messages_sent else 0.0
+            }
+
 class EmailService:
     def __init__(self):
         # Email configuration from environment variables
@@ -31,18 +292,111 @@ class EmailService:
         else:
             self.enabled = True
             logger.info(f"Email service initialized with SMTP server: {self.smtp_server}")
+        
+        # Timeouts keep a stalled provider from hanging sender threads
+        self.connect_timeout = float(os.getenv('SMTP_CONNECT_TIMEOUT', '10'))
+        self.send_timeout = float(os.getenv('SMTP_SEND_TIMEOUT', '30'))
+        
+        # Retries with jittered exponential backoff for transient failures
+        self.max_retries = int(os.getenv('SMTP_MAX_RETRIES', '3'))
+        self.retry_base_delay = float(os.getenv('SMTP_RETRY_BASE_DELAY', '0.5'))
+        self.retry_max_delay = float(os.getenv('SMTP_RETRY_MAX_DELAY', '8'))
+        
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('SMTP_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('SMTP_BREAKER_RESET_SECONDS', '30'))
+        )
+        
+        # Headers that are the same for every message of a kind
+        self.contact_skeleton = MessageSkeleton(From=self.from_email, To=self.to_email)
+        self.confirmation_skeleton = MessageSkeleton(
+            Subject="✅ Trylia - We've Received Your Inquiry!",
+            From=self.from_email
+        )
+        
+        # Reused SMTP sessions (see SMTPConnectionPool)
+        self.pool = SMTPConnectionPool(
+            self._connect,
+            max_size=int(os.getenv('SMTP_POOL_SIZE', '2')),
+            max_messages=int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', '100')),
+            max_idle=float(os.getenv('SMTP_MAX_IDLE_SECONDS', '60'))
+        )
     
-    def validate_email_address(self, email):
-        """Validate email address format"""
+    def _connect(self):
+        """Open an authenticated SMTP session"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.connect_timeout)
         try:
-            # Use check_deliverability=False for better user experience
-            valid = validate_email(email, check_deliverability=False)
-            return True, valid.email
-        except EmailNotValidError as e:
-            return False, str(e)
+            server.starttls()
+            server.login(self.smtp_username, self.smtp_password)
+            if server.sock is not None:
+                server.sock.settimeout(self.send_timeout)
+        except Exception:
+            server.close()
+            raise
+        return server
     
-    def create_contact_email_template(self, form_data):
-        """Create professional email template for contact form submission"""
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff for the given retry number (1-based)"""
+        ceiling = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+    
+    def send_messages(self, messages, on_sent=None):
+        """
+        Send prepared MIME messages over one pooled SMTP connection.
+        Transient failures are retried with backoff, resending only the
+        messages the server has not accepted yet; raises CircuitOpenError
+        without contacting the server while the circuit breaker is open.
+        Permanent errors, such as a refused recipient, mean the server is
+        up and do not count towards opening the breaker. on_sent() is
+        called after each accepted message.
+        """
+        delivered = 0
+
+        def count():
+            nonlocal delivered
+            delivered += 1
+            if on_sent is not None:
+                on_sent()
+
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                self.pool.send(messages[delivered:], on_sent=count)
+            except Exception as e:
+                if not is_transient_smtp_error(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"SMTP send failed ({e}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return delivered
+    
+    def get_stats(self):
+        """Connection pool and circuit breaker metrics"""
+        return dict(self.pool.stats(), enabled=self.enabled, circuitBreaker=self.breaker.snapshot())
+    
+    def validate_email_address(self, email):
+        """Validate email address format (memoized, see normalize_email)"""
+        return normalize_email(email or '')
+    
+    def customer_email(self, form_data):
+        """
+        (is_valid, email) for the submitter. Data that already went through
+        ContactFormValidator carries a normalized address and is not re-checked.
+        """
+        if isinstance(form_data, ValidatedSubmission):
+            return True, form_data.normalized_email
+        return self.validate_email_address(form_data.get('businessEmail', ''))
+    
+    def contact_template_context(self, form_data):
+        """Template values for one submission in the internal notification"""
         
         # Format meeting time if provided
         meeting_time = form_data.get('meetingTime', '')
@@ -56,113 +410,66 @@ class EmailService:
         else:
             meeting_time_formatted = 'Not specified'
         
-        # Create HTML email template
-        html_template = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .header {{ background-color: #2c3e50; color: white; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; background-color: #f9f9f9; }}
-                .section {{ margin-bottom: 20px; padding: 15px; background-color: white; border-radius: 5px; }}
-                .label {{ font-weight: bold; color: #2c3e50; }}
-                .value {{ margin-left: 10px; }}
-                .footer {{ background-color: #34495e; color: white; padding: 15px; text-align: center; font-size: 12px; }}
-                .priority {{ background-color: #e74c3c; color: white; padding: 5px 10px; border-radius: 3px; display: inline-block; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎯 Trylia - New Business Inquiry</h1>
-                <p>Virtual Dressing Room Solutions for E-commerce</p>
-            </div>
-            
-            <div class="content">
-                <div class="section">
-                    <h2>📋 Contact Information</h2>
-                    <p><span class="label">Company Name:</span><span class="value">{form_data.get('companyName', 'N/A')}</span></p>
-                    <p><span class="label">Website:</span><span class="value"><a href="{form_data.get('websiteUrl', '#')}">{form_data.get('websiteUrl', 'N/A')}</a></span></p>
-                    <p><span class="label">Contact Person:</span><span class="value">{form_data.get('contactPerson', 'N/A')}</span></p>
-                    <p><span class="label">Business Email:</span><span class="value"><a href="mailto:{form_data.get('businessEmail', '')}">{form_data.get('businessEmail', 'N/A')}</a></span></p>
-                    <p><span class="label">Phone Number:</span><span class="value">{form_data.get('phoneNumber', 'N/A')}</span></p>
-                    <p><span class="label">Country/Region:</span><span class="value">{form_data.get('country', 'N/A')}</span></p>
-                </div>
-                
-                <div class="section">
-                    <h2>🏢 Company Details</h2>
-                    <p><span class="label">Company Size:</span><span class="value">{form_data.get('companySize', 'N/A')}</span></p>
-                    <p><span class="label">Inquiry Type:</span><span class="value"><span class="priority">{form_data.get('inquiryType', 'N/A')}</span></span></p>
-                </div>
-                
-                <div class="section">
-                    <h2>💬 Message & Requirements</h2>
-                    <div style="background-color: #ecf0f1; padding: 15px; border-radius: 5px; border-left: 4px solid #3498db;">
-                        {form_data.get('message', 'No message provided').replace('\n', '<br>')}
-                    </div>
-                </div>
-                
-                <div class="section">
-                    <h2>📅 Meeting Preferences</h2>
-                    <p><span class="label">Preferred Meeting Mode:</span><span class="value">{form_data.get('meetingMode', 'N/A')}</span></p>
-                    <p><span class="label">Preferred Meeting Time:</span><span class="value">{meeting_time_formatted}</span></p>
-                </div>
-                
-                <div class="section">
-                    <h2>⚡ Next Steps</h2>
-                    <ul>
-                        <li>Response within 24 hours during business days</li>
-                        <li>Technical consultation if integration request</li>
-                        <li>Custom demo preparation if demo requested</li>
-                        <li>Pricing proposal if pricing inquiry</li>
-                    </ul>
-                </div>
-            </div>
-            
-            <div class="footer">
-                <p><strong>Trylia - Virtual Dressing Room Solutions</strong></p>
-                <p>Revolutionizing E-commerce with AI-Powered Virtual Try-On Technology</p>
-                <p>Submitted on: {datetime.now().strftime('%B %d, %Y at %I:%M %p UTC')}</p>
-            </div>
-        </body>
-        </html>
+        context = {field: form_data.get(field) or 'N/A' for field in CONTACT_TEMPLATE_FIELDS}
+        context.update({
+            'websiteHref': form_data.get('websiteUrl') or '#',
+            'emailHref': form_data.get('businessEmail') or '',
+            'message': form_data.get('message') or 'No message provided',
+            'meetingTime': meeting_time_formatted,
+            'submittedOn': submitted_on()
+        })
+        return context
+    
+    def create_contact_email_template(self, form_data):
+        """Render the HTML and plain-text parts of the internal notification"""
+        return get_template('contact').render(self.contact_template_context(form_data))
+    
+    def create_digest_email(self, submissions):
         """
-        
-        # Create plain text version
-        text_template = f"""
-TRYLIA - NEW BUSINESS INQUIRY
-Virtual Dressing Room Solutions for E-commerce
-
-CONTACT INFORMATION:
-Company Name: {form_data.get('companyName', 'N/A')}
-Website: {form_data.get('websiteUrl', 'N/A')}
-Contact Person: {form_data.get('contactPerson', 'N/A')}
-Business Email: {form_data.get('businessEmail', 'N/A')}
-Phone Number: {form_data.get('phoneNumber', 'N/A')}
-Country/Region: {form_data.get('country', 'N/A')}
-
-COMPANY DETAILS:
-Company Size: {form_data.get('companySize', 'N/A')}
-Inquiry Type: {form_data.get('inquiryType', 'N/A')}
-
-MESSAGE & REQUIREMENTS:
-{form_data.get('message', 'No message provided')}
-
-MEETING PREFERENCES:
-Preferred Meeting Mode: {form_data.get('meetingMode', 'N/A')}
-Preferred Meeting Time: {meeting_time_formatted}
-
-NEXT STEPS:
-- Response within 24 hours during business days
-- Technical consultation if integration request
-- Custom demo preparation if demo requested
-- Pricing proposal if pricing inquiry
-
-Submitted on: {datetime.now().strftime('%B %d, %Y at %I:%M %p UTC')}
+        One internal notification for several submissions: a summary table of
+        company, inquiry type and country, followed by the full details.
         """
+        row_template, item_template = get_template('digest_row'), get_template('digest_item')
+        rows_html, rows_text, details_html, details_text = [], [], [], []
+        for number, form_data in enumerate(submissions, 1):
+            context = self.contact_template_context(form_data)
+            context['number'] = number
+            row_html, row_text = row_template.render(context)
+            item_html, item_text = item_template.render(context)
+            rows_html.append(row_html)
+            rows_text.append(row_text)
+            details_html.append(item_html)
+            details_text.append(item_text)
         
-        return html_template, text_template
+        # The parts are rendered separately: each embeds its own rows and details
+        digest = get_template('digest')
+        html_content = digest.render_html({
+            'count': len(submissions),
+            'rows': ''.join(rows_html),
+            'details': ''.join(details_html),
+            'submittedOn': submitted_on()
+        })
+        text_content = digest.render_text({
+            'count': len(submissions),
+            'rows': ''.join(rows_text),
+            'details': ''.join(details_text),
+            'submittedOn': submitted_on()
+        })
+        return self.contact_skeleton.build(
+            html_content, text_content,
+            Subject=f"🎯 Trylia Business Inquiries - {len(submissions)} new since the last digest"
+        )
+    
+    def send_contact_digest(self, batches, on_sent=None):
+        """
+        Send one digest email per batch of submissions, all over a single
+        SMTP session; on_sent() is called after each digest is accepted.
+        Raises on failure; CircuitOpenError means nothing more was attempted.
+        """
+        if not self.enabled:
+            raise RuntimeError("Email service is not configured")
+        self.send_messages([self.create_digest_email(batch) for batch in batches], on_sent=on_sent)
+        logger.info(f"Contact digest sent with {sum(len(batch) for batch in batches)} submission(s)")
     
     def send_contact_email(self, form_data):
         """Send contact form email"""
@@ -172,36 +479,29 @@ Submitted on: {datetime.now().strftime('%B %d, %Y at %I:%M %p UTC')}
         
         try:
             # Validate business email
-            is_valid, validated_email = self.validate_email_address(form_data.get('businessEmail', ''))
+            is_valid, validated_email = self.customer_email(form_data)
             if not is_valid:
                 return False, f"Invalid email address: {validated_email}"
             
             # Create email templates
             html_content, text_content = self.create_contact_email_template(form_data)
             
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"🎯 Trylia Business Inquiry - {form_data.get('inquiryType', 'General')} from {form_data.get('companyName', 'Unknown Company')}"
-            msg['From'] = self.from_email
-            msg['To'] = self.to_email
-            msg['Reply-To'] = validated_email
-            
-            # Attach both text and HTML versions
-            text_part = MIMEText(text_content, 'plain')
-            html_part = MIMEText(html_content, 'html')
-            
-            msg.attach(text_part)
-            msg.attach(html_part)
+            # Create message with both text and HTML versions
+            msg = self.contact_skeleton.build(
+                html_content, text_content,
+                Subject=f"🎯 Trylia Business Inquiry - {form_data.get('inquiryType', 'General')} from {form_data.get('companyName', 'Unknown Company')}",
+                Reply_To=validated_email
+            )
             
             # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self.send_messages([msg])
             
             logger.info(f"Contact email sent successfully for {form_data.get('companyName', 'Unknown')}")
             return True, "Email sent successfully"
             
+        except CircuitOpenError:
+            # Let the dispatch queue park the message instead of failing it
+            raise
         except Exception as e:
             logger.error(f"Failed to send contact email: {str(e)}")
             return False, f"Failed to send email: {str(e)}"
@@ -212,71 +512,25 @@ Submitted on: {datetime.now().strftime('%B %d, %Y at %I:%M %p UTC')}
             return False, "Email service is not configured"
         
         try:
-            customer_email = form_data.get('businessEmail', '')
-            is_valid, validated_email = self.validate_email_address(customer_email)
+            is_valid, validated_email = self.customer_email(form_data)
             if not is_valid:
                 return False, f"Invalid customer email: {validated_email}"
             
             # Create confirmation email
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .header {{ background-color: #3498db; color: white; padding: 20px; text-align: center; }}
-                    .content {{ padding: 20px; }}
-                    .footer {{ background-color: #34495e; color: white; padding: 15px; text-align: center; }}
-                </style>
-            </head>
-            <body>
-                <div class="header">
-                    <h1>✅ Thank You for Contacting Trylia!</h1>
-                </div>
-                <div class="content">
-                    <p>Dear {form_data.get('contactPerson', 'Valued Partner')},</p>
-                    
-                    <p>Thank you for your interest in Trylia's virtual dressing room solutions! We have received your inquiry regarding <strong>{form_data.get('inquiryType', 'our services')}</strong>.</p>
-                    
-                    <h3>What happens next?</h3>
-                    <ul>
-                        <li>Our team will review your requirements within 24 hours</li>
-                        <li>You'll receive a personalized response from our solutions expert</li>
-                        <li>We'll schedule a demo or consultation based on your preferences</li>
-                    </ul>
-                    
-                    <p>In the meantime, feel free to explore our technology and see how we're revolutionizing e-commerce with AI-powered virtual try-on solutions.</p>
-                    
-                    <p>Best regards,<br>
-                    <strong>The Trylia Team</strong><br>
-                    Virtual Dressing Room Solutions</p>
-                </div>
-                <div class="footer">
-                    <p>This is an automated confirmation. Please do not reply to this email.</p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = "✅ Trylia - We've Received Your Inquiry!"
-            msg['From'] = self.from_email
-            msg['To'] = validated_email
-            
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
+            html_content, text_content = get_template('confirmation').render({
+                'contactPerson': form_data.get('contactPerson') or 'Valued Partner',
+                'inquiryType': form_data.get('inquiryType') or 'our services'
+            })
+            msg = self.confirmation_skeleton.build(html_content, text_content, To=validated_email)
             
             # Send confirmation email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            self.send_messages([msg])
             
             logger.info(f"Confirmation email sent to {validated_email}")
             return True, "Confirmation email sent"
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.error(f"Failed to send confirmation email: {str(e)}")
             return False, f"Failed to send confirmation email: {str(e)}"
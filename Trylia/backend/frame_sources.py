@@ -0,0 +1,536 @@
+"""
+Frame sources for the Trylia try-on engine
+Camera, video file, image directory, synthetic and shared memory inputs
+behind one interface, so the try-on loop can run without a physical device
+"""
+
+import os
+import abc
+import time
+import queue
+import struct
+import threading
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource(abc.ABC):
+    """
+    Base class for frame sources.
+
+    read() keeps the cv2.VideoCapture contract and returns (success, image).
+    After each read, `timestamp` holds the media time of the frame in seconds
+    and `captured_at` the time.monotonic() at which it was obtained, which is
+    what frame-age measurements should use.
+
+    With prefetch > 0 a background thread reads that many frames ahead.
+    Live sources drop the oldest buffered frame instead of blocking, so the
+    consumer always sees the freshest image.
+    """
+
+    live = False
+    provides_landmarks = False
+
+    def __init__(self, prefetch=0):
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+        self.prefetch = max(0, int(prefetch))
+        self.timestamp = 0.0
+        self.captured_at = 0.0
+        self.metadata = None
+        self.frames_read = 0
+        self.dropped_frames = 0
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._opened = False
+        self._exhausted = False
+
+    # --- Subclass hooks ---
+
+    @abc.abstractmethod
+    def _open(self):
+        """Open the underlying device and set width, height and fps"""
+
+    @abc.abstractmethod
+    def _grab(self):
+        """Return (image, timestamp, metadata) for the next frame, or None at end of stream"""
+
+    def _close(self):
+        pass
+
+    # --- Public interface ---
+
+    def open(self):
+        if self._opened:
+            return self
+        self._open()
+        self._opened = True
+        if self.prefetch:
+            self._queue = queue.Queue(maxsize=self.prefetch)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened or self._exhausted:
+            return False, None
+
+        if self._queue is not None:
+            item = self._next_prefetched()
+        else:
+            item = self._grab_timed()
+
+        if item is None:
+            self._exhausted = True
+            return False, None
+
+        img, self.timestamp, self.captured_at, self.metadata = item
+        self.frames_read += 1
+        return True, img
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            # Unblock a producer waiting on a full queue
+            try:
+                while True:
+                    self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._thread.join(timeout=2)
+            self._thread = None
+            # Wake a consumer blocked in read()
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+        if self._opened:
+            self._close()
+            self._opened = False
+
+    def describe(self):
+        return {
+            'type': type(self).__name__,
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'prefetch': self.prefetch,
+            'framesRead': self.frames_read,
+            'droppedFrames': self.dropped_frames
+        }
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    # --- Internals ---
+
+    def _next_prefetched(self):
+        # Timed waits, so a release() from another thread always ends the read
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+
+    def _grab_timed(self):
+        result = self._grab()
+        if result is None:
+            return None
+        img, timestamp, metadata = result
+        return img, timestamp, time.monotonic(), metadata
+
+    def _prefetch_loop(self):
+        while not self._stop.is_set():
+            try:
+                item = self._grab_timed()
+            except Exception as e:
+                logger.error(f"Frame source read failed: {e}")
+                item = None
+
+            if self.live and item is not None:
+                while True:
+                    try:
+                        self._queue.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            self._queue.get_nowait()
+                            self.dropped_frames += 1
+                        except queue.Empty:
+                            pass
+            else:
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+
+            if item is None:
+                return
+
+
+class CameraSource(FrameSource):
+    """
+    Webcam input. Defaults favour latency: MJPG transfer and a one-frame
+    driver buffer so read() does not return stale frames.
+    """
+
+    live = True
+
+    def __init__(self, index=0, width=None, height=None, fps=None,
+                 fourcc='MJPG', buffer_size=1, api_preference=cv2.CAP_ANY, prefetch=0):
+        super().__init__(prefetch)
+        self.index = index
+        self.requested_width = width
+        self.requested_height = height
+        self.requested_fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.api_preference = api_preference
+        self._cap = None
+        self._start = None
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.index, self.api_preference)
+        if not self._cap.isOpened():
+            raise IOError(f"Camera {self.index} could not be opened")
+
+        if self.fourcc:
+            self._cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.requested_width:
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.requested_width)
+        if self.requested_height:
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.requested_height)
+        if self.requested_fps:
+            self._cap.set(cv2.CAP_PROP_FPS, self.requested_fps)
+        if self.buffer_size is not None:
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        # Drivers may ignore requests, so report what was actually negotiated
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = float(self._cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self._start = time.monotonic()
+
+    def _grab(self):
+        success, img = self._cap.read()
+        if not success:
+            return None
+        return img, time.monotonic() - self._start, None
+
+    def _close(self):
+        self._cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """Video file input, optionally paced to the file frame rate"""
+
+    def __init__(self, path, loop=False, realtime=False, prefetch=0):
+        super().__init__(prefetch)
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self._cap = None
+        self._pacer = None
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            raise IOError(f"Video file could not be opened: {self.path}")
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = float(self._cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        self._pacer = Pacer() if self.realtime else None
+
+    def _grab(self):
+        success, img = self._cap.read()
+        if not success and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            if self._pacer:
+                self._pacer.rebase()
+            success, img = self._cap.read()
+        if not success:
+            return None
+
+        timestamp = self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if self._pacer:
+            self._pacer.wait_until(timestamp)
+        return img, timestamp, None
+
+    def _close(self):
+        self._cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Plays the images of a directory in name order at a fixed rate"""
+
+    def __init__(self, directory, fps=30.0, loop=False, realtime=False, prefetch=0):
+        super().__init__(prefetch)
+        self.directory = directory
+        self.fps = float(fps)
+        self.loop = loop
+        self.realtime = realtime
+        self._files = []
+        self._position = 0
+        self._pacer = None
+
+    def _open(self):
+        self._files = sorted(
+            os.path.join(self.directory, f) for f in os.listdir(self.directory)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self._files:
+            raise IOError(f"No images found in {self.directory}")
+        first = cv2.imread(self._files[0])
+        if first is None:
+            raise IOError(f"Could not read image: {self._files[0]}")
+        self.height, self.width = first.shape[:2]
+        self._pacer = Pacer() if self.realtime else None
+
+    def _grab(self):
+        if self._position >= len(self._files):
+            if not self.loop:
+                return None
+            self._position = 0
+            if self._pacer:
+                self._pacer.rebase()
+
+        index = self._position
+        self._position += 1
+        img = cv2.imread(self._files[index])
+        if img is None:
+            return None
+        if img.shape[:2] != (self.height, self.width):
+            img = cv2.resize(img, (self.width, self.height))
+
+        timestamp = index / self.fps
+        if self._pacer:
+            self._pacer.wait_until(timestamp)
+        return img, timestamp, None
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generated frames for tests and benchmarks. The 'figure' pattern draws a
+    swaying stick figure, 'noise' is random texture and 'bars' is a moving
+    colour bar test card.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, frames=None,
+                 pattern='figure', realtime=False, prefetch=0):
+        super().__init__(prefetch)
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.frames = frames
+        self.pattern = pattern
+        self.realtime = realtime
+        self._index = 0
+        self._pacer = None
+        self._rng = np.random.default_rng(0)
+
+    def _open(self):
+        if self.pattern not in ('figure', 'noise', 'bars'):
+            raise ValueError(f"Unknown synthetic pattern: {self.pattern}")
+        self._pacer = Pacer() if self.realtime else None
+
+    def _grab(self):
+        if self.frames is not None and self._index >= self.frames:
+            return None
+        index = self._index
+        self._index += 1
+
+        if self.pattern == 'figure':
+            from calibration import make_synthetic_frame
+            img = make_synthetic_frame(index, self.width, self.height)
+        elif self.pattern == 'noise':
+            img = self._rng.integers(0, 256, size=(self.height, self.width, 3), dtype=np.uint8)
+        else:
+            img = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            bar = max(1, self.width // 8)
+            for i in range(8):
+                color = ((i & 1) * 255, ((i >> 1) & 1) * 255, ((i >> 2) & 1) * 255)
+                x = (i * bar + index * 4) % self.width
+                img[:, x:x + bar] = color
+
+        timestamp = index / self.fps
+        if self._pacer:
+            self._pacer.wait_until(timestamp)
+        return img, timestamp, None
+
+
+# Shared memory layout: sequence (uint64), timestamp (float64), width, height, then BGR bytes.
+# The writer makes the sequence odd while a frame is being copied in.
+SHM_HEADER = struct.Struct('<QdII')
+
+
+class SharedMemoryFrameWriter:
+    """Publishes frames into a named shared memory block for SharedMemorySource"""
+
+    def __init__(self, name, width, height, create=True):
+        from multiprocessing import shared_memory
+
+        self.width = width
+        self.height = height
+        size = SHM_HEADER.size + width * height * 3
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self._sequence = 0
+        self._frame = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self._shm.buf, offset=SHM_HEADER.size)
+        SHM_HEADER.pack_into(self._shm.buf, 0, 0, 0.0, width, height)
+
+    def write(self, img, timestamp=None):
+        if img.shape[:2] != (self.height, self.width):
+            img = cv2.resize(img, (self.width, self.height))
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        SHM_HEADER.pack_into(self._shm.buf, 0, self._sequence + 1, timestamp, self.width, self.height)
+        self._frame[:] = img
+        self._sequence += 2
+        SHM_HEADER.pack_into(self._shm.buf, 0, self._sequence, timestamp, self.width, self.height)
+
+    def close(self, unlink=True):
+        self._frame = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+
+class SharedMemorySource(FrameSource):
+    """
+    Reads frames published by another process through SharedMemoryFrameWriter.
+    Each read waits for a frame newer than the last one returned.
+    """
+
+    live = True
+
+    def __init__(self, name, fps=30.0, timeout=2.0, prefetch=0):
+        super().__init__(prefetch)
+        self.name = name
+        self.fps = float(fps)
+        self.timeout = timeout
+        self._shm = None
+        self._frame = None
+        self._last_sequence = 0
+
+    def _open(self):
+        from multiprocessing import shared_memory
+
+        self._shm = shared_memory.SharedMemory(name=self.name, create=False)
+        _, _, self.width, self.height = SHM_HEADER.unpack_from(self._shm.buf, 0)
+        self._frame = np.ndarray((self.height, self.width, 3), dtype=np.uint8,
+                                 buffer=self._shm.buf, offset=SHM_HEADER.size)
+
+    def _grab(self):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline and not self._stop.is_set():
+            sequence, timestamp, _, _ = SHM_HEADER.unpack_from(self._shm.buf, 0)
+            if sequence > self._last_sequence and sequence % 2 == 0:
+                img = self._frame.copy()
+                check, _, _, _ = SHM_HEADER.unpack_from(self._shm.buf, 0)
+                if check == sequence:
+                    self._last_sequence = sequence
+                    return img, timestamp, None
+            time.sleep(0.001)
+        return None
+
+    def _close(self):
+        self._frame = None
+        self._shm.close()
+
+
+class Pacer:
+    """Sleeps so frames are delivered at their media timestamps"""
+
+    def __init__(self):
+        self._start = None
+        self._offset = 0.0
+        self._last = 0.0
+
+    def rebase(self):
+        self._offset += self._last
+
+    def wait_until(self, timestamp):
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now - timestamp
+        self._last = timestamp
+        delay = self._start + self._offset + timestamp - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _parse_size(text):
+    """Parse 'WIDTHxHEIGHT[@FPS]' into (width, height, fps)"""
+    fps = None
+    if '@' in text:
+        text, fps_text = text.split('@', 1)
+        fps = float(fps_text)
+    width, height = text.lower().split('x', 1)
+    return int(width), int(height), fps
+
+
+def open_frame_source(spec, prefetch=None):
+    """
+    Create and open a frame source from a spec string:
+
+        camera:0                 webcam index 0 (MJPG, buffer size 1)
+        camera:1:1280x720@30     webcam with a requested resolution and fps
+        video:clip.mp4           video file at decode speed
+        images:frames/           image directory
+        synthetic                generated 640x480 frames
+        synthetic:1280x720@30    generated frames of a given size
+        shm:trylia_frames        shared memory published by another process
+        trace:session.trace      recorded landmark trace (see landmark_trace.py)
+
+    TRYON_FRAME_PREFETCH sets the read-ahead depth when prefetch is not given.
+    """
+    if prefetch is None:
+        prefetch = int(os.getenv('TRYON_FRAME_PREFETCH', '0'))
+
+    kind, _, arg = spec.partition(':')
+    kind = kind.strip().lower()
+
+    if kind == 'camera':
+        index_text, _, size_text = arg.partition(':')
+        width = height = fps = None
+        if size_text:
+            width, height, fps = _parse_size(size_text)
+        source = CameraSource(
+            int(index_text or 0), width, height, fps,
+            fourcc=os.getenv('TRYON_CAMERA_FOURCC', 'MJPG') or None,
+            buffer_size=int(os.getenv('TRYON_CAMERA_BUFFER_SIZE', '1')),
+            prefetch=prefetch
+        )
+    elif kind == 'video':
+        source = VideoFileSource(arg, prefetch=prefetch)
+    elif kind == 'images':
+        source = ImageDirectorySource(arg, prefetch=prefetch)
+    elif kind == 'synthetic':
+        width, height, fps = _parse_size(arg) if arg else (640, 480, None)
+        source = SyntheticSource(width, height, fps or 30.0, prefetch=prefetch)
+    elif kind == 'shm':
+        source = SharedMemorySource(arg, prefetch=prefetch)
+    elif kind == 'trace':
+        from landmark_trace import TraceReplaySource
+        source = TraceReplaySource(arg, realtime=os.getenv('TRYON_REPLAY_SPEED', 'realtime') != 'max',
+                                   prefetch=prefetch)
+    else:
+        raise ValueError(f"Unknown frame source: {spec}")
+
+    return source.open()
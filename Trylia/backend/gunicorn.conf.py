@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for serving the Trylia API with several worker processes
+    gunicorn -c gunicorn.conf.py wsgi:app
+Each worker builds its own app; the try-on session is shared through the
+SQLite process registry. See multi_worker_setup.md.
+"""
+
+import os
+
+# Workers must share the try-on session, so default to the shared registry
+os.environ.setdefault('TRYON_STATE_BACKEND', 'sqlite')
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+
+# Threads let a worker keep serving while a request streams an export or
+# waits on the camera test
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Long enough for bulk imports and exports to finish streaming
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+
+
+def worker_exit(server, worker):
+    """Run the app's shutdown hooks in the exiting worker"""
+    from wsgi import app
+    app.extensions['lifecycle'].shutdown()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Landmark trace recording and replay for the Trylia try-on loop
+Records per-frame pose landmarks from a live session into a compact
+append-only binary file and plays them back without a camera or mediapipe
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from frame_sources import FrameSource, Pacer
+
+# File layout:
+#   header  = MAGIC, version, frame width, frame height
+#   record  = record header, landmarks (float32 x, y, z), optional JPEG thumbnail
+# Records are only ever appended; a truncated final record is ignored on read.
+MAGIC = b'TRYTRACE'
+VERSION = 1
+FILE_HEADER = struct.Struct('<8sHHH')
+RECORD_HEADER = struct.Struct('<IdHI')  # frame index, timestamp, landmark count, thumbnail bytes
+LANDMARK_FIELDS = 3
+
+TraceRecord = namedtuple('TraceRecord', ['index', 'timestamp', 'landmarks', 'thumbnail'])
+
+
+class TraceRecorder:
+    """Appends landmark records to a trace file"""
+
+    def __init__(self, path, frame_size, thumbnail_width=None, jpeg_quality=70):
+        self.path = path
+        self.frame_width, self.frame_height = frame_size
+        self.thumbnail_width = thumbnail_width
+        self.jpeg_quality = jpeg_quality
+        self.frame_index = 0
+        self.start_time = None
+        # Default timestamps continue from the last record of a reopened trace
+        self.time_base = 0.0
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            self.frame_width, self.frame_height = read_trace_header(path)
+            self.frame_index, last_timestamp, end = scan_trace(path)
+            if last_timestamp is not None:
+                self.time_base = last_timestamp
+            # Drop a record torn by a crash, so new records start on a boundary
+            if end < os.path.getsize(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(end)
+
+        self._file = open(path, 'ab')
+        if not exists:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, self.frame_width, self.frame_height))
+
+    def record(self, landmarks, timestamp=None, frame=None):
+        """Append one frame. Timestamps default to seconds since the first record."""
+        now = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = now
+        if timestamp is None:
+            timestamp = self.time_base + (now - self.start_time)
+
+        points = np.zeros((len(landmarks or []), LANDMARK_FIELDS), dtype='<f4')
+        for i, lm in enumerate(landmarks or []):
+            values = list(lm)[:LANDMARK_FIELDS]
+            points[i, :len(values)] = values
+
+        thumbnail = b''
+        if frame is not None and self.thumbnail_width:
+            h, w = frame.shape[:2]
+            thumb_height = max(1, int(h * self.thumbnail_width / float(w)))
+            small = cv2.resize(frame, (self.thumbnail_width, thumb_height), interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if ok:
+                thumbnail = encoded.tobytes()
+
+        self._file.write(RECORD_HEADER.pack(self.frame_index, timestamp, len(points), len(thumbnail)))
+        self._file.write(points.tobytes())
+        self._file.write(thumbnail)
+        self.frame_index += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_trace_header(path):
+    """Return (frame_width, frame_height) for a trace file"""
+    with open(path, 'rb') as f:
+        data = f.read(FILE_HEADER.size)
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"Not a landmark trace file: {path}")
+    magic, version, width, height = FILE_HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a landmark trace file: {path}")
+    return width, height
+
+
+def scan_trace(path):
+    """
+    (record count, last timestamp or None, end offset of the last complete
+    record) without decoding landmarks or thumbnails
+    """
+    read_trace_header(path)
+    size = os.path.getsize(path)
+    count, last_timestamp, end = 0, None, FILE_HEADER.size
+    with open(path, 'rb') as f:
+        f.seek(end)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            index, timestamp, points, thumb_size = RECORD_HEADER.unpack(header)
+            record_end = end + RECORD_HEADER.size + points * LANDMARK_FIELDS * 4 + thumb_size
+            if record_end > size:
+                break
+            count, last_timestamp, end = count + 1, timestamp, record_end
+            f.seek(end)
+    return count, last_timestamp, end
+
+
+def read_trace(path):
+    """Yield TraceRecord entries in file order"""
+    read_trace_header(path)
+    with open(path, 'rb') as f:
+        f.seek(FILE_HEADER.size)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            index, timestamp, count, thumb_size = RECORD_HEADER.unpack(header)
+
+            point_bytes = count * LANDMARK_FIELDS * 4
+            payload = f.read(point_bytes + thumb_size)
+            if len(payload) < point_bytes + thumb_size:
+                return
+
+            points = np.frombuffer(payload[:point_bytes], dtype='<f4').reshape(count, LANDMARK_FIELDS)
+            landmarks = [[int(x), int(y), int(z)] for x, y, z in points]
+            yield TraceRecord(index, timestamp, landmarks, payload[point_bytes:] or None)
+
+
+class TraceReplaySource(FrameSource):
+    """
+    Frame source that plays a trace back at real-time or maximum speed.
+    The landmarks for the frame returned by the last read() are available
+    as `landmarks`, so the pose stage can be skipped entirely.
+    """
+
+    provides_landmarks = True
+
+    def __init__(self, path, realtime=True, loop=False, prefetch=0):
+        super().__init__(prefetch)
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.records = []
+        self._position = 0
+        self._pacer = None
+        self._blank = None
+
+    @property
+    def landmarks(self):
+        return self.metadata or []
+
+    def _open(self):
+        self.width, self.height = read_trace_header(self.path)
+        self.records = list(read_trace(self.path))
+        if not self.records:
+            raise IOError(f"Trace has no frames: {self.path}")
+        duration = self.records[-1].timestamp - self.records[0].timestamp
+        self.fps = (len(self.records) - 1) / duration if duration > 0 else 30.0
+        self._pacer = Pacer() if self.realtime else None
+        self._blank = np.full((self.height, self.width, 3), 64, dtype=np.uint8)
+
+    def _grab(self):
+        if self._position >= len(self.records):
+            if not self.loop:
+                return None
+            self._position = 0
+            if self._pacer:
+                self._pacer.rebase()
+
+        record = self.records[self._position]
+        self._position += 1
+        if self._pacer:
+            self._pacer.wait_until(record.timestamp)
+
+        if record.thumbnail:
+            small = cv2.imdecode(np.frombuffer(record.thumbnail, dtype=np.uint8), cv2.IMREAD_COLOR)
+            img = cv2.resize(small, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        else:
+            img = self._blank.copy()
+        return img, record.timestamp, record.landmarks
+
+    def _close(self):
+        self.records = []
+
+
+def open_recorder_from_env(frame_size):
+    """Create a TraceRecorder if TRYON_RECORD_TRACE is set"""
+    path = os.getenv('TRYON_RECORD_TRACE')
+    if not path:
+        return None
+    thumb_width = int(os.getenv('TRYON_TRACE_THUMBNAIL_WIDTH', '0')) or None
+    print(f"[INFO] Recording landmark trace to {path}")
+    return TraceRecorder(path, frame_size, thumbnail_width=thumb_width)
+
+
+def show_info(path):
+    width, height = read_trace_header(path)
+    records = list(read_trace(path))
+    print(f"Trace: {path}")
+    print(f"Frame size: {width}x{height}")
+    print(f"Frames: {len(records)}")
+    if records:
+        duration = records[-1].timestamp - records[0].timestamp
+        detected = sum(1 for r in records if r.landmarks)
+        thumbs = sum(1 for r in records if r.thumbnail)
+        print(f"Duration: {duration:.2f}s ({len(records) / duration:.1f} fps)" if duration > 0 else "Duration: 0s")
+        print(f"Frames with landmarks: {detected}")
+        print(f"Frames with thumbnails: {thumbs}")
+    print(f"File size: {os.path.getsize(path) / 1024:.1f} KB")
+
+
+def replay(path, realtime, gender, shirt_index):
+    """Run the try-on stages over a trace without display and report timings"""
+    from tryon_pipeline import build_pipeline
+
+    source = TraceReplaySource(path, realtime=realtime).open()
+    pipeline = build_pipeline(source, config={'replace': {'sink': 'null_sink'}})
+    pipeline.select_shirt(gender, shirt_index)
+
+    timings = []
+    while True:
+        start = time.perf_counter()
+        ctx = pipeline.step()
+        if ctx is None:
+            break
+        timings.append((time.perf_counter() - start) * 1000.0)
+    pipeline.close()
+
+    if not timings:
+        print("Trace contained no frames")
+        return
+    timings.sort()
+    total = sum(timings)
+    print(f"Frames: {len(timings)}")
+    print(f"Mean: {total / len(timings):.2f} ms    P95: {timings[int(len(timings) * 0.95) - 1]:.2f} ms")
+    print(f"Throughput: {len(timings) * 1000.0 / total:.1f} fps")
+    print()
+    print(f"  {'Stage':<12} {'Mean ms':>8} {'Max ms':>8}")
+    for name, stats in pipeline.timing_report().items():
+        print(f"  {name:<12} {stats['meanMs']:>8.3f} {stats['maxMs']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay landmark traces")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    info_parser = sub.add_parser('info', help="Show trace summary")
+    info_parser.add_argument('path')
+
+    replay_parser = sub.add_parser('replay', help="Run the try-on stages over a trace")
+    replay_parser.add_argument('path')
+    replay_parser.add_argument('--max-speed', action='store_true', help="Do not pace frames to their timestamps")
+    replay_parser.add_argument('--gender', default='male', choices=['male', 'female'])
+    replay_parser.add_argument('--shirt', type=int, default=1)
+
+    args = parser.parse_args()
+    if args.command == 'info':
+        show_info(args.path)
+    else:
+        replay(args.path, not args.max_speed, args.gender, args.shirt)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Lifecycle hooks for the Trylia API server
+Shutdown work is registered once when the app is built and run exactly once,
+whether the process exits on a signal, at the end of app.run() or from a
+gunicorn worker_exit hook.
+"""
+
+import sys
+import signal
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """Shutdown hooks, run in reverse order of registration"""
+
+    def __init__(self):
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._shut_down = False
+
+    def on_shutdown(self, hook):
+        self._hooks.append(hook)
+        return hook
+
+    def shutdown(self):
+        with self._lock:
+            if self._shut_down:
+                return
+            self._shut_down = True
+
+        logger.info("Cleaning up...")
+        for hook in reversed(self._hooks):
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"Shutdown hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+    def install_signal_handlers(self, signals=(signal.SIGINT, signal.SIGTERM)):
+        """
+        Shut down and exit on SIGINT/SIGTERM. Only for a process that runs its
+        own server loop; gunicorn installs its own handlers in workers.
+        """
+        def handler(sig, frame):
+            logger.info("Received shutdown signal")
+            self.shutdown()
+            sys.exit(0)
+
+        for sig in signals:
+            signal.signal(sig, handler)
@@ -0,0 +1,148 @@
+"""
+Incremental reading of the Trylia API server log
+The log is never loaded whole: new lines are read from a saved byte offset,
+the most recent lines are found by seeking backwards from the end of the
+file, and rotation (api_server.log -> api_server.log.1 -> ...) is followed
+by file identity so no lines are skipped or read twice.
+"""
+
+import os
+import re
+import json
+import time
+
+# Line format written before the JSON log (asctime - levelname - message)
+TEXT_LINE = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - ([A-Z]+) - (.*)$')
+
+# Rotated backups that are searched for the checkpointed file
+MAX_BACKUPS = 20
+
+
+def parse_log_line(line):
+    """Log entry dict (ts, level, message, ...) from a JSON or text log line"""
+    line = line.strip()
+    if line.startswith('{'):
+        try:
+            return json.loads(line)
+        except ValueError:
+            pass
+    match = TEXT_LINE.match(line)
+    if match:
+        return {'ts': match.group(1), 'level': match.group(2), 'message': match.group(3)}
+    return {'ts': None, 'level': None, 'message': line}
+
+
+def tail_lines(path, count, block_size=8192):
+    """The last count lines of path, read in blocks from the end of the file"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        # count lines need count newlines before them (plus one at the end)
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    if position > 0:
+        # The first piece is the end of a line that started in an earlier block
+        lines = lines[1:]
+    return [line.decode('utf-8', errors='replace') for line in lines[-count:]] if count else []
+
+
+def file_identity(stat_result):
+    return [stat_result.st_dev, stat_result.st_ino]
+
+
+class IncrementalLogReader:
+    """
+    Reads lines appended to a log since the last read. The position is kept
+    in memory and, when checkpoint_path is given, saved there as JSON so
+    the next run carries on where this one stopped. Only complete lines are
+    returned; a line still being written is read on the next call.
+    """
+
+    def __init__(self, path, checkpoint_path=None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.identity = None
+        self.offset = 0
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            try:
+                with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                    checkpoint = json.load(f)
+                self.identity, self.offset = checkpoint['identity'], checkpoint['offset']
+            except (OSError, ValueError, KeyError):
+                # Unreadable checkpoint: start from the beginning
+                pass
+
+    def seek_to_end(self):
+        """Skip everything written so far"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        self.identity, self.offset = file_identity(stat), stat.st_size
+
+    def save(self):
+        if not self.checkpoint_path:
+            return
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'identity': self.identity, 'offset': self.offset, 'path': self.path}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _pending_files(self):
+        """(path, start offset, is current file) for each file with unread lines, oldest first"""
+        try:
+            current = file_identity(os.stat(self.path))
+        except FileNotFoundError:
+            return []
+        if self.identity is None:
+            return [(self.path, 0, True)]
+        if current == self.identity:
+            # A smaller file than the checkpoint means it was truncated in place
+            return [(self.path, self.offset if os.path.getsize(self.path) >= self.offset else 0, True)]
+
+        # The file was rotated: finish the old one, then read every newer backup
+        backups = []
+        for n in range(1, MAX_BACKUPS + 1):
+            backup = f'{self.path}.{n}'
+            try:
+                identity = file_identity(os.stat(backup))
+            except FileNotFoundError:
+                break
+            if identity == self.identity:
+                backups.append((backup, self.offset, False))
+                return list(reversed(backups)) + [(self.path, 0, True)]
+            backups.append((backup, 0, False))
+        # The checkpointed file has been rotated away entirely
+        return [(self.path, 0, True)]
+
+    def read(self):
+        """Yield new lines; the checkpoint is saved when the generator finishes"""
+        try:
+            for path, offset, is_current in self._pending_files():
+                with open(path, 'rb') as f:
+                    identity = file_identity(os.fstat(f.fileno()))
+                    f.seek(offset)
+                    self.identity, self.offset = identity, offset
+                    for raw in iter(f.readline, b''):
+                        if is_current and not raw.endswith(b'\n'):
+                            # Incomplete last line, wait for the rest
+                            break
+                        self.offset += len(raw)
+                        yield raw.decode('utf-8', errors='replace').rstrip('\r\n')
+        finally:
+            self.save()
+
+    def follow(self, poll_interval=1.0, stop=None):
+        """Yield lines as they are written, until stop() returns True"""
+        while stop is None or not stop():
+            got_lines = False
+            for line in self.read():
+                got_lines = True
+                yield line
+            if not got_lines:
+                time.sleep(poll_interval)
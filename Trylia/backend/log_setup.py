@@ -0,0 +1,208 @@
+"""
+Logging setup for the Trylia API server
+Log calls only put the record on a bounded queue; a background listener
+formats it and writes JSON lines to a size- and time-rotated file and plain
+text to stdout. When the queue is full records are dropped and counted
+instead of blocking the request thread.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, request, has_request_context
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Record attributes that are written as top-level JSON fields when present
+EXTRA_FIELDS = ('request_id', 'duration_ms', 'method', 'path', 'status')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        elif record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotates when the file reaches max_bytes or every interval seconds,
+    whichever comes first. Backups are numbered as with RotatingFileHandler.
+    """
+
+    def __init__(self, filename, max_bytes, interval, backup_count, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+
+    def shouldRollover(self, record):
+        if self.interval and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class RequestContextFilter(logging.Filter):
+    """Tags records logged while handling a request with its request ID"""
+
+    def filter(self, record):
+        if getattr(record, 'request_id', None) is None and has_request_context():
+            record.request_id = g.get('request_id')
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Merge the arguments now, but keep the traceback out of the message
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class LogListener(QueueListener):
+    """QueueListener whose stop() waits for room instead of failing on a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogging:
+    """The installed queue handler and listener"""
+
+    def __init__(self, handler, listener, log_file):
+        self.handler = handler
+        self.listener = listener
+        self.log_file = log_file
+        self._stopped = False
+
+    def stats(self):
+        return {'queued': self.handler.queue.qsize(), 'queueSize': self.handler.queue.maxsize,
+                'dropped': self.handler.dropped, 'file': self.log_file}
+
+    def stop(self):
+        """Write out everything still queued and stop the listener"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        if self.handler.dropped:
+            print(f"{self.handler.dropped} log records were dropped because the log queue was full",
+                  file=sys.stderr)
+
+
+_async_logging = None
+
+
+def configure_logging(log_file=None, level=None, queue_size=None):
+    """
+    Route the root logger through a bounded queue. Settings come from
+    LOG_FILE (api_server.log), LOG_LEVEL (INFO), LOG_QUEUE_SIZE (10000),
+    LOG_MAX_BYTES (10 MB), LOG_ROTATE_HOURS (24) and LOG_BACKUP_COUNT (5).
+    An empty LOG_FILE logs to stdout only. Only the first call in a process
+    installs anything.
+    """
+    global _async_logging
+    if _async_logging is not None:
+        return _async_logging
+
+    log_file = os.getenv('LOG_FILE', 'api_server.log') if log_file is None else log_file
+    level = level or os.getenv('LOG_LEVEL', 'INFO').upper()
+    queue_size = queue_size or int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [console_handler]
+    if log_file:
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_file,
+            max_bytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            interval=float(os.getenv('LOG_ROTATE_HOURS', '24')) * 3600,
+            backup_count=int(os.getenv('LOG_BACKUP_COUNT', '5'))
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.insert(0, file_handler)
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RequestContextFilter())
+    listener = LogListener(handler.queue, *handlers)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+    listener.start()
+
+    _async_logging = AsyncLogging(handler, listener, log_file)
+    atexit.register(_async_logging.stop)
+    return _async_logging
+
+
+def init_request_logging(app):
+    """
+    Give every request an ID (X-Request-ID, generated if the client sent
+    none) and log one line per request with its status and duration.
+    """
+    access_logger = logging.getLogger('trylia.access')
+
+    @app.before_request
+    def start_request_timer():
+        g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex[:16]
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        duration_ms = round((time.perf_counter() - g.request_started) * 1000, 2)
+        response.headers['X-Request-ID'] = g.request_id
+        access_logger.info(
+            f"{request.method} {request.path} {response.status_code} {duration_ms}ms",
+            extra={'request_id': g.request_id, 'duration_ms': duration_ms, 'method': request.method,
+                   'path': request.path, 'status': response.status_code}
+        )
+        return response
@@ -74,10 +74,11 @@ def test_contact_submit_endpoint():
             timeout=10
         )
         
-        if response.status_code == 200:
+        if response.status_code == 202:
             print("✅ Contact submit endpoint working!")
             data = response.json()
             print(f"   Response: {data['message']}")
+            print(f"   Tracking ID: {data['trackingId']}")
             return True
         else:
             print(f"❌ Contact submit endpoint failed with status: {response.status_code}")
@@ -0,0 +1,449 @@
+"""
+Metrics primitives for the Trylia backend
+Fixed-bucket histograms, try-on frame metrics reported by workers, API
+request and operation latency, and Prometheus text rendering
+"""
+
+import json
+import time
+import weakref
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Bucket upper bounds in milliseconds; the final +Inf bucket is implicit
+FRAME_BUCKETS_MS = (1, 2, 5, 10, 15, 20, 25, 33, 50, 75, 100, 150, 250, 500, 1000)
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+METRICS_LINE_PREFIX = "[METRICS] "
+
+
+class Histogram:
+    """Cumulative histogram over fixed bucket bounds"""
+
+    def __init__(self, buckets=FRAME_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        for i, value in enumerate(other.counts):
+            self.counts[i] += value
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th quantile"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, value in enumerate(self.counts):
+            seen += value
+            if seen >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'sum': round(self.sum, 3), 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data['buckets'])
+        hist.counts = list(data['counts'])
+        hist.sum = float(data['sum'])
+        hist.count = int(data['count'])
+        return hist
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'meanMs': round(self.sum / self.count, 3) if self.count else 0.0,
+            'p50Ms': self.quantile(0.5),
+            'p95Ms': self.quantile(0.95),
+            'p99Ms': self.quantile(0.99)
+        }
+
+
+class FrameMetrics:
+    """
+    Worker-side frame metrics: per-stage timing histograms, whole-frame time,
+    end-to-end frame age (capture to display) and dropped frames. Attach to a
+    TryOnPipeline with pipeline.frame_listeners.append(metrics.observe_frame).
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+        self.stages = {}
+        self.frame_time = Histogram()
+        self.frame_age = Histogram()
+        self.frames = 0
+        self.dropped_frames = 0
+        self.started_at = time.time()
+        self._last_captured_at = None
+
+    def observe_frame(self, ctx):
+        total = 0.0
+        for name, elapsed_ms in ctx.timings.items():
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = Histogram()
+            hist.observe(elapsed_ms)
+            total += elapsed_ms
+        self.frame_time.observe(total)
+        self.frames += 1
+
+        if ctx.captured_at:
+            self.frame_age.observe((time.monotonic() - ctx.captured_at) * 1000.0)
+            self._count_gaps(ctx.captured_at)
+
+    def _count_gaps(self, captured_at):
+        # Live sources drop frames silently in the driver when we fall behind;
+        # estimate them from gaps larger than the nominal frame interval.
+        source = self.source
+        if source is not None and source.live and source.fps and self._last_captured_at is not None:
+            interval = 1.0 / source.fps
+            gap = captured_at - self._last_captured_at
+            if gap > interval * 1.5:
+                self.dropped_frames += int(round(gap / interval)) - 1
+        self._last_captured_at = captured_at
+
+    def snapshot(self):
+        dropped = self.dropped_frames
+        if self.source is not None:
+            dropped += self.source.dropped_frames
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        return {
+            'frames': self.frames,
+            'droppedFrames': dropped,
+            'fps': round(self.frames / elapsed, 2),
+            'startedAt': self.started_at,
+            'stages': {name: hist.to_dict() for name, hist in self.stages.items()},
+            'frameTime': self.frame_time.to_dict(),
+            'frameAge': self.frame_age.to_dict()
+        }
+
+    def format_line(self):
+        """Snapshot as a single stdout line for the API server to pick up"""
+        return METRICS_LINE_PREFIX + json.dumps(self.snapshot(), separators=(',', ':'))
+
+
+class PeriodicReporter:
+    """Frame listener that prints FrameMetrics lines at a fixed interval"""
+
+    def __init__(self, metrics, interval=2.0, emit=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.emit = emit or (lambda line: print(line, flush=True))
+        self._next = time.monotonic() + interval
+
+    def __call__(self, ctx):
+        self.metrics.observe_frame(ctx)
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            self.emit(self.metrics.format_line())
+
+    def flush(self):
+        self.emit(self.metrics.format_line())
+
+
+def parse_metrics_line(line):
+    """Return the snapshot dict for a worker metrics line, or None"""
+    if not line.startswith(METRICS_LINE_PREFIX):
+        return None
+    try:
+        return json.loads(line[len(METRICS_LINE_PREFIX):])
+    except ValueError:
+        return None
+
+
+class TryOnMetricsAggregator:
+    """
+    Server-side aggregation of worker snapshots. Snapshots are cumulative per
+    worker, so the latest one replaces the previous; when a worker exits its
+    final snapshot is folded into the retired totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._live = {}
+        self._retired = self._empty()
+        self._sessions = 0
+
+    @staticmethod
+    def _empty():
+        return {'frames': 0, 'droppedFrames': 0, 'stages': {},
+                'frameTime': Histogram(), 'frameAge': Histogram()}
+
+    def update(self, worker_id, snapshot):
+        with self._lock:
+            if worker_id not in self._live:
+                self._sessions += 1
+            self._live[worker_id] = snapshot
+
+    def retire(self, worker_id):
+        with self._lock:
+            snapshot = self._live.pop(worker_id, None)
+            if snapshot is not None:
+                self._fold(self._retired, snapshot)
+
+    @staticmethod
+    def _fold(totals, snapshot):
+        totals['frames'] += snapshot.get('frames', 0)
+        totals['droppedFrames'] += snapshot.get('droppedFrames', 0)
+        for name, data in snapshot.get('stages', {}).items():
+            hist = totals['stages'].get(name)
+            if hist is None:
+                hist = totals['stages'][name] = Histogram(data['buckets'])
+            hist.merge(Histogram.from_dict(data))
+        totals['frameTime'].merge(Histogram.from_dict(snapshot['frameTime']))
+        totals['frameAge'].merge(Histogram.from_dict(snapshot['frameAge']))
+
+    def totals(self):
+        with self._lock:
+            totals = self._empty()
+            self._fold_totals(totals, self._retired)
+            for snapshot in self._live.values():
+                self._fold(totals, snapshot)
+            live = {str(worker_id): {'frames': s.get('frames', 0), 'fps': s.get('fps', 0.0),
+                                     'droppedFrames': s.get('droppedFrames', 0)}
+                    for worker_id, s in self._live.items()}
+            return totals, live, self._sessions
+
+    @staticmethod
+    def _fold_totals(target, source):
+        target['frames'] += source['frames']
+        target['droppedFrames'] += source['droppedFrames']
+        for name, hist in source['stages'].items():
+            target['stages'].setdefault(name, Histogram(hist.buckets)).merge(hist)
+        target['frameTime'].merge(source['frameTime'])
+        target['frameAge'].merge(source['frameAge'])
+
+    def to_json(self):
+        totals, live, sessions = self.totals()
+        return {
+            'sessions': sessions,
+            'liveWorkers': live,
+            'frames': totals['frames'],
+            'droppedFrames': totals['droppedFrames'],
+            'stages': {name: dict(hist.summary(), histogram=hist.to_dict())
+                       for name, hist in totals['stages'].items()},
+            'frameTime': dict(totals['frameTime'].summary(), histogram=totals['frameTime'].to_dict()),
+            'frameAge': dict(totals['frameAge'].summary(), histogram=totals['frameAge'].to_dict())
+        }
+
+    def to_prometheus(self):
+        totals, live, sessions = self.totals()
+        lines = []
+        lines += render_counter('trylia_tryon_sessions_total', 'Try-on worker sessions started', sessions)
+        lines += render_counter('trylia_tryon_frames_total', 'Frames processed by try-on workers', totals['frames'])
+        lines += render_counter('trylia_tryon_dropped_frames_total', 'Frames dropped by try-on workers',
+                                totals['droppedFrames'])
+        lines += render_gauge('trylia_tryon_live_workers', 'Try-on workers currently reporting', len(live))
+
+        lines.append('# HELP trylia_tryon_stage_duration_ms Time spent per pipeline stage')
+        lines.append('# TYPE trylia_tryon_stage_duration_ms histogram')
+        for name, hist in sorted(totals['stages'].items()):
+            lines += render_histogram_samples('trylia_tryon_stage_duration_ms', hist, {'stage': name})
+
+        lines += render_histogram('trylia_tryon_frame_duration_ms', 'Total pipeline time per frame',
+                                  totals['frameTime'])
+        lines += render_histogram('trylia_tryon_frame_age_ms', 'Time from capture to display',
+                                  totals['frameAge'])
+        return '\n'.join(lines) + '\n'
+
+
+class _Shard:
+    """One thread's histograms and gauges, written only by that thread"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.gauges = {}
+
+
+class ThreadShardedMetrics:
+    """
+    Histograms and gauges keyed by (name, labels). Each thread records into
+    its own shard without taking a lock; readers merge all shards. When a
+    thread exits its shard is folded into the retired totals.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._shards = weakref.WeakSet()
+        self._retired = _Shard()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.add(shard)
+            weakref.finalize(shard, self._retire, shard.histograms, shard.gauges)
+        return shard
+
+    def _retire(self, histograms, gauges):
+        with self._lock:
+            self._fold(self._retired, histograms, gauges)
+
+    def _fold(self, target, histograms, gauges):
+        for key, hist in list(histograms.items()):
+            target.histograms.setdefault(key, Histogram(self.buckets)).merge(hist)
+        for key, value in list(gauges.items()):
+            target.gauges[key] = target.gauges.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Record value in the histogram name{labels}; labels is a tuple of (key, value)"""
+        histograms = self._shard().histograms
+        hist = histograms.get((name, labels))
+        if hist is None:
+            hist = histograms[(name, labels)] = Histogram(self.buckets)
+        hist.observe(value)
+
+    def add(self, name, labels, delta):
+        """Move the gauge name{labels} by delta"""
+        gauges = self._shard().gauges
+        gauges[(name, labels)] = gauges.get((name, labels), 0) + delta
+
+    def collect(self):
+        """Merged (histograms, gauges) over all threads"""
+        totals = _Shard()
+        with self._lock:
+            self._fold(totals, self._retired.histograms, self._retired.gauges)
+            shards = list(self._shards)
+        for shard in shards:
+            self._fold(totals, shard.histograms, shard.gauges)
+        del shards
+        return totals.histograms, totals.gauges
+
+
+class OperationTimer:
+    """Outcome of a timed operation; set ok = False for a failure without exception"""
+
+    def __init__(self):
+        self.ok = True
+
+
+class ServiceMetrics(ThreadShardedMetrics):
+    """API request latency, requests in flight and internal operation timings"""
+
+    HELP = {
+        'trylia_http_request_duration_ms': 'API request latency by route and status',
+        'trylia_http_requests_in_flight': 'API requests currently being handled',
+        'trylia_operation_duration_ms': 'Internal operation latency (validation, SMTP sends, camera probe, worker spawn)',
+        'trylia_worker_unhealthy_total': 'Try-on workers found stalled, slow or without a first frame, by reason',
+        'trylia_worker_restarts_total': 'Try-on workers restarted by the watchdog',
+        'trylia_worker_spawns_total': 'Try-on workers started, from the warm spare or as a new process',
+    }
+    COUNTERS = ('trylia_worker_unhealthy_total', 'trylia_worker_restarts_total', 'trylia_worker_spawns_total')
+
+    def request_started(self, method, route):
+        self.add('trylia_http_requests_in_flight', (('method', method), ('route', route)), 1)
+
+    def request_finished(self, method, route, status, elapsed_ms):
+        self.add('trylia_http_requests_in_flight', (('method', method), ('route', route)), -1)
+        self.observe('trylia_http_request_duration_ms',
+                     (('method', method), ('route', route), ('status', str(status))), elapsed_ms)
+
+    def count(self, name, labels=(), value=1):
+        """Increment one of the COUNTERS"""
+        self.add(name, tuple(labels), value)
+
+    @contextmanager
+    def operation(self, name):
+        """Time the block as operation name; an exception counts as an error"""
+        timer = OperationTimer()
+        started = time.perf_counter()
+        try:
+            yield timer
+        except BaseException:
+            timer.ok = False
+            raise
+        finally:
+            self.observe('trylia_operation_duration_ms',
+                         (('operation', name), ('outcome', 'ok' if timer.ok else 'error')),
+                         (time.perf_counter() - started) * 1000.0)
+
+    def to_prometheus(self):
+        histograms, gauges = self.collect()
+        lines = []
+        for name in ('trylia_http_request_duration_ms', 'trylia_operation_duration_ms'):
+            lines += [f'# HELP {name} {self.HELP[name]}', f'# TYPE {name} histogram']
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric == name:
+                    lines += render_histogram_samples(name, hist, dict(labels))
+        name = 'trylia_http_requests_in_flight'
+        lines += [f'# HELP {name} {self.HELP[name]}', f'# TYPE {name} gauge']
+        for (metric, labels), value in sorted(gauges.items()):
+            if metric == name:
+                lines.append(f'{name}{format_labels(dict(labels))} {_format_value(value)}')
+        for name in self.COUNTERS:
+            lines += [f'# HELP {name} {self.HELP[name]}', f'# TYPE {name} counter']
+            for (metric, labels), value in sorted(gauges.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(dict(labels))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by the API server and the email service
+service_metrics = ServiceMetrics()
+
+
+# --- Prometheus text format ---
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in sorted(labels.items()):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render_counter(name, help_text, value, labels=None):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} counter',
+            f'{name}{format_labels(labels)} {_format_value(value)}']
+
+
+def render_gauge(name, help_text, value, labels=None):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} gauge',
+            f'{name}{format_labels(labels)} {_format_value(value)}']
+
+
+def render_histogram_samples(name, hist, labels=None):
+    labels = dict(labels or {})
+    lines = []
+    cumulative = 0
+    for bound, value in zip(list(hist.buckets) + [float('inf')], hist.counts):
+        cumulative += value
+        bucket_labels = dict(labels, le=_format_value(float(bound)) if bound != float('inf') else '+Inf')
+        lines.append(f'{name}_bucket{format_labels(bucket_labels)} {cumulative}')
+    lines.append(f'{name}_sum{format_labels(labels)} {_format_value(float(hist.sum))}')
+    lines.append(f'{name}_count{format_labels(labels)} {hist.count}')
+    return lines
+
+
+def render_histogram(name, help_text, hist, labels=None):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} histogram'] + \
+        render_histogram_samples(name, hist, labels)
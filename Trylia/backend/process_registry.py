@@ -0,0 +1,347 @@
+"""
+Try-on process registry for the Trylia API server
+Tracks the single running try-on worker. The in-memory backend serves one
+API process; the SQLite backend lets several API worker processes (e.g.
+under gunicorn) share the session, so any of them can report or stop it.
+Registries also keep the records of try-on sessions (see tryon_sessions)
+for status requests that reach another API process.
+"""
+
+import os
+import json
+import time
+import signal
+import sqlite3
+import threading
+import subprocess
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a graceful exit before killing the worker
+STOP_TIMEOUT = 5
+# Session records kept by the shared backend
+SESSION_HISTORY = 100
+
+
+def stop_process(process):
+    """Terminate a Popen we own, killing it if it does not exit in time"""
+    # Its exit status is then expected, whatever it is (1 on Windows)
+    process.stop_requested = True
+    if process.poll() is not None:
+        return
+    try:
+        logger.info(f"Stopping try-on process (PID: {process.pid})")
+        # Try graceful termination first
+        process.terminate()
+        process.wait(timeout=STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        # Force kill if graceful termination fails
+        logger.warning("Graceful termination failed, force killing process")
+        process.kill()
+        process.wait()
+    except Exception as e:
+        logger.error(f"Error stopping process: {e}")
+    logger.info("Try-on process stopped")
+
+
+class InProcessRegistry:
+    """The try-on worker as a Popen held by this API process"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._process = None
+        self._lock = threading.Lock()
+
+    def start(self, spawn):
+        """Stop any running worker, then start a new one with spawn() -> Popen"""
+        with self._lock:
+            if self._process is not None:
+                stop_process(self._process)
+                self._process = None
+            self._process = spawn()
+            return self._process
+
+    def replace(self, spawn):
+        """
+        Start a new worker with spawn() -> Popen, then stop the previous one.
+        The new worker must wait for anything the old one holds (the camera).
+        """
+        with self._lock:
+            previous, self._process = self._process, spawn()
+            if previous is not None:
+                stop_process(previous)
+            return self._process
+
+    def stop(self):
+        with self._lock:
+            if self._process is not None:
+                stop_process(self._process)
+                self._process = None
+
+    def stop_owned(self):
+        """Stop the worker if this API process started it (always, here)"""
+        self.stop()
+
+    def save_session(self, record, version):
+        """Sessions are only known to the SessionManager of this process"""
+
+    def load_session(self, session_id):
+        return None
+
+    def status(self):
+        # No lock: a stop holds it for up to STOP_TIMEOUT seconds
+        process = self._process
+        return {
+            'isRunning': process is not None and process.poll() is None,
+            'pid': process.pid if process else None
+        }
+
+
+class SQLiteProcessRegistry:
+    """
+    The try-on worker recorded in a SQLite file shared by all API workers.
+    Starts and stops take a write lock (BEGIN IMMEDIATE), so they are
+    serialized across processes. Workers started by another API process are
+    signalled by PID after checking that the PID still belongs to a try-on
+    worker. Session records go to a second file next to path, so their
+    writes never wait for a start or stop in progress. Requires a POSIX
+    system.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, command_marker='tryon_service.py'):
+        if os.name == 'nt':
+            raise RuntimeError("The sqlite process registry requires a POSIX system")
+        self.path = path
+        root, ext = os.path.splitext(path)
+        self.sessions_path = f'{root}-sessions{ext or ".db"}'
+        self.command_marker = command_marker.encode('utf-8')
+        self._owned = {}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tryon_process (
+                    slot INTEGER PRIMARY KEY CHECK (slot = 1),
+                    pid INTEGER NOT NULL,
+                    owner_pid INTEGER NOT NULL,
+                    started_at TEXT NOT NULL
+                )
+            """)
+        conn = self._connect(self.sessions_path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tryon_session (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL UNIQUE,
+                    version INTEGER NOT NULL,
+                    record TEXT NOT NULL
+                )
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self, path=None):
+        conn = sqlite3.connect(path or self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _is_alive(self, pid):
+        """True if pid is a running (not zombie) try-on worker"""
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return False
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                if f.read().rsplit(b')', 1)[-1].split()[0] == b'Z':
+                    return False
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                return self.command_marker in f.read()
+        except OSError:
+            # No /proc (e.g. macOS): trust the signal check
+            return True
+
+    def _stop_pid(self, pid):
+        process = self._owned.pop(pid, None)
+        if process is not None:
+            stop_process(process)
+            return
+        if not self._is_alive(pid):
+            return
+        logger.info(f"Stopping try-on process started by another API worker (PID: {pid})")
+        try:
+            os.kill(pid, signal.SIGTERM)
+            deadline = time.monotonic() + STOP_TIMEOUT
+            while self._is_alive(pid) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if self._is_alive(pid):
+                logger.warning("Graceful termination failed, force killing process")
+                os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        logger.info("Try-on process stopped")
+
+    def _locked(self, action):
+        """Run action(conn, row) inside a cross-process write transaction"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute("SELECT pid, owner_pid FROM tryon_process WHERE slot = 1").fetchone()
+                try:
+                    result = action(conn, row)
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                conn.execute('COMMIT')
+                return result
+            finally:
+                conn.close()
+
+    def start(self, spawn):
+        """Stop any running worker, then start a new one with spawn() -> Popen"""
+        def action(conn, row):
+            if row is not None:
+                self._stop_pid(row[0])
+                conn.execute("DELETE FROM tryon_process WHERE slot = 1")
+            process = spawn()
+            # Forget workers that have exited or been stopped by another API worker
+            self._owned = {pid: p for pid, p in self._owned.items() if p.poll() is None}
+            self._owned[process.pid] = process
+            conn.execute(
+                "INSERT INTO tryon_process (slot, pid, owner_pid, started_at) VALUES (1, ?, ?, ?)",
+                (process.pid, os.getpid(), datetime.now().isoformat())
+            )
+            return process
+        return self._locked(action)
+
+    def replace(self, spawn):
+        """
+        Start a new worker with spawn() -> Popen, then stop the previous one.
+        The new worker must wait for anything the old one holds (the camera).
+        """
+        def action(conn, row):
+            process = spawn()
+            self._owned = {pid: p for pid, p in self._owned.items() if p.poll() is None}
+            self._owned[process.pid] = process
+            conn.execute(
+                "INSERT OR REPLACE INTO tryon_process (slot, pid, owner_pid, started_at) VALUES (1, ?, ?, ?)",
+                (process.pid, os.getpid(), datetime.now().isoformat())
+            )
+            if row is not None:
+                self._stop_pid(row[0])
+            return process
+        return self._locked(action)
+
+    def stop(self):
+        def action(conn, row):
+            if row is not None:
+                self._stop_pid(row[0])
+                conn.execute("DELETE FROM tryon_process WHERE slot = 1")
+        self._locked(action)
+
+    def stop_owned(self):
+        """Stop the worker only if this API process started it"""
+        def action(conn, row):
+            if row is not None and row[1] == os.getpid():
+                self._stop_pid(row[0])
+                conn.execute("DELETE FROM tryon_process WHERE slot = 1")
+        self._locked(action)
+
+    def save_session(self, record, version):
+        """Store a session record unless a later version is already stored"""
+        conn = self._connect(self.sessions_path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            stored = conn.execute("SELECT version FROM tryon_session WHERE session_id = ?",
+                                  (record['sessionId'],)).fetchone()
+            if stored is None:
+                conn.execute("INSERT INTO tryon_session (session_id, version, record) VALUES (?, ?, ?)",
+                             (record['sessionId'], version, json.dumps(record)))
+                conn.execute("DELETE FROM tryon_session WHERE seq <= (SELECT MAX(seq) FROM tryon_session) - ?",
+                             (SESSION_HISTORY,))
+            elif stored[0] < version:
+                conn.execute("UPDATE tryon_session SET version = ?, record = ? WHERE session_id = ?",
+                             (version, json.dumps(record), record['sessionId']))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def load_session(self, session_id):
+        """A session record saved by any API process, or None"""
+        conn = self._connect(self.sessions_path)
+        try:
+            row = conn.execute("SELECT record FROM tryon_session WHERE session_id = ?", (session_id,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def status(self):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT pid FROM tryon_process WHERE slot = 1").fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return {'isRunning': False, 'pid': None}
+        process = self._owned.get(row[0])
+        running = process.poll() is None if process is not None else self._is_alive(row[0])
+        return {'isRunning': running, 'pid': row[0]}
+
+
+class WarmSpare:
+    """
+    One idle try-on worker started ahead of time, so a start or restart
+    skips the interpreter start and imports. The spare waits for its start
+    command and does not open the camera until then. spawn() -> Popen
+    starts one; discard(process) disposes of one that is no longer needed.
+    """
+
+    def __init__(self, spawn, discard=stop_process):
+        self._spawn = spawn
+        self._discard = discard
+        self._process = None
+        self._lock = threading.Lock()
+
+    def take(self):
+        """The spare, or None if there is none or it has exited"""
+        with self._lock:
+            process, self._process = self._process, None
+        if process is not None and process.poll() is not None:
+            self._discard(process)
+            return None
+        return process
+
+    def refill(self):
+        """Start a spare unless one is waiting"""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+            previous, self._process = self._process, self._spawn()
+        if previous is not None:
+            self._discard(previous)
+
+    def stop(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is not None:
+            self._discard(process)
+
+
+def create_process_registry(backend=None, path=None):
+    """
+    Registry selected by TRYON_STATE_BACKEND ('memory' or 'sqlite'); the
+    SQLite file defaults to TRYON_STATE_PATH or tryon_state.db.
+    """
+    backend = backend or os.getenv('TRYON_STATE_BACKEND', 'memory')
+    if backend == 'memory':
+        return InProcessRegistry()
+    if backend == 'sqlite':
+        return SQLiteProcessRegistry(path or os.getenv('TRYON_STATE_PATH', 'tryon_state.db'))
+    raise ValueError(f"Unknown try-on state backend '{backend}'")
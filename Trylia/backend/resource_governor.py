@@ -0,0 +1,169 @@
+"""
+CPU budget for try-on workers
+Several workers on one host (one per API process, see multi_worker_setup.md)
+each start OpenCV and BLAS thread pools sized for every core, and throughput
+drops from oversubscription. The governor splits the host's CPUs into slots,
+one per concurrently running worker: a worker holds a slot from its start
+command until it exits, is pinned to the slot's CPUs and sizes its thread
+pools to match. Slots are lock files, so the cap holds across API processes
+and a crashed process gives its slots back.
+
+    TRYON_GOVERNOR        1 (default) to enable, 0 to disable
+    TRYON_CPUS            CPUs to share out, e.g. "0-3,6" (default: all usable)
+    TRYON_MAX_SESSIONS    concurrent workers (default: WEB_CONCURRENCY, else 1;
+                          at most one per CPU)
+    TRYON_SLOT_TIMEOUT    seconds a start waits for a free slot (default 10)
+    TRYON_SLOT_DIR        directory of the slot lock files
+"""
+
+import os
+import time
+import tempfile
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Thread pool sizes read by the libraries when they load
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def parse_cpu_list(text):
+    """CPU numbers from a list such as "0-3,6" """
+    cpus = set()
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus):
+    """The inverse of parse_cpu_list, with runs collapsed"""
+    parts = []
+    for cpu in sorted(cpus):
+        if parts and parts[-1][1] == cpu - 1:
+            parts[-1][1] = cpu
+        else:
+            parts.append([cpu, cpu])
+    return ','.join(str(first) if first == last else f'{first}-{last}' for first, last in parts)
+
+
+def usable_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+
+def _try_lock(fd):
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+class CpuSlot:
+    """A held slot; closing its lock file releases it"""
+
+    def __init__(self, index, cpus, fd):
+        self.index = index
+        self.cpus = cpus
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)
+
+
+class ResourceGovernor:
+    """
+    Shares cpus out to at most max_sessions concurrent workers, each pinned
+    to its own contiguous group of CPUs. With a single session the worker
+    gets every CPU and full-size thread pools.
+    """
+
+    def __init__(self, cpus=None, max_sessions=1, slot_dir=None):
+        cpus = sorted(cpus or usable_cpus())
+        self.max_sessions = max(1, min(max_sessions, len(cpus)))
+        size, extra = divmod(len(cpus), self.max_sessions)
+        self.slots = []
+        for index in range(self.max_sessions):
+            start = index * size + min(index, extra)
+            self.slots.append(set(cpus[start:start + size + (index < extra)]))
+        self.threads = size
+        self.slot_dir = slot_dir or os.path.join(tempfile.gettempdir(), 'trylia-cpu-slots')
+        os.makedirs(self.slot_dir, exist_ok=True)
+
+    def thread_env(self):
+        """Environment for a new worker, so its thread pools fit in one slot"""
+        env = {name: str(self.threads) for name in THREAD_ENV_VARS}
+        env['TRYON_NUM_THREADS'] = str(self.threads)
+        return env
+
+    def try_acquire(self):
+        """A free slot, or None if every slot is held"""
+        for index, cpus in enumerate(self.slots):
+            # The layout is part of the name, so differently configured
+            # processes never share a slot by accident
+            path = os.path.join(self.slot_dir, f'slot-{format_cpu_list(cpus)}.lock')
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            if _try_lock(fd):
+                return CpuSlot(index, cpus, fd)
+            os.close(fd)
+        return None
+
+    def acquire(self, timeout=10.0):
+        """A free slot, waiting up to timeout seconds (None waits forever)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            slot = self.try_acquire()
+            if slot is not None or (deadline is not None and time.monotonic() >= deadline):
+                return slot
+            time.sleep(0.05)
+
+
+def create_resource_governor():
+    """Governor configured from the environment, or None if TRYON_GOVERNOR=0"""
+    if os.getenv('TRYON_GOVERNOR', '1') != '1':
+        return None
+    cpus = parse_cpu_list(os.getenv('TRYON_CPUS', '')) or None
+    # One try-on worker can run per API process
+    max_sessions = int(os.getenv('TRYON_MAX_SESSIONS') or os.getenv('WEB_CONCURRENCY') or '1')
+    return ResourceGovernor(cpus, max_sessions, os.getenv('TRYON_SLOT_DIR') or None)
+
+
+def apply_worker_limits(cpus=None):
+    """
+    Worker side: size OpenCV's thread pool from TRYON_NUM_THREADS and pin
+    every thread of this process to cpus.
+    """
+    threads = os.getenv('TRYON_NUM_THREADS')
+    if threads:
+        import cv2
+        cv2.setNumThreads(int(threads))
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return
+    # sched_setaffinity(0) only moves the calling thread; threads the
+    # imports have started already are moved one by one
+    try:
+        tids = [int(tid) for tid in os.listdir('/proc/self/task')]
+    except OSError:
+        tids = [0]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            # The thread has exited
+            pass
@@ -0,0 +1,151 @@
+"""
+Response helpers for the Trylia API server
+Static payloads are serialized and compressed once, then served with strong
+ETags, Cache-Control and 304 handling. Dynamic responses go through a
+pluggable JSON codec (orjson when installed, the standard library otherwise).
+"""
+
+import os
+import json
+import gzip
+import hashlib
+import dataclasses
+from datetime import date, datetime
+
+from flask import Response
+from flask.json.provider import JSONProvider
+
+try:
+    import brotli # type: ignore
+except ImportError:
+    # brotli not installed, static responses are offered with gzip only
+    brotli = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibCodec:
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson # type: ignore
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj, default=_default, option=self._orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+JSON_CODECS = {'json': StdlibCodec, 'orjson': OrjsonCodec}
+
+
+def load_json_codec(name=None):
+    """
+    Codec named by JSON_CODEC ('orjson' or 'json'). The default 'auto'
+    picks orjson when it is installed.
+    """
+    name = (name or os.getenv('JSON_CODEC', 'auto')).lower()
+    if name == 'auto':
+        try:
+            return OrjsonCodec()
+        except ImportError:
+            return StdlibCodec()
+    return JSON_CODECS[name]()
+
+
+class CodecJSONProvider(JSONProvider):
+    """Flask JSON provider backed by a codec from load_json_codec()"""
+
+    mimetype = 'application/json'
+
+    def __init__(self, app, codec=None):
+        super().__init__(app)
+        self.codec = codec or load_json_codec()
+
+    def dumps(self, obj, **kwargs):
+        return self.codec.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return self.codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.codec.dumps(obj) + b'\n', mimetype=self.mimetype)
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts (q > 0), from Accept-Encoding"""
+    encodings = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if coding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            encodings.add(coding.lower())
+    return encodings
+
+
+class PrecomputedResponse:
+    """
+    A payload serialized once, with gzip and (if available) brotli variants.
+    Each variant has its own strong ETag, derived from the identity body.
+    """
+
+    def __init__(self, payload, codec=None, content_type='application/json', max_age=3600):
+        codec = codec or load_json_codec()
+        self.content_type = content_type
+        self.cache_control = f'public, max-age={max_age}'
+        body = codec.dumps(payload) if content_type == 'application/json' else payload
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # (content coding, body, etag), in order of preference
+        self.variants = []
+        if brotli is not None:
+            self.variants.append(('br', brotli.compress(body, quality=11), f'"{digest}-br"'))
+        self.variants.append(('gzip', gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"'))
+        self.identity = (None, body, f'"{digest}"')
+        self._etags = {etag for _, _, etag in self.variants} | {self.identity[2]}
+
+    def _choose(self, accept_encoding):
+        encodings = accepted_encodings(accept_encoding)
+        for variant in self.variants:
+            if variant[0] in encodings and len(variant[1]) < len(self.identity[1]):
+                return variant
+        return self.identity
+
+    def _not_modified(self, if_none_match):
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        # Weak comparison: W/"x" matches "x"
+        tags = {tag[2:] if tag.startswith('W/') else tag for tag in tags}
+        return '*' in tags or bool(tags & self._etags)
+
+    def serve(self, request):
+        """Flask response for request, 304 if the client's copy is current"""
+        coding, body, etag = self._choose(request.headers.get('Accept-Encoding'))
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control, 'Vary': 'Accept-Encoding'}
+        if self._not_modified(request.headers.get('If-None-Match')):
+            return Response(status=304, headers=headers)
+        if coding is not None:
+            headers['Content-Encoding'] = coding
+        return Response(body, status=200, content_type=self.content_type, headers=headers)
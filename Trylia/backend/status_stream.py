@@ -0,0 +1,195 @@
+"""
+Live try-on session status for GET /api/status/stream
+Try-on workers print lifecycle events and throttled live readings (fps,
+size recommendation, confidence) to stdout as [EVENT] lines. The API
+server picks them up while monitoring the worker and publishes them on a
+StatusBroadcaster, which fans every event out to all connected
+Server-Sent Events clients through small bounded per-client buffers.
+"""
+
+import copy
+import json
+import time
+import threading
+from collections import deque
+
+EVENT_LINE_PREFIX = "[EVENT] "
+
+# Live readings; only the latest one matters, so they are coalesced per client
+LIVE_EVENT = 'live'
+# Session state after each lifecycle event
+EVENT_STATES = {
+    'starting': 'starting',
+    'camera_ready': 'starting',
+    'model_loaded': 'starting',
+    'first_frame': 'running',
+    'stopped': 'stopped',
+    'crashed': 'crashed',
+}
+
+
+def format_event_line(event, **data):
+    """A worker event as a single stdout line for the API server to pick up"""
+    return EVENT_LINE_PREFIX + json.dumps(dict(data, event=event), separators=(',', ':'))
+
+
+def parse_event_line(line):
+    """(event, data) for a worker event line, or None"""
+    if not line.startswith(EVENT_LINE_PREFIX):
+        return None
+    try:
+        data = json.loads(line[len(EVENT_LINE_PREFIX):])
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or 'event' not in data:
+        return None
+    return data.pop('event'), data
+
+
+def format_sse(event):
+    """A published event in text/event-stream framing"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+
+class SessionEventReporter:
+    """
+    Worker-side frame listener: emits first_frame once, then a live reading
+    at most every interval seconds
+    """
+
+    def __init__(self, interval=0.5, emit=None):
+        self.interval = interval
+        self.emit = emit or (lambda line: print(line, flush=True))
+        self.frames = 0
+        self._window_start = None
+        self._window_frames = 0
+        self._next = 0.0
+
+    def event(self, event, **data):
+        self.emit(format_event_line(event, **data))
+
+    def __call__(self, ctx):
+        now = time.monotonic()
+        if self.frames == 0:
+            self.event('first_frame')
+            self._window_start, self._next = now, now + self.interval
+        self.frames += 1
+        self._window_frames += 1
+        if now >= self._next:
+            fps = self._window_frames / max(now - self._window_start, 1e-6)
+            self.event(LIVE_EVENT, fps=round(fps, 1), sizeRecommendation=ctx.size_recommendation,
+                       confidence=round(ctx.confidence, 1), frames=self.frames)
+            self._window_start, self._window_frames = now, 0
+            self._next = now + self.interval
+
+
+class Subscription:
+    """One client's buffer of events not yet sent"""
+
+    def __init__(self, broadcaster, buffer_size):
+        self._broadcaster = broadcaster
+        self._events = deque()
+        self._buffer_size = buffer_size
+        self.dropped = 0
+        self.closed = False
+
+    def _put(self, event):
+        # Called with the broadcaster's lock held
+        if event['event'] == LIVE_EVENT:
+            for i, pending in enumerate(self._events):
+                if pending['event'] == LIVE_EVENT:
+                    del self._events[i]
+                    break
+        if len(self._events) >= self._buffer_size:
+            self._events.popleft()
+            self.dropped += 1
+        self._events.append(event)
+
+    def get(self, timeout=None):
+        """Events published since the last call; empty after timeout seconds or once closed"""
+        with self._broadcaster._condition:
+            if not self._events and not self.closed:
+                self._broadcaster._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def close(self):
+        self._broadcaster.unsubscribe(self)
+
+
+class StatusBroadcaster:
+    """
+    Publishes session events to every subscriber. Publishing never blocks
+    on a slow client: each subscriber keeps at most buffer_size events,
+    live readings replace the one still waiting, and beyond that the oldest
+    events are dropped. The latest session state is kept for clients that
+    connect later.
+    """
+
+    def __init__(self, buffer_size=64):
+        self.buffer_size = buffer_size
+        self._condition = threading.Condition()
+        self._subscribers = set()
+        self._sequence = 0
+        # Called with every published event, on the publishing thread
+        self.listeners = []
+        self._session = {'state': 'idle', 'pid': None, 'since': None, 'events': {}, 'live': None, 'error': None}
+
+    def publish(self, event, pid=None, **data):
+        data = dict(data, pid=pid, timestamp=time.time())
+        with self._condition:
+            self._sequence += 1
+            published = {'id': self._sequence, 'event': event, 'data': data}
+            self._record(event, pid, data)
+            for subscriber in self._subscribers:
+                subscriber._put(published)
+            self._condition.notify_all()
+        for listener in self.listeners:
+            listener(published)
+        return published
+
+    def _record(self, event, pid, data):
+        session = self._session
+        if event == 'starting':
+            session.update(pid=pid, events={}, live=None, error=None)
+        elif pid != session['pid']:
+            # Late output of a worker that has since been replaced
+            return
+        if event == LIVE_EVENT:
+            session['live'] = {key: value for key, value in data.items() if key not in ('pid', 'timestamp')}
+            return
+        session['events'][event] = data['timestamp']
+        if event in EVENT_STATES:
+            session.update(state=EVENT_STATES[event], since=data['timestamp'])
+        if event == 'crashed':
+            session['error'] = data.get('error')
+
+    def session(self):
+        """The state of the latest session, its lifecycle timestamps and last live reading"""
+        with self._condition:
+            return copy.deepcopy(self._session)
+
+    def subscribe(self):
+        subscription = Subscription(self, self.buffer_size)
+        with self._condition:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._condition:
+            self._subscribers.discard(subscription)
+            subscription.closed = True
+            self._condition.notify_all()
+
+    def subscriber_count(self):
+        with self._condition:
+            return len(self._subscribers)
+
+    def close_all(self):
+        """Wake and close every subscriber, e.g. at shutdown"""
+        with self._condition:
+            for subscription in self._subscribers:
+                subscription.closed = True
+            self._subscribers.clear()
+            self._condition.notify_all()
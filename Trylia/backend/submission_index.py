@@ -0,0 +1,249 @@
+"""
+Search index over stored contact submissions
+An inverted index of the words in each submission's message and company
+name, plus one bitmap per value of the enumerated form fields (country,
+inquiry type, company size, meeting mode), kept in the submission database
+and updated in the same transaction as every insert.
+
+Submission IDs are split into chunks of 65536. For each term or facet value
+and chunk, the matching IDs are stored either as a sorted array of 16-bit
+offsets (sparse) or as an 8 KB bitmap (dense), as in roaring bitmaps.
+Queries AND the chunk bitmaps together as Python integers.
+"""
+
+import re
+import sys
+import time
+from array import array
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+BITMAP_BYTES = CHUNK_SIZE // 8
+# Containers with more offsets than this are stored as bitmaps
+ARRAY_LIMIT = 4095
+
+# Form field -> column for the enumerated fields that get facet bitmaps
+FACETS = {
+    'country': 'country',
+    'inquiryType': 'inquiry_type',
+    'companySize': 'company_size',
+    'meetingMode': 'meeting_mode',
+}
+TEXT_FIELDS = ('companyName', 'message')
+
+TOKEN = re.compile(r'[^\W_]+')
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 40
+
+# Key of the posting list that holds every indexed submission
+ALL_KEY = '*'
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_postings (
+    key TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    ids BLOB NOT NULL,
+    PRIMARY KEY (key, chunk)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS search_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+INDEX_BATCH_SIZE = 5000
+
+
+def tokenize(text):
+    """Distinct lowercased words of text that are worth indexing"""
+    return {token[:MAX_TERM_LENGTH] for token in TOKEN.findall((text or '').casefold())
+            if len(token) >= MIN_TERM_LENGTH}
+
+
+def term_key(term):
+    return f't:{term}'
+
+
+def facet_key(field, value):
+    return f'f:{field}:{value}'
+
+
+def submission_keys(form_data):
+    """Every posting list key a submission belongs to"""
+    terms = set()
+    for field in TEXT_FIELDS:
+        terms |= tokenize(form_data.get(field))
+    keys = [ALL_KEY] + [term_key(term) for term in terms]
+    keys += [facet_key(field, form_data[field]) for field in FACETS if form_data.get(field)]
+    return keys
+
+
+def _offsets(blob):
+    offsets = array('H')
+    offsets.frombytes(blob)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+if hasattr(int, 'bit_count'):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+
+def container_to_int(blob):
+    """Bitmap of a stored container, bit n set for offset n"""
+    if len(blob) == BITMAP_BYTES:
+        return int.from_bytes(blob, 'little')
+    bitmap = bytearray(BITMAP_BYTES)
+    for offset in _offsets(blob):
+        bitmap[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+def merge_container(blob, offsets):
+    """Container with offsets added, switching to a bitmap once it is dense"""
+    if blob is not None and len(blob) == BITMAP_BYTES:
+        bits = int.from_bytes(blob, 'little')
+        for offset in offsets:
+            bits |= 1 << offset
+        return bits.to_bytes(BITMAP_BYTES, 'little')
+
+    merged = set(_offsets(blob)) if blob else set()
+    merged.update(offsets)
+    if len(merged) > ARRAY_LIMIT:
+        bits = 0
+        for offset in merged:
+            bits |= 1 << offset
+        return bits.to_bytes(BITMAP_BYTES, 'little')
+    stored = array('H', sorted(merged))
+    if sys.byteorder == 'big':
+        stored.byteswap()
+    return stored.tobytes()
+
+
+def _highest_bits(bits, limit):
+    """Up to limit set bit positions of bits, highest first"""
+    found = []
+    while bits and len(found) < limit:
+        position = bits.bit_length() - 1
+        found.append(position)
+        bits ^= 1 << position
+    return found
+
+
+def index_pending(conn):
+    """
+    Add submissions inserted since the last call to the index. Must run in
+    the caller's write transaction, after its inserts.
+    """
+    row = conn.execute("SELECT value FROM search_meta WHERE name = 'indexed_through'").fetchone()
+    indexed_through = row[0] if row else 0
+    columns = ', '.join(FACETS.values())
+    while True:
+        rows = conn.execute(
+            f"SELECT id, company_name, message, {columns} FROM submissions WHERE id > ? ORDER BY id LIMIT ?",
+            (indexed_through, INDEX_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        # Group the new IDs by (key, chunk) so each container is written once
+        additions = {}
+        for row in rows:
+            form_data = {'companyName': row[1], 'message': row[2]}
+            form_data.update(zip(FACETS, row[3:]))
+            chunk, offset = divmod(row[0], CHUNK_SIZE)
+            for key in submission_keys(form_data):
+                additions.setdefault((key, chunk), []).append(offset)
+
+        for (key, chunk), offsets in additions.items():
+            current = conn.execute("SELECT ids FROM search_postings WHERE key = ? AND chunk = ?",
+                                   (key, chunk)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO search_postings (key, chunk, ids) VALUES (?, ?, ?)",
+                         (key, chunk, merge_container(current[0] if current else None, offsets)))
+        indexed_through = rows[-1][0]
+
+    conn.execute("INSERT OR REPLACE INTO search_meta (name, value) VALUES ('indexed_through', ?)",
+                 (indexed_through,))
+
+
+def _id_bounds(conn, since, until):
+    """
+    Lowest and highest submission ID in the date range. IDs grow with
+    submission time, so the range is found via the submitted_at index.
+    """
+    low, high = 0, None
+    if since:
+        row = conn.execute("SELECT id FROM submissions WHERE submitted_at >= ? ORDER BY submitted_at, id LIMIT 1",
+                           (since,)).fetchone()
+        if row is None:
+            return None
+        low = row[0]
+    if until:
+        row = conn.execute("SELECT id FROM submissions WHERE submitted_at < ? ORDER BY submitted_at DESC, id DESC "
+                           "LIMIT 1", (until,)).fetchone()
+        if row is None:
+            return None
+        high = row[0]
+    if high is None:
+        high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM submissions").fetchone()[0]
+    return (low, high) if low <= high else None
+
+
+def _clip(bits, base, low, high):
+    """Bits of a chunk starting at ID base that lie within low..high"""
+    if base + CHUNK_SIZE - 1 > high:
+        bits &= (1 << max(high - base + 1, 0)) - 1
+    if base < low:
+        bits &= ~((1 << (low - base)) - 1)
+    return bits
+
+
+def search(conn, text=None, facets=None, since=None, until=None, limit=20, before=None):
+    """
+    IDs of the newest matching submissions and the total match count.
+    Every word in text and every facet value must match. Pass the last ID
+    of a page as before to get the next page; the total is unaffected.
+    """
+    started = time.perf_counter()
+    keys = [term_key(term) for term in tokenize(text)]
+    keys += [facet_key(field, value) for field, value in (facets or {}).items() if value and field in FACETS]
+    if not keys:
+        keys = [ALL_KEY]
+
+    bounds = _id_bounds(conn, since, until)
+    if bounds is None:
+        return {'ids': [], 'total': 0, 'tookMs': round((time.perf_counter() - started) * 1000, 2)}
+    low, high = bounds
+    first_chunk, last_chunk = low >> CHUNK_BITS, high >> CHUNK_BITS
+
+    # Every key's containers, chunk -> blob; a chunk must be present for all keys
+    containers = []
+    for key in keys:
+        rows = conn.execute("SELECT chunk, ids FROM search_postings WHERE key = ? AND chunk BETWEEN ? AND ?",
+                            (key, first_chunk, last_chunk)).fetchall()
+        containers.append(dict(rows))
+    containers.sort(key=lambda by_chunk: sum(len(blob) for blob in by_chunk.values()))
+    chunks = set(containers[0])
+    for by_chunk in containers[1:]:
+        chunks &= set(by_chunk)
+
+    ids, total = [], 0
+    for chunk in sorted(chunks, reverse=True):
+        bits = -1
+        for by_chunk in containers:
+            bits &= container_to_int(by_chunk[chunk])
+            if not bits:
+                break
+        # Clip the chunks at the ends of the ID range
+        base = chunk << CHUNK_BITS
+        bits = _clip(bits, base, low, high)
+        total += _popcount(bits)
+        if len(ids) < limit:
+            page_bits = bits if before is None else _clip(bits, base, low, int(before) - 1)
+            ids += [base + offset for offset in _highest_bits(page_bits, limit - len(ids))]
+
+    return {'ids': ids, 'total': total, 'tookMs': round((time.perf_counter() - started) * 1000, 2)}
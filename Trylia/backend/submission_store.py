@@ -0,0 +1,272 @@
+"""
+Contact submission store for Trylia Contact Us feature
+Every validated submission is persisted to SQLite (WAL mode) with indexes on
+submission time, email, country and inquiry type, so listing and filtering
+stay fast as history grows. Inserts also update the full-text and facet
+search index (see submission_index.py).
+"""
+
+import os
+import csv
+import io
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import submission_index
+
+# Form field -> column, in export order
+FIELDS = (
+    ('companyName', 'company_name'),
+    ('websiteUrl', 'website_url'),
+    ('contactPerson', 'contact_person'),
+    ('businessEmail', 'business_email'),
+    ('phoneNumber', 'phone_number'),
+    ('companySize', 'company_size'),
+    ('inquiryType', 'inquiry_type'),
+    ('message', 'message'),
+    ('meetingMode', 'meeting_mode'),
+    ('country', 'country'),
+    ('meetingTime', 'meeting_time'),
+)
+
+EXPORT_COLUMNS = ('id', 'trackingId', 'submittedAt') + tuple(field for field, _ in FIELDS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tracking_id TEXT UNIQUE,
+    submitted_at TEXT NOT NULL,
+    company_name TEXT,
+    website_url TEXT,
+    contact_person TEXT,
+    business_email TEXT COLLATE NOCASE,
+    phone_number TEXT,
+    company_size TEXT,
+    inquiry_type TEXT,
+    message TEXT,
+    meeting_mode TEXT,
+    country TEXT,
+    meeting_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_submitted_at ON submissions (submitted_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_email ON submissions (business_email, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_country ON submissions (country, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_inquiry_type ON submissions (inquiry_type, submitted_at);
+"""
+
+# Query parameter -> (column, operator)
+FILTERS = {
+    'email': ('business_email', '='),
+    'country': ('country', '='),
+    'inquiryType': ('inquiry_type', '='),
+    'since': ('submitted_at', '>='),
+    'until': ('submitted_at', '<'),
+}
+
+_COLUMNS = ['tracking_id', 'submitted_at'] + [column for _, column in FIELDS]
+INSERT_SQL = f"INSERT INTO submissions ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})"
+
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+
+
+class SubmissionStore:
+    """SQLite-backed contact submission history with one connection per thread"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('CONTACT_DB_PATH', 'contact_submissions.db')
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA + submission_index.INDEX_SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def add(self, form_data, tracking_id=None, submitted_at=None):
+        """Persist a validated submission and return its row ID"""
+        submitted_at = submitted_at or datetime.now().isoformat()
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(INSERT_SQL, _row_values(form_data, tracking_id, submitted_at))
+            submission_index.index_pending(conn)
+        return cursor.lastrowid
+
+    def add_many(self, submissions):
+        """Persist (form_data, tracking_id) pairs in a single transaction"""
+        submitted_at = datetime.now().isoformat()
+        conn = self._connection()
+        with conn:
+            conn.executemany(INSERT_SQL, [_row_values(form_data, tracking_id, submitted_at)
+                                          for form_data, tracking_id in submissions])
+            submission_index.index_pending(conn)
+
+    @staticmethod
+    def _where(filters):
+        clauses, params = [], []
+        for key, value in (filters or {}).items():
+            if value in (None, '') or key not in FILTERS:
+                continue
+            column, operator = FILTERS[key]
+            clauses.append(f"{column} {operator} ?")
+            params.append(value)
+        return clauses, params
+
+    @staticmethod
+    def _to_dict(row):
+        item = {'id': row['id'], 'trackingId': row['tracking_id'], 'submittedAt': row['submitted_at']}
+        for field, column in FIELDS:
+            item[field] = row[column]
+        return item
+
+    def query(self, filters=None, limit=50, cursor=None):
+        """
+        Newest-first page of submissions. Pass the returned nextCursor back as
+        cursor to get the following page; pagination is keyset-based, so deep
+        pages cost the same as the first one.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = self._where(filters)
+        if cursor is not None:
+            submitted_at, row_id = decode_cursor(cursor)
+            clauses.append("(submitted_at < ? OR (submitted_at = ? AND id < ?))")
+            params += [submitted_at, submitted_at, row_id]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        rows = self._connection().execute(
+            f"SELECT * FROM submissions {where} ORDER BY submitted_at DESC, id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        items = [self._to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last['submittedAt'], last['id'])
+        return {'submissions': items, 'nextCursor': next_cursor}
+
+    def count(self, filters=None):
+        clauses, params = self._where(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._connection().execute(f"SELECT COUNT(*) FROM submissions {where}", params).fetchone()[0]
+
+    def search(self, text=None, facets=None, since=None, until=None, limit=20, cursor=None):
+        """
+        Newest-first submissions containing every word of text and matching
+        every facet value (country, inquiryType, companySize, meetingMode).
+        Returns the page, the total number of matches and nextCursor.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        before = int(cursor) if cursor is not None else None
+        conn = self._connection()
+        self.update_index()
+        result = submission_index.search(conn, text, facets, since, until, limit=limit + 1, before=before)
+
+        ids = result['ids'][:limit]
+        rows = []
+        if ids:
+            placeholders = ', '.join('?' for _ in ids)
+            rows = conn.execute(f"SELECT * FROM submissions WHERE id IN ({placeholders}) ORDER BY id DESC",
+                                ids).fetchall()
+        items = [self._to_dict(row) for row in rows]
+        next_cursor = str(ids[-1]) if len(result['ids']) > limit else None
+        return {'submissions': items, 'total': result['total'], 'nextCursor': next_cursor,
+                'tookMs': result['tookMs']}
+
+    def update_index(self):
+        """Index submissions written before the search index existed"""
+        conn = self._connection()
+        indexed = conn.execute("SELECT value FROM search_meta WHERE name = 'indexed_through'").fetchone()
+        latest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM submissions").fetchone()[0]
+        if latest > (indexed[0] if indexed else 0):
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                submission_index.index_pending(conn)
+
+    def iter_submissions(self, filters=None):
+        """Yield every matching submission, oldest first, without loading them all"""
+        clauses, params = self._where(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        self._connection()  # make sure the schema exists
+        # A dedicated connection keeps a long export from holding the
+        # request thread's connection open in a read transaction
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(f"SELECT * FROM submissions {where} ORDER BY submitted_at, id", params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._to_dict(row)
+        finally:
+            conn.close()
+
+
+def _row_values(form_data, tracking_id, submitted_at):
+    return [tracking_id, submitted_at] + [form_data.get(field) for field, _ in FIELDS]
+
+
+def encode_cursor(submitted_at, row_id):
+    return f"{submitted_at}|{row_id}"
+
+
+def decode_cursor(cursor):
+    """Split a page cursor; raises ValueError if it is malformed"""
+    submitted_at, _, row_id = str(cursor).rpartition('|')
+    if not submitted_at:
+        raise ValueError("Invalid cursor")
+    return submitted_at, int(row_id)
+
+
+def iter_ndjson(submissions):
+    for item in submissions:
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+
+# Leading characters that make a spreadsheet read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """A value as a CSV cell that spreadsheets show as text, never evaluate"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(submissions):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for item in submissions:
+        writer.writerow({key: csv_cell(value) for key, value in item.items()})
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# Global submission store instance
+submission_store = SubmissionStore()
@@ -0,0 +1,153 @@
+"""
+Email template engine for Trylia Contact Us feature
+Templates in email_templates/ are loaded once and compiled into a single join
+of static segments and escaped slots; messages are serialized from prebuilt
+MIME header skeletons instead of going through email.generator
+"""
+
+import os
+import re
+import html
+import base64
+import threading
+from collections import namedtuple
+from email.header import Header
+from email.utils import getaddresses, parseaddr
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'email_templates')
+
+# {{ name }} or {{ name|filter }}
+SLOT_PATTERN = re.compile(r'\{\{\s*(\w+)\s*(?:\|\s*(\w+)\s*)?\}\}')
+
+
+def _nl2br(value):
+    return html.escape(value).replace('\n', '<br>')
+
+
+# Filters applied to slot values; HTML templates escape unless told otherwise.
+# None means the value is inserted as-is.
+HTML_FILTERS = {'escape': html.escape, 'nl2br': _nl2br, 'raw': None}
+TEXT_FILTERS = {'escape': None, 'nl2br': None, 'raw': None}
+
+
+def compile_template(source, filters):
+    """
+    Compile template source into render(context) -> str. The result is one
+    generated ''.join() over the static segments and slot expressions, so
+    rendering costs about the same as an equivalent f-string.
+    """
+    namespace = {}
+    items = []
+    position = 0
+    for index, match in enumerate(SLOT_PATTERN.finditer(source)):
+        namespace[f'_s{index}'] = source[position:match.start()]
+        items.append(f'_s{index}')
+
+        name, filter_name = match.group(1), match.group(2) or 'escape'
+        if filter_name not in filters:
+            raise ValueError(f"Unknown template filter '{filter_name}'")
+        value = f'str(context.get({name!r}) or "")'
+        if filters[filter_name] is not None:
+            namespace[f'_f{index}'] = filters[filter_name]
+            value = f'_f{index}({value})'
+        items.append(value)
+        position = match.end()
+    namespace['_tail'] = source[position:]
+    items.append('_tail')
+
+    code = f"def render(context):\n    return ''.join(({', '.join(items)},))\n"
+    exec(compile(code, '<email template>', 'exec'), namespace)
+    return namespace['render']
+
+
+class EmailTemplate:
+    """HTML and plain-text parts of one email, rendered together"""
+
+    def __init__(self, name, template_dir=TEMPLATE_DIR):
+        self.name = name
+        self.render_html = compile_template(self._read(template_dir, f'{name}.html'), HTML_FILTERS)
+        text_path = os.path.join(template_dir, f'{name}.txt')
+        self.render_text = compile_template(self._read(template_dir, f'{name}.txt'), TEXT_FILTERS) \
+            if os.path.exists(text_path) else None
+
+    @staticmethod
+    def _read(template_dir, filename):
+        with open(os.path.join(template_dir, filename), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def render(self, context):
+        """Return (html, text); text is None when the template has no .txt part"""
+        text_body = self.render_text(context) if self.render_text is not None else None
+        return self.render_html(context), text_body
+
+
+# A message ready for SMTP.sendmail()
+PreparedMessage = namedtuple('PreparedMessage', 'from_addr to_addrs data')
+
+CRLF = b'\r\n'
+# Base64 bodies never contain '=_', so a fixed boundary cannot collide with them
+BOUNDARY = '=_trylia_alternative_part'
+PART_HEADERS = {
+    subtype: (f'--{BOUNDARY}\r\n'
+              f'Content-Type: text/{subtype}; charset="utf-8"\r\n'
+              f'Content-Transfer-Encoding: base64\r\n\r\n').encode('ascii')
+    for subtype in ('plain', 'html')
+}
+CLOSING_BOUNDARY = f'--{BOUNDARY}--\r\n'.encode('ascii')
+
+
+def encode_header(name, value):
+    """One header line; non-ASCII values and line breaks go through RFC 2047"""
+    value = str(value)
+    if value.isascii() and '\r' not in value and '\n' not in value:
+        encoded = value
+    else:
+        encoded = Header(value, 'utf-8', header_name=name).encode(linesep='\r\n')
+    return f'{name}: {encoded}\r\n'.encode('ascii')
+
+
+def encode_body(text):
+    return base64.encodebytes(text.encode('utf-8')).replace(b'\n', CRLF)
+
+
+class MessageSkeleton:
+    """
+    Prebuilt MIME headers for one kind of multipart/alternative message.
+    Fixed headers are encoded once; build() only encodes the per-message
+    headers and bodies.
+    """
+
+    def __init__(self, **headers):
+        self.headers = {name.replace('_', '-'): value for name, value in headers.items()}
+        self._static = b''.join(encode_header(name, value) for name, value in self.headers.items())
+        self._static += (f'MIME-Version: 1.0\r\n'
+                         f'Content-Type: multipart/alternative; boundary="{BOUNDARY}"\r\n').encode('ascii')
+
+    def build(self, html_body, text_body=None, **headers):
+        headers = {name.replace('_', '-'): value for name, value in headers.items()}
+        chunks = [encode_header(name, value) for name, value in headers.items()]
+        chunks += [self._static, CRLF]
+        if text_body is not None:
+            chunks += [PART_HEADERS['plain'], encode_body(text_body)]
+        chunks += [PART_HEADERS['html'], encode_body(html_body), CLOSING_BOUNDARY]
+
+        # Envelope addresses as send_message() would take them from the
+        # headers: To may list several recipients, with display names
+        from_addr = parseaddr(headers.get('From', self.headers.get('From')) or '')[1]
+        to_addrs = [addr for _, addr in getaddresses([headers.get('To', self.headers.get('To')) or '']) if addr]
+        return PreparedMessage(from_addr, to_addrs, b''.join(chunks))
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(name):
+    """Load and compile a template on first use; later calls reuse it"""
+    template = _templates.get(name)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(name)
+            if template is None:
+                template = _templates[name] = EmailTemplate(name)
+    return template
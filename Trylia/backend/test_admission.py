@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test contact form rate limiting and duplicate detection
+"""
+
+from admission import TokenBucketLimiter, DedupCache, ContactAdmission, submission_hash
+
+FORM = {'companyName': 'Acme Co', 'businessEmail': 'jo@acme.com', 'message': 'Hello there, interested.'}
+
+
+def test_token_bucket():
+    """Bursts are allowed up to the bucket size, then tokens refill at the rate"""
+    print("🧪 Testing token buckets...")
+
+    limiter = TokenBucketLimiter(rate=1.0, burst=2, max_keys=2)
+    assert limiter.allow('a', now=0)[0]
+    assert limiter.allow('a', now=0)[0]
+    allowed, retry_after = limiter.allow('a', now=0)
+    assert not allowed and retry_after == 1.0
+    assert limiter.allow('a', now=1.0)[0]
+
+    limiter.allow('b', now=1.0)
+    limiter.allow('c', now=1.0)
+    assert len(limiter) == 2  # 'a' was evicted
+
+    print("✅ Token buckets work")
+
+
+def test_dedup_cache():
+    """Claims expire after the TTL and failed requests can be retried"""
+    print("🧪 Testing duplicate detection...")
+
+    cache = DedupCache(ttl=10, max_entries=100)
+    assert cache.claim('k', now=0) == (True, None)
+    assert cache.claim('k', now=1) == (False, None)
+    cache.complete('k', 't1', now=1)
+    assert cache.claim('k', now=5) == (False, 't1')
+    assert cache.claim('k', now=12) == (True, None)
+    cache.release('k')
+    assert cache.claim('k', now=12) == (True, None)
+
+    assert submission_hash(FORM) == submission_hash(dict(FORM, companyName='  ACME   co'))
+    assert submission_hash(FORM) != submission_hash(dict(FORM, message='Something else entirely'))
+
+    print("✅ Duplicate detection works")
+
+
+def test_admission_flow():
+    """Duplicates are answered before rate limits are consulted"""
+    print("🧪 Testing admission decisions...")
+
+    admission = ContactAdmission()
+    admission.email_limiter = TokenBucketLimiter(rate=0.001, burst=1)
+
+    first = admission.check('10.0.0.1', FORM)
+    assert first.admitted
+    admission.accepted(first, 'track-1')
+
+    repeat = admission.check('10.0.0.1', FORM)
+    assert repeat.status == 'duplicate' and repeat.tracking_id == 'track-1'
+
+    other = admission.check('10.0.0.2', dict(FORM, message='A different message here'))
+    assert other.status == 'rate_limited' and other.retry_after > 0
+
+    assert admission.stats()['deduplicated'] == 1
+    assert admission.stats()['rateLimitedEmail'] == 1
+
+    print("✅ Admission decisions work")
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_dedup_cache()
+    test_admission_flow()
+    print("🎉 All admission tests passed!")
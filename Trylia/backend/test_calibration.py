@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test pose configuration selection and landmark scaling without mediapipe
+"""
+
+import numpy as np
+
+from calibration import select_config, find_landmarks, FPS_HEADROOM, DEFAULT_CONFIG
+
+
+def row(complexity, width, fps):
+    return {'model_complexity': complexity, 'inference_width': width, 'fps': fps}
+
+
+class FakeDetector:
+    """Finds a shoulder at a fixed fraction of whatever frame it is given"""
+
+    def __init__(self):
+        self.sizes = []
+
+    def findPose(self, img, draw=False):
+        self.sizes.append(img.shape[:2])
+
+    def findPosition(self, img, bboxWithHands=False, draw=False):
+        h, w = img.shape[:2]
+        return [[w // 4, h // 2, -7]], None
+
+
+def test_select_config_order():
+    """Higher model complexity wins over inference width; width only breaks ties"""
+    print("🧪 Testing configuration selection...")
+
+    target = 20
+    fast_enough = target * FPS_HEADROOM
+    table = [
+        row(2, 640, fast_enough - 1),
+        row(2, 320, fast_enough),
+        row(1, 640, fast_enough + 10),
+        row(0, 640, 200),
+    ]
+    # The most accurate model is kept, at the lower resolution it can sustain
+    assert select_config(table, target) == {'model_complexity': 2, 'inference_width': 320}
+
+    table[1]['fps'] = fast_enough - 1
+    assert select_config(table, target) == {'model_complexity': 1, 'inference_width': 640}
+
+    # The headroom applies: exactly the target is not enough
+    assert select_config([row(1, 640, target)], target) == {'model_complexity': 1, 'inference_width': 640}
+    assert select_config([row(1, 640, target), row(0, 320, target + 1)], target) == \
+        {'model_complexity': 0, 'inference_width': 320}
+
+    # Nothing fast enough falls back to the fastest, nothing measured to the default
+    assert select_config([row(2, 640, 3), row(0, 480, 9)], target) == {'model_complexity': 0, 'inference_width': 480}
+    assert select_config([], target) == DEFAULT_CONFIG
+
+    print("✅ Configuration selection works")
+
+
+def test_landmarks_map_back_to_full_resolution():
+    """Landmarks found on a downscaled frame come back in full-frame pixels"""
+    print("🧪 Testing landmark scaling...")
+
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    detector = FakeDetector()
+
+    (point,) = find_landmarks(detector, img, inference_width=320)
+    assert detector.sizes[-1] == (240, 320)
+    assert point == [160, 240, -7]
+
+    (point,) = find_landmarks(detector, img, inference_width=None)
+    assert detector.sizes[-1] == (480, 640) and point == [160, 240, -7]
+    find_landmarks(detector, img, inference_width=1280)
+    assert detector.sizes[-1] == (480, 640)
+
+    print("✅ Landmark scaling works")
+
+
+if __name__ == "__main__":
+    test_select_config_order()
+    test_landmarks_map_back_to_full_resolution()
+    print("🎉 All calibration tests passed!")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test incremental parsing of bulk contact imports
+"""
+
+import io
+
+from contact_batch import batch_format, iter_batch_records, BatchLimitExceeded
+
+
+def test_ndjson_and_csv_records():
+    """Records are numbered in order and malformed lines become per-record errors"""
+    print("🧪 Testing batch record parsing...")
+
+    body = b'{"companyName": "Acme"}\n\nnot json\n[1, 2]\n{"companyName": "Beta"}\n'
+    records = list(iter_batch_records(io.BytesIO(body), batch_format('application/x-ndjson'), 1024, 10))
+    assert [number for number, _, _ in records] == [1, 2, 3, 4]
+    assert records[0][1] == {'companyName': 'Acme'}
+    assert records[1][2].startswith('Invalid JSON')
+    assert records[2][2] == 'Each line must be a JSON object'
+
+    body = 'companyName,message\nAcme,"two\nlines"\nBeta,hello\n'.encode('utf-8')
+    records = list(iter_batch_records(io.BytesIO(body), batch_format('text/csv; charset=utf-8'), 1024, 10))
+    assert [data['message'] for _, data, _ in records] == ['two\nlines', 'hello']
+
+    print("✅ Batch record parsing works")
+
+
+def test_limits():
+    """Byte and record limits stop the batch after the records already read"""
+    print("🧪 Testing batch limits...")
+
+    body = b'{"n": 1}\n' * 20
+    seen = []
+    try:
+        for number, _, _ in iter_batch_records(io.BytesIO(body), 'ndjson', 10 ** 6, 5):
+            seen.append(number)
+        assert False, "record limit not enforced"
+    except BatchLimitExceeded:
+        pass
+    assert seen == [1, 2, 3, 4, 5]
+
+    try:
+        list(iter_batch_records(io.BytesIO(body), 'ndjson', 50, 100))
+        assert False, "byte limit not enforced"
+    except BatchLimitExceeded:
+        pass
+    assert len(list(iter_batch_records(io.BytesIO(body), 'ndjson', len(body), 100))) == 20
+
+    print("✅ Batch limits work")
+
+
+if __name__ == "__main__":
+    test_ndjson_and_csv_records()
+    test_limits()
+    print("🎉 All batch import tests passed!")
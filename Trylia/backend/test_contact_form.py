@@ -38,11 +38,11 @@ def test_contact_form_submission():
         
         print(f"📊 Response Status: {response.status_code}")
         
-        if response.status_code == 200:
+        if response.status_code == 202:
             data = response.json()
             print("✅ Contact form submitted successfully!")
-            print(f"📧 Email sent: {data.get('emailSent', 'Unknown')}")
-            print(f"📬 Confirmation sent: {data.get('confirmationSent', 'Unknown')}")
+            print(f"📧 Email queued: {data.get('emailQueued', 'Unknown')}")
+            print(f"🔖 Tracking ID: {data.get('trackingId', 'Unknown')}")
             print(f"💬 Message: {data.get('message', 'No message')}")
             return True
         else:
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test digest mode for internal inquiry notifications
+"""
+
+import time
+import email
+
+from email_service import EmailService, CircuitOpenError
+from email_digest import NotificationDigest
+
+
+class FakeService:
+    """Sends digests, or fails once with fail_with after fail_after of them"""
+
+    def __init__(self, fail_with=None, fail_after=0):
+        self.batches = []
+        self.fail_with = fail_with
+        self.fail_after = fail_after
+
+    def send_contact_digest(self, batches, on_sent=None):
+        sent = []
+        self.batches.append(sent)
+        for batch in batches:
+            if self.fail_with is not None and len(sent) == self.fail_after:
+                error, self.fail_with = self.fail_with, None
+                if not sent:
+                    self.batches.pop()
+                raise error
+            sent.append(len(batch))
+            if on_sent is not None:
+                on_sent()
+
+
+def submission(i):
+    return {'companyName': f'Company {i} <Ltd>', 'inquiryType': 'Demo Request', 'country': 'India',
+            'businessEmail': f'lead{i}@example.com', 'message': 'Line one\nLine two'}
+
+
+def test_count_and_window_flush():
+    """A full digest goes out at once; a partial one after the window"""
+    print("🧪 Testing digest flushing...")
+
+    service = FakeService()
+    results = []
+    digest = NotificationDigest(service, max_items=3, window=0.2,
+                                on_result=lambda tracking_id, sent, error: results.append((tracking_id, sent)))
+    digest.start()
+    for i in range(4):
+        digest.add(f't{i}', submission(i))
+
+    deadline = time.time() + 2
+    while len(results) < 4 and time.time() < deadline:
+        time.sleep(0.02)
+    digest.stop()
+
+    assert service.batches[0][0] == 3
+    assert sum(map(sum, service.batches)) == 4
+    assert sorted(results) == [(f't{i}', True) for i in range(4)]
+
+    print("✅ Digest flushing works")
+
+
+def test_breaker_defers_digest():
+    """While the SMTP breaker is open notifications stay buffered"""
+    print("🧪 Testing deferred digests...")
+
+    service = FakeService(fail_with=CircuitOpenError(30))
+    digest = NotificationDigest(service, max_items=10, window=60)
+    digest.add('t1', submission(1))
+    digest.flush()
+    assert digest.pending() == 1 and service.batches == []
+    digest.flush()
+    assert digest.pending() == 0 and service.batches == [[1]]
+
+    print("✅ Deferred digests work")
+
+
+def test_stop_with_breaker_open():
+    """Notifications the breaker holds back at stop are reported as failed"""
+    print("🧪 Testing stop with the breaker open...")
+
+    service = FakeService(fail_with=CircuitOpenError(30))
+    results = []
+    digest = NotificationDigest(service, max_items=10, window=60,
+                                on_result=lambda tracking_id, sent, error: results.append((tracking_id, sent)))
+    digest.start()
+    digest.add('t1', submission(1))
+    digest.add('t2', submission(2))
+    digest.stop()
+
+    assert digest.pending() == 0 and service.batches == []
+    assert results == [('t1', False), ('t2', False)]
+
+    print("✅ Stop with the breaker open works")
+
+
+def test_partly_sent_digests():
+    """Digests sent before a failure are reported as sent and not sent again"""
+    print("🧪 Testing partly sent digests...")
+
+    results = []
+    service = FakeService(fail_with=CircuitOpenError(30), fail_after=1)
+    digest = NotificationDigest(service, max_items=2, window=60,
+                                on_result=lambda tracking_id, sent, error: results.append((tracking_id, sent)))
+    for i in range(5):
+        digest.add(f't{i}', submission(i))
+    digest.flush()
+    assert service.batches == [[2]] and digest.pending() == 3
+    assert results == [('t0', True), ('t1', True)]
+    digest.flush()
+    assert service.batches == [[2], [2, 1]] and digest.stats()['notificationsSent'] == 5
+    assert [tracking_id for tracking_id, _ in results] == [f't{i}' for i in range(5)]
+
+    results.clear()
+    service = FakeService(fail_with=OSError("Connection reset"), fail_after=1)
+    digest = NotificationDigest(service, max_items=2, window=60,
+                                on_result=lambda tracking_id, sent, error: results.append((tracking_id, sent)))
+    for i in range(3):
+        digest.add(f't{i}', submission(i))
+    digest.flush()
+    assert results == [('t0', True), ('t1', True), ('t2', False)]
+
+    print("✅ Partly sent digests work")
+
+
+def test_digest_email_content():
+    """The digest has a summary row and an escaped details section per submission"""
+    print("🧪 Testing digest email rendering...")
+
+    message = EmailService().create_digest_email([submission(1), submission(2)])
+    parsed = email.message_from_bytes(message.data)
+    text_part, html_part = parsed.get_payload()
+    html_body = html_part.get_payload(decode=True).decode('utf-8')
+    text_body = text_part.get_payload(decode=True).decode('utf-8')
+
+    assert html_body.count('<tr><td>') == 2
+    assert 'Company 2 &lt;Ltd&gt;' in html_body and 'Line one<br>Line two' in html_body
+    assert '2. Company 2 <Ltd> - Demo Request - India' in text_body
+
+    print("✅ Digest email rendering works")
+
+
+if __name__ == "__main__":
+    test_count_and_window_flush()
+    test_breaker_defers_digest()
+    test_stop_with_breaker_open()
+    test_partly_sent_digests()
+    test_digest_email_content()
+    print("🎉 All digest tests passed!")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test background contact email dispatch: delivery status, the circuit
+breaker, a full queue and shutdown
+"""
+
+import time
+import queue
+from unittest import mock
+
+from email_service import CircuitOpenError
+from email_queue import EmailDispatchQueue
+
+FORM = {
+    "companyName": "Acme Corporation",
+    "websiteUrl": "https://acme.com",
+    "contactPerson": "John Smith",
+    "businessEmail": "john.smith@acme.com",
+    "phoneNumber": "+1-555-123-4567",
+    "companySize": "51-200 employees",
+    "inquiryType": "Integration Request",
+    "message": "We are interested in integrating Trylia's virtual try-on technology into our platform.",
+    "meetingMode": "Google Meet",
+    "meetingTime": "2024-12-15T14:00:00",
+    "country": "United States"
+}
+
+
+class FakeService:
+    """Answers each kind of message with a fixed result, or raises it"""
+
+    def __init__(self, contact=(True, 'sent'), confirmation=(True, 'sent')):
+        self.results = {'contact': contact, 'confirmation': confirmation}
+        self.sent = []
+
+    def _send(self, kind, form_data):
+        result = self.results[kind]
+        if isinstance(result, Exception):
+            raise result
+        self.sent.append((kind, form_data['companyName']))
+        return result
+
+    def send_contact_email(self, form_data):
+        return self._send('contact', form_data)
+
+    def send_confirmation_email(self, form_data):
+        return self._send('confirmation', form_data)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def make_queue(service, **kwargs):
+    with mock.patch.dict('os.environ', {'EMAIL_DIGEST_ENABLED': 'false'}):
+        return EmailDispatchQueue(service, **kwargs)
+
+
+def test_submit_and_delivery():
+    """A submission is queued, then each message ends up sent or failed"""
+    print("🧪 Testing email delivery status...")
+
+    dispatch = make_queue(FakeService(confirmation=(False, 'Mailbox unavailable')), workers=1)
+    with mock.patch.object(dispatch, 'start'):
+        tracking_id = dispatch.submit(FORM)
+    status = dispatch.get_status(tracking_id)
+    assert status['status'] == 'pending' and status['companyName'] == 'Acme Corporation'
+    assert {info['status'] for info in status['messages'].values()} == {'queued'}
+    assert dispatch.get_status('unknown') is None
+
+    dispatch.start()
+    wait_for(lambda: dispatch.get_status(tracking_id)['status'] != 'pending')
+    dispatch.stop()
+    status = dispatch.get_status(tracking_id)
+    assert status['status'] == 'partial'
+    assert status['messages']['contact']['status'] == 'sent' and status['messages']['contact']['sentAt']
+    assert status['messages']['confirmation'] == {
+        'status': 'failed', 'attempts': 1, 'error': 'Mailbox unavailable', 'sentAt': None
+    }
+
+    delivered = make_queue(FakeService(), workers=1)
+    tracking_id = delivered.submit(FORM)
+    wait_for(lambda: delivered.get_status(tracking_id)['status'] == 'delivered')
+    delivered.stop()
+
+    print("✅ Email delivery status works")
+
+
+def test_open_breaker_parks_messages():
+    """Messages refused by the open circuit breaker are parked, not failed"""
+    print("🧪 Testing parked messages...")
+
+    dispatch = make_queue(FakeService(contact=CircuitOpenError(30), confirmation=CircuitOpenError(30)), workers=1)
+    tracking_id = dispatch.submit(FORM)
+    wait_for(lambda: dispatch.stats()['parked'] == 2)
+    dispatch.stop()
+
+    status = dispatch.get_status(tracking_id)
+    assert status['status'] == 'pending'
+    for info in status['messages'].values():
+        assert info['status'] == 'parked' and 'circuit breaker' in info['error']
+
+    print("✅ Parked messages work")
+
+
+def test_full_queue():
+    """A submission that does not fit is rejected; one that half fits is partly failed"""
+    print("🧪 Testing a full queue...")
+
+    dispatch = make_queue(FakeService(), workers=1, max_queue=3)
+    with mock.patch.object(dispatch, 'start'):
+        first = dispatch.submit(FORM)
+        second = dispatch.submit(FORM)
+        try:
+            dispatch.submit(FORM)
+            assert False, "expected queue.Full"
+        except queue.Full:
+            pass
+        assert dispatch.submit_many([FORM]) == [None]
+
+    assert dispatch.stats()['tracked'] == 2 and dispatch.stats()['queued'] == 3
+    assert dispatch.get_status(first)['messages']['confirmation']['status'] == 'queued'
+    assert dispatch.get_status(second)['messages']['confirmation'] == {
+        'status': 'failed', 'attempts': 0, 'error': 'Email queue is full', 'sentAt': None
+    }
+
+    print("✅ Full queue works")
+
+
+def test_contact_endpoint_when_full():
+    """POST /api/contact answers 503 when the email queue is full"""
+    print("🧪 Testing the contact endpoint with a full queue...")
+
+    import api_server
+
+    dispatch = make_queue(FakeService(), workers=1, max_queue=2)
+    with mock.patch.object(dispatch, 'start'):
+        dispatch.submit(FORM)
+        client = api_server.create_app().test_client()
+        with mock.patch.object(api_server, 'email_queue', dispatch):
+            response = client.post('/api/contact', json=dict(FORM, companyName='Full Queue Ltd'))
+    assert response.status_code == 503
+    assert response.get_json()['success'] is False
+    assert dispatch.stats()['tracked'] == 1
+
+    print("✅ Contact endpoint rejects submissions when full")
+
+
+def test_stop_drains_queue():
+    """stop() delivers what is already queued, then ends the sender threads"""
+    print("🧪 Testing stop...")
+
+    service = FakeService()
+    dispatch = make_queue(service, workers=2)
+    with mock.patch.object(dispatch, 'start'):
+        tracking_ids = dispatch.submit_many([dict(FORM, companyName=f'Company {i}') for i in range(5)])
+    dispatch.start()
+    threads = list(dispatch._threads)
+    dispatch.stop()
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert dispatch.stats()['workers'] == 0 and dispatch.stats()['queued'] == 0
+    assert len(service.sent) == 10
+    assert all(dispatch.get_status(tracking_id)['status'] == 'delivered' for tracking_id in tracking_ids)
+    # Stopping twice, as the shutdown hook and a test teardown may, is fine
+    dispatch.stop()
+
+    print("✅ Stop works")
+
+
+if __name__ == "__main__":
+    test_submit_and_delivery()
+    test_open_breaker_parks_messages()
+    test_full_queue()
+    test_contact_endpoint_when_full()
+    test_stop_drains_queue()
+    print("🎉 All email queue tests passed!")
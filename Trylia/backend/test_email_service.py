@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test SMTP connection pooling and failure handling without a real mail server
+"""
+
+import smtplib
+from email.mime.text import MIMEText
+
+from email_service import (
+    SMTPConnectionPool, CircuitBreaker, CircuitOpenError, EmailService, is_transient_smtp_error
+)
+
+
+class FakeSMTP:
+    """Stands in for an authenticated smtplib.SMTP session"""
+
+    def __init__(self, fail_after=None):
+        self.sent = []
+        self.closed = False
+        self.fail_after = fail_after
+
+    def send_message(self, msg):
+        if self.fail_after is not None and len(self.sent) >= self.fail_after:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.sent.append(msg['Subject'])
+
+    def noop(self):
+        return (250, b'OK') if not self.closed else (421, b'Closed')
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def make_message(subject):
+    msg = MIMEText("body")
+    msg['Subject'] = subject
+    return msg
+
+
+def test_connections_are_reused():
+    """Several sends share one authenticated session"""
+    print("🧪 Testing connection reuse...")
+
+    sessions = []
+    pool = SMTPConnectionPool(lambda: sessions.append(FakeSMTP()) or sessions[-1], max_size=1)
+    for i in range(5):
+        pool.send([make_message(f"m{i}")])
+    pool.send([make_message("a"), make_message("b")])
+
+    assert len(sessions) == 1
+    assert sessions[0].sent == ['m0', 'm1', 'm2', 'm3', 'm4', 'a', 'b']
+    stats = pool.stats()
+    assert stats['messagesSent'] == 7
+    assert stats['reuseRate'] == round(6 / 7, 3)
+
+    print("✅ Connections are reused")
+
+
+def test_recycle_and_reconnect():
+    """Connections recycle after max_messages and reconnect when dropped"""
+    print("🧪 Testing recycle and reconnect...")
+
+    sessions = []
+    pool = SMTPConnectionPool(lambda: sessions.append(FakeSMTP()) or sessions[-1], max_size=1, max_messages=2)
+    for i in range(5):
+        pool.send([make_message(f"m{i}")])
+    assert len(sessions) == 3
+
+    flaky = [FakeSMTP(fail_after=1), FakeSMTP()]
+    pool = SMTPConnectionPool(lambda: flaky.pop(0), max_size=1)
+    pool.send([make_message("first")])
+    pool.send([make_message("second")])  # server dropped the session, resent on a new one
+    assert pool.stats()['connectionsOpened'] == 2
+    assert pool.stats()['messagesSent'] == 2
+
+    # A session dropped partway through a batch resumes from the message that failed
+    flaky = [FakeSMTP(fail_after=2), FakeSMTP()]
+    sessions = list(flaky)
+    pool = SMTPConnectionPool(lambda: flaky.pop(0), max_size=1)
+    assert pool.send([make_message(f"b{i}") for i in range(4)]) == 4
+    assert sessions[0].sent == ['b0', 'b1'] and sessions[1].sent == ['b2', 'b3']
+
+    print("✅ Recycle and reconnect work")
+
+
+def test_retries_then_breaker_opens():
+    """Transient failures are retried, then the breaker fails fast"""
+    print("🧪 Testing retries and circuit breaker...")
+
+    service = EmailService()
+    service.max_retries = 2
+    service.retry_base_delay = 0.001
+    service.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    attempts = []
+
+    def refuse():
+        attempts.append(1)
+        raise smtplib.SMTPConnectError(421, b"Try again later")
+
+    service.pool = SMTPConnectionPool(refuse, max_size=1)
+    try:
+        service.send_messages([make_message("x")])
+        assert False, "send should have failed"
+    except smtplib.SMTPConnectError:
+        pass
+    assert len(attempts) == 3
+    assert service.breaker.state == CircuitBreaker.OPEN
+
+    try:
+        service.send_messages([make_message("y")])
+        assert False, "breaker should be open"
+    except CircuitOpenError as e:
+        assert e.retry_after > 0
+    assert len(attempts) == 3
+
+    print("✅ Retries and circuit breaker work")
+
+
+def test_permanent_errors_keep_breaker_closed():
+    """Refused recipients are not retried and do not open the breaker"""
+    print("🧪 Testing permanent SMTP errors...")
+
+    class RefusingSMTP(FakeSMTP):
+        def send_message(self, msg):
+            raise smtplib.SMTPRecipientsRefused({'typo@exmaple.com': (550, b'No such user')})
+
+    service = EmailService()
+    service.retry_base_delay = 0.001
+    service.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    service.pool = SMTPConnectionPool(RefusingSMTP, max_size=1)
+    for _ in range(5):
+        try:
+            service.send_messages([make_message("x")])
+            assert False, "send should have failed"
+        except smtplib.SMTPRecipientsRefused:
+            pass
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+    assert not is_transient_smtp_error(smtplib.SMTPNotSupportedError("SMTPUTF8 not supported"))
+    assert not is_transient_smtp_error(smtplib.SMTPDataError(554, b"Rejected"))
+    assert is_transient_smtp_error(smtplib.SMTPDataError(451, b"Try later"))
+    assert is_transient_smtp_error(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+    assert is_transient_smtp_error(TimeoutError("timed out"))
+
+    print("✅ Permanent SMTP errors work")
+
+
+def test_retry_resends_only_unsent_messages():
+    """A transient failure partway through a batch does not resend what was accepted"""
+    print("🧪 Testing partial batch retry...")
+
+    class BusySMTP(FakeSMTP):
+        def send_message(self, msg):
+            if len(delivered) == 2 and not refused:
+                refused.append(msg['Subject'])
+                raise smtplib.SMTPDataError(451, b"Try again later")
+            delivered.append(msg['Subject'])
+
+    delivered, refused = [], []
+    service = EmailService()
+    service.retry_base_delay = 0.001
+    service.breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+    service.pool = SMTPConnectionPool(BusySMTP, max_size=1)
+    progress = []
+    assert service.send_messages([make_message(f"m{i}") for i in range(4)], on_sent=lambda: progress.append(1)) == 4
+    assert delivered == ['m0', 'm1', 'm2', 'm3'] and refused == ['m2']
+    assert len(progress) == 4
+
+    print("✅ Partial batch retry works")
+
+
+def test_breaker_half_open_recovers():
+    """A successful trial call after the reset timeout closes the breaker"""
+    print("🧪 Testing breaker recovery...")
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    print("✅ Breaker recovery works")
+
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_recycle_and_reconnect()
+    test_retries_then_breaker_opens()
+    test_permanent_errors_keep_breaker_closed()
+    test_retry_resends_only_unsent_messages()
+    test_breaker_half_open_recovers()
+    print("🎉 All email service tests passed!")
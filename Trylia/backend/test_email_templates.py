@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the compiled email templates and prebuilt MIME messages
+"""
+
+import email
+from email.header import decode_header, make_header
+
+from templating import compile_template, get_template, MessageSkeleton, HTML_FILTERS, TEXT_FILTERS
+
+
+def test_slots_are_escaped():
+    """HTML slots are escaped, nl2br keeps line breaks, text slots are verbatim"""
+    print("🧪 Testing template escaping...")
+
+    render_html = compile_template('<p>{{ name }}</p><div>{{message|nl2br}}</div>{{ missing }}', HTML_FILTERS)
+    render_text = compile_template('{{ name }}: {{ message|nl2br }}', TEXT_FILTERS)
+    context = {'name': '<script>alert("x")</script>', 'message': 'a & b\nc'}
+
+    assert render_html(context) == \
+        '<p>&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;</p><div>a &amp; b<br>c</div>'
+    assert render_text(context) == '<script>alert("x")</script>: a & b\nc'
+
+    html_body, text_body = get_template('confirmation').render({'contactPerson': 'Jo <b>', 'inquiryType': 'Demo'})
+    assert 'Dear Jo &lt;b&gt;,' in html_body
+    assert 'Dear Jo <b>,' in text_body
+
+    print("✅ Template escaping works")
+
+
+def test_prepared_message_parses():
+    """Prebuilt MIME output is a valid multipart/alternative message"""
+    print("🧪 Testing prebuilt MIME messages...")
+
+    skeleton = MessageSkeleton(From='noreply@example.com', To='sales@example.com')
+    message = skeleton.build('<p>Grüße</p>', 'Grüße', Subject='🎯 New inquiry\nBcc: x@example.com',
+                             Reply_To='jane@example.com')
+    assert message.from_addr == 'noreply@example.com'
+    assert message.to_addrs == ['sales@example.com']
+
+    parsed = email.message_from_bytes(message.data)
+    assert parsed.get_content_type() == 'multipart/alternative'
+    assert parsed['Reply-To'] == 'jane@example.com'
+    assert parsed['Bcc'] is None
+    assert str(make_header(decode_header(parsed['Subject']))).startswith('🎯 New inquiry')
+    text_part, html_part = parsed.get_payload()
+    assert text_part.get_payload(decode=True).decode('utf-8') == 'Grüße'
+    assert html_part.get_content_type() == 'text/html'
+
+    # A TO_EMAIL list is split into one envelope recipient per address
+    skeleton = MessageSkeleton(From='Trylia <noreply@example.com>', To='sales@example.com, Ops <ops@example.com>')
+    message = skeleton.build('<p>Hi</p>')
+    assert message.from_addr == 'noreply@example.com'
+    assert message.to_addrs == ['sales@example.com', 'ops@example.com']
+    assert email.message_from_bytes(message.data)['To'] == 'sales@example.com, Ops <ops@example.com>'
+
+    print("✅ Prebuilt MIME messages work")
+
+
+if __name__ == "__main__":
+    test_slots_are_escaped()
+    test_prepared_message_parses()
+    print("🎉 All email template tests passed!")
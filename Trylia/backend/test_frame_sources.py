@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test frame sources without a physical camera
+"""
+
+import time
+import threading
+
+import numpy as np
+
+from frame_sources import (
+    open_frame_source, FrameSource, SyntheticSource, SharedMemoryFrameWriter
+)
+
+
+class SlowSource(FrameSource):
+    """A device that takes a while to deliver each frame"""
+
+    def _open(self):
+        self.width, self.height, self.fps = 8, 8, 5.0
+
+    def _grab(self):
+        time.sleep(0.3)
+        return np.zeros((8, 8, 3), dtype=np.uint8), 0.0, None
+
+
+def test_synthetic_source():
+    """Synthetic frames report their size, fps and timestamps"""
+    print("🧪 Testing synthetic source...")
+
+    source = open_frame_source('synthetic:320x240@30')
+    assert (source.width, source.height, source.fps) == (320, 240, 30.0)
+    for i in range(3):
+        ok, img = source.read()
+        assert ok and img.shape == (240, 320, 3)
+        assert abs(source.timestamp - i / 30.0) < 1e-9
+    source.release()
+
+    print("✅ Synthetic source works")
+
+
+def test_prefetch_end_of_stream():
+    """Prefetching sources deliver every frame then report end of stream"""
+    print("🧪 Testing prefetch...")
+
+    source = SyntheticSource(64, 48, frames=7, pattern='bars', prefetch=3).open()
+    frames = 0
+    while source.read()[0]:
+        frames += 1
+    assert frames == 7
+    assert source.read() == (False, None)
+    source.release()
+
+    print("✅ Prefetch works")
+
+
+def test_release_wakes_reader():
+    """release() from another thread ends a read() waiting for a prefetched frame"""
+    print("🧪 Testing release during read...")
+
+    source = SlowSource(prefetch=2).open()
+    assert source.read()[0]
+    reader = threading.Thread(target=source.read)
+    reader.start()
+    source.release()
+    reader.join(timeout=2)
+    assert not reader.is_alive()
+    assert source.read() == (False, None)
+
+    try:
+        FrameSource()
+        assert False, "FrameSource is abstract"
+    except TypeError:
+        pass
+
+    print("✅ Release during read works")
+
+
+def test_image_directory_source():
+    """Shirt images can be played back as a frame stream"""
+    print("🧪 Testing image directory source...")
+
+    source = open_frame_source('images:static/male')
+    ok, img = source.read()
+    assert ok
+    assert img.shape[:2] == (source.height, source.width)
+    source.release()
+
+    print("✅ Image directory source works")
+
+
+def test_shared_memory_source():
+    """Frames published to shared memory are read once each"""
+    print("🧪 Testing shared memory source...")
+
+    writer = SharedMemoryFrameWriter('trylia_test_frames', 64, 48)
+    try:
+        writer.write(np.full((48, 64, 3), 7, dtype=np.uint8), timestamp=1.5)
+        source = open_frame_source('shm:trylia_test_frames')
+        source.timeout = 0.05
+
+        ok, img = source.read()
+        assert ok and img[0, 0, 0] == 7 and source.timestamp == 1.5
+        # No new frame published, so the next read times out
+        assert source.read() == (False, None)
+        source.release()
+    finally:
+        writer.close()
+
+    print("✅ Shared memory source works")
+
+
+if __name__ == "__main__":
+    test_synthetic_source()
+    test_prefetch_end_of_stream()
+    test_release_wakes_reader()
+    test_image_directory_source()
+    test_shared_memory_source()
+    print("🎉 All frame source tests passed!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test landmark trace recording and replay
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from landmark_trace import TraceRecorder, TraceReplaySource, read_trace
+
+
+def make_landmarks(offset):
+    landmarks = [[0, 0, 0] for _ in range(33)]
+    landmarks[11] = [280 + offset, 150, -5]
+    landmarks[12] = [380 + offset, 150, -5]
+    landmarks[23] = [300, 300, 0]
+    landmarks[24] = [360, 300, 0]
+    return landmarks
+
+
+def test_trace_round_trip():
+    """Recorded landmarks and timestamps come back unchanged"""
+    print("🧪 Testing trace round trip...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.trace')
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        with TraceRecorder(path, (640, 480), thumbnail_width=160) as recorder:
+            for i in range(10):
+                recorder.record(make_landmarks(i), timestamp=i / 30.0, frame=frame)
+            recorder.record([], timestamp=10 / 30.0)
+
+        # Reopening appends after the existing records
+        with TraceRecorder(path, (640, 480)) as recorder:
+            recorder.record(make_landmarks(99), timestamp=1.0)
+
+        # A torn write at the end must not break reading
+        with open(path, 'ab') as f:
+            f.write(b'\x00\x01\x02')
+
+        records = list(read_trace(path))
+        assert len(records) == 12
+        assert [r.index for r in records] == list(range(12))
+        assert records[3].landmarks[11] == [283, 150, -5]
+        assert records[3].thumbnail is not None
+        assert records[10].landmarks == []
+        assert records[11].landmarks[12] == [479, 150, -5]
+
+    print("✅ Trace round trip works")
+
+
+def test_reopen_after_torn_write():
+    """Records appended after a crash follow the last complete record"""
+    print("🧪 Testing reopen after a torn write...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.trace')
+        with TraceRecorder(path, (640, 480)) as recorder:
+            for i in range(3):
+                recorder.record(make_landmarks(i), timestamp=i / 30.0)
+        # A crash in the middle of a record
+        with open(path, 'ab') as f:
+            f.write(b'\x00\x01\x02\x03\x04\x05\x06\x07\x08\x09')
+
+        with TraceRecorder(path, (640, 480)) as recorder:
+            assert recorder.frame_index == 3
+            recorder.record(make_landmarks(50))
+            recorder.record(make_landmarks(51), timestamp=5.0)
+
+        records = list(read_trace(path))
+        assert [r.index for r in records] == [0, 1, 2, 3, 4]
+        assert records[3].landmarks[11] == [330, 150, -5]
+        # Default timestamps carry on from the last record instead of restarting at 0
+        assert records[3].timestamp >= records[2].timestamp
+        assert records[4].timestamp == 5.0
+
+    print("✅ Reopen after a torn write works")
+
+
+def test_replay_source():
+    """Replay yields full-size frames with the recorded landmarks"""
+    print("🧪 Testing replay source...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'session.trace')
+        with TraceRecorder(path, (320, 240)) as recorder:
+            for i in range(5):
+                recorder.record(make_landmarks(i), timestamp=i / 30.0)
+
+        source = TraceReplaySource(path, realtime=False).open()
+        frames = 0
+        while True:
+            ok, img = source.read()
+            if not ok:
+                break
+            assert img.shape == (240, 320, 3)
+            assert source.landmarks[11][0] == 280 + frames
+            frames += 1
+        assert frames == 5
+
+        looping = TraceReplaySource(path, realtime=False, loop=True).open()
+        for _ in range(12):
+            ok, _ = looping.read()
+            assert ok
+
+    print("✅ Replay source works")
+
+
+if __name__ == "__main__":
+    test_trace_round_trip()
+    test_reopen_after_torn_write()
+    test_replay_source()
+    print("🎉 All landmark trace tests passed!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test incremental, checkpointed log reading and the reverse tail
+"""
+
+import os
+import io
+import json
+import tempfile
+from contextlib import redirect_stdout
+
+from log_reader import IncrementalLogReader, parse_log_line, tail_lines
+
+
+def write(path, lines, mode='a'):
+    with open(path, mode, encoding='utf-8') as f:
+        f.write(lines)
+
+
+def test_tail_reads_from_the_end():
+    """The tail matches readlines() for any block size"""
+    print("🧪 Testing reverse tail...")
+
+    path = os.path.join(tempfile.mkdtemp(), 'api_server.log')
+    write(path, ''.join(f'line {i} ' + 'x' * (i % 7) + '\n' for i in range(500)), 'w')
+    with open(path, encoding='utf-8') as f:
+        expected = [line.rstrip('\n') for line in f.readlines()]
+
+    for block_size in (1, 7, 64, 8192):
+        assert tail_lines(path, 10, block_size) == expected[-10:]
+    assert tail_lines(path, 1000) == expected
+    assert tail_lines(path, 0) == []
+
+    print("✅ Reverse tail works")
+
+
+def test_checkpoint_reads_only_new_lines():
+    """Each run continues at the saved offset, waiting for incomplete lines"""
+    print("🧪 Testing checkpointed reads...")
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'api_server.log')
+    checkpoint = os.path.join(directory, 'api_server.log.offset')
+    write(path, 'one\ntwo\n', 'w')
+
+    assert list(IncrementalLogReader(path, checkpoint).read()) == ['one', 'two']
+    assert list(IncrementalLogReader(path, checkpoint).read()) == []
+
+    write(path, 'three\nfou')
+    assert list(IncrementalLogReader(path, checkpoint).read()) == ['three']
+    write(path, 'r\n')
+    assert list(IncrementalLogReader(path, checkpoint).read()) == ['four']
+    with open(checkpoint, encoding='utf-8') as f:
+        assert json.load(f)['offset'] == os.path.getsize(path)
+
+    print("✅ Checkpointed reads work")
+
+
+def test_rotation_and_truncation():
+    """Lines written before a rotation are not lost or repeated"""
+    print("🧪 Testing rotated logs...")
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'api_server.log')
+    reader = IncrementalLogReader(path)
+    write(path, 'a\n', 'w')
+    assert list(reader.read()) == ['a']
+
+    # Two rotations since the last read
+    write(path, 'b\n')
+    os.rename(path, path + '.1')
+    write(path, 'c\n', 'w')
+    os.rename(path + '.1', path + '.2')
+    os.rename(path, path + '.1')
+    write(path, 'd\nd2\n', 'w')
+    assert list(reader.read()) == ['b', 'c', 'd', 'd2']
+
+    # Truncated in place
+    write(path, 'e\n', 'w')
+    assert list(reader.read()) == ['e']
+
+    print("✅ Rotated logs work")
+
+
+def test_parse_both_formats():
+    """JSON lines and the older text lines are both understood"""
+    print("🧪 Testing log line parsing...")
+
+    text = parse_log_line('2025-01-02 03:04:05,678 - INFO - Received contact form submission from Acme')
+    assert text == {'ts': '2025-01-02 03:04:05', 'level': 'INFO',
+                    'message': 'Received contact form submission from Acme'}
+    entry = parse_log_line('{"ts": "2025-01-02T03:04:05", "level": "INFO", "message": "GET /health 200", "status": 200}')
+    assert entry['status'] == 200 and entry['message'] == 'GET /health 200'
+
+    print("✅ Log line parsing works")
+
+
+def test_new_activity_counts_accepted_submissions():
+    """Rejected, rate-limited and duplicate posts are not counted as submissions"""
+    print("🧪 Testing new activity summary...")
+
+    from view_submissions import show_new_activity
+
+    tmp = tempfile.mkdtemp()
+    log_file = os.path.join(tmp, 'api_server.log')
+    with open(log_file, 'w', encoding='utf-8') as f:
+        for line in ('- INFO - Received contact form submission from Acme',
+                     '- WARNING - Contact form validation failed: {}',
+                     '- INFO - Duplicate contact form submission from Acme',
+                     '- INFO - Received contact form submission from Acme',
+                     '- INFO - Contact form processed successfully for Acme (tracking ID: 0123abcd)'):
+            f.write(f'2025-01-02 03:04:05,678 {line}\n')
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        show_new_activity(log_file, os.path.join(tmp, 'checkpoint.json'))
+    assert '5 new log lines: 1 contact submissions, 0 errors' in output.getvalue()
+    assert '📧 2025-01-02 03:04:05 - Acme' in output.getvalue()
+
+    print("✅ New activity summary works")
+
+
+if __name__ == "__main__":
+    test_tail_reads_from_the_end()
+    test_checkpoint_reads_only_new_lines()
+    test_rotation_and_truncation()
+    test_parse_both_formats()
+    test_new_activity_counts_accepted_submissions()
+    print("🎉 All log reader tests passed!")
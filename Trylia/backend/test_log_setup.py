@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test queue-based JSON logging and log rotation
+"""
+
+import os
+import json
+import queue
+import logging
+import tempfile
+
+from flask import Flask
+
+from log_setup import (JsonFormatter, DroppingQueueHandler, LogListener, RequestContextFilter,
+                       SizeAndTimeRotatingFileHandler, init_request_logging)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+def test_request_lines_are_structured():
+    """Records carry the request ID, and each request logs its duration"""
+    print("🧪 Testing structured request logging...")
+
+    sink = ListHandler()
+    sink.setFormatter(JsonFormatter())
+    handler = DroppingQueueHandler(queue.Queue(maxsize=100))
+    handler.addFilter(RequestContextFilter())
+    listener = LogListener(handler.queue, sink)
+
+    app = Flask(__name__)
+    init_request_logging(app)
+    logger = logging.getLogger('test.request')
+
+    @app.route('/work')
+    def work():
+        logger.info("working on %s", 'it')
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+        return 'ok'
+
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.INFO)
+    root.addHandler(handler)
+    listener.start()
+    try:
+        response = app.test_client().get('/work', headers={'X-Request-ID': 'abc123'})
+    finally:
+        listener.stop()
+        root.removeHandler(handler)
+        root.setLevel(level)
+
+    assert response.headers['X-Request-ID'] == 'abc123'
+    work_line, error_line, access_line = sink.lines
+    assert work_line['message'] == 'working on it' and work_line['request_id'] == 'abc123'
+    assert 'ValueError: boom' in error_line['exception'] and error_line['message'] == 'failed'
+    assert access_line['status'] == 200 and access_line['path'] == '/work'
+    assert access_line['duration_ms'] >= 0 and access_line['request_id'] == 'abc123'
+
+    print("✅ Structured request logging works")
+
+
+def test_full_queue_drops():
+    """A full queue drops and counts records instead of blocking"""
+    print("🧪 Testing log queue overload...")
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=3))
+    logger = logging.getLogger('test.overload')
+    logger.propagate = False
+    logger.addHandler(handler)
+    for i in range(10):
+        logger.warning("line %d", i)
+    logger.removeHandler(handler)
+    assert handler.queue.qsize() == 3 and handler.dropped == 7
+
+    print("✅ Log queue overload works")
+
+
+def test_rotation_by_size_and_time():
+    """The log file rotates when it is too big or too old"""
+    print("🧪 Testing log rotation...")
+
+    path = os.path.join(tempfile.mkdtemp(), 'api.log')
+    handler = SizeAndTimeRotatingFileHandler(path, max_bytes=200, interval=3600, backup_count=2)
+    record = logging.makeLogRecord({'msg': 'x' * 80, 'levelno': logging.INFO, 'levelname': 'INFO'})
+    for _ in range(3):
+        handler.emit(record)
+    assert os.path.exists(path + '.1')
+
+    handler.rollover_at = 0
+    handler.emit(record)
+    assert os.path.exists(path + '.2') and os.path.getsize(path) < 100
+    handler.close()
+
+    print("✅ Log rotation works")
+
+
+if __name__ == "__main__":
+    test_request_lines_are_structured()
+    test_full_queue_drops()
+    test_rotation_by_size_and_time()
+    print("🎉 All logging tests passed!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test frame metrics histograms, worker aggregation and API request metrics
+"""
+
+import threading
+
+from metrics import (
+    Histogram, FrameMetrics, TryOnMetricsAggregator, ServiceMetrics, parse_metrics_line
+)
+
+
+class FakeContext:
+    def __init__(self, timings):
+        self.timings = timings
+        self.captured_at = 0.0
+
+
+def test_histogram_buckets():
+    """Values land in the first bucket whose bound is >= the value"""
+    print("🧪 Testing histogram buckets...")
+
+    hist = Histogram((1, 10, 100))
+    for value in (0.5, 1, 3, 10, 50, 500):
+        hist.observe(value)
+    assert hist.counts == [2, 2, 1, 1]
+    assert hist.count == 6
+    assert hist.quantile(0.5) == 10.0
+    assert Histogram.from_dict(hist.to_dict()).counts == hist.counts
+
+    print("✅ Histogram buckets work")
+
+
+def test_worker_snapshots_aggregate():
+    """Live snapshots replace each other; retired workers are kept in totals"""
+    print("🧪 Testing metrics aggregation...")
+
+    metrics = FrameMetrics()
+    for _ in range(4):
+        metrics.observe_frame(FakeContext({'capture': 3.0, 'hud': 0.5}))
+    snapshot = parse_metrics_line(metrics.format_line())
+    assert snapshot['frames'] == 4
+
+    aggregator = TryOnMetricsAggregator()
+    aggregator.update(101, snapshot)
+    aggregator.update(101, snapshot)
+    aggregator.retire(101)
+    aggregator.update(102, snapshot)
+
+    data = aggregator.to_json()
+    assert data['sessions'] == 2
+    assert data['frames'] == 8
+    assert data['stages']['capture']['count'] == 8
+
+    text = aggregator.to_prometheus()
+    assert 'trylia_tryon_frames_total 8' in text
+    assert 'trylia_tryon_stage_duration_ms_bucket{le="5.0",stage="capture"} 8' in text
+    assert 'trylia_tryon_stage_duration_ms_count{stage="hud"} 8' in text
+
+    print("✅ Metrics aggregation works")
+
+
+def test_request_metrics_across_threads():
+    """Per-thread shards add up, including those of threads that have exited"""
+    print("🧪 Testing request metrics...")
+
+    metrics = ServiceMetrics()
+
+    def handle_requests():
+        for i in range(100):
+            metrics.request_started('POST', '/api/contact')
+            metrics.request_finished('POST', '/api/contact', 200, i % 20)
+
+    threads = [threading.Thread(target=handle_requests) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    del threads
+
+    metrics.request_started('POST', '/api/try-on')
+    try:
+        with metrics.operation('worker_spawn'):
+            raise OSError("no camera")
+    except OSError:
+        pass
+
+    text = metrics.to_prometheus()
+    assert 'trylia_http_request_duration_ms_count{method="POST",route="/api/contact",status="200"} 400' in text
+    assert 'trylia_http_requests_in_flight{method="POST",route="/api/contact"} 0' in text
+    assert 'trylia_http_requests_in_flight{method="POST",route="/api/try-on"} 1' in text
+    assert 'trylia_operation_duration_ms_count{operation="worker_spawn",outcome="error"} 1' in text
+
+    print("✅ Request metrics work")
+
+
+if __name__ == "__main__":
+    test_histogram_buckets()
+    test_worker_snapshots_aggregate()
+    test_request_metrics_across_threads()
+    print("🎉 All metrics tests passed!")
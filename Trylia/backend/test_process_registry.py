@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test the app factory and the try-on process registries
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import multiprocessing
+
+from process_registry import InProcessRegistry, SQLiteProcessRegistry
+from tryon_sessions import SessionManager
+
+SLEEPER = [sys.executable, '-c', 'import time; time.sleep(60)']
+
+
+def spawn():
+    return subprocess.Popen(SLEEPER)
+
+
+def stop_from_other_process(path, results):
+    results.put(SQLiteProcessRegistry(path, command_marker='time.sleep').stop())
+
+
+def test_in_process_registry():
+    """Starting a worker replaces the previous one"""
+    print("🧪 Testing in-process registry...")
+
+    registry = InProcessRegistry()
+    first = registry.start(spawn)
+    second = registry.start(spawn)
+    assert first.poll() is not None
+    assert registry.status() == {'isRunning': True, 'pid': second.pid}
+    registry.stop_owned()
+    assert registry.status() == {'isRunning': False, 'pid': None}
+
+    print("✅ In-process registry works")
+
+
+def test_replace_spawns_before_stopping():
+    """replace() starts the new worker while the previous one is still running"""
+    print("🧪 Testing worker replacement...")
+
+    path = os.path.join(tempfile.mkdtemp(), 'tryon_state.db')
+    for registry in (InProcessRegistry(), SQLiteProcessRegistry(path, command_marker='time.sleep')):
+        previous = registry.start(spawn)
+        seen = []
+
+        def spawn_and_check():
+            seen.append(previous.poll())
+            return spawn()
+
+        current = registry.replace(spawn_and_check)
+        assert seen == [None] and previous.poll() is not None
+        assert registry.status() == {'isRunning': True, 'pid': current.pid}
+        registry.stop()
+
+    print("✅ Worker replacement works")
+
+
+def test_shared_registry_across_processes():
+    """A worker started by one API process is visible to and stoppable by another"""
+    print("🧪 Testing shared registry...")
+
+    path = os.path.join(tempfile.mkdtemp(), 'tryon_state.db')
+    registry = SQLiteProcessRegistry(path, command_marker='time.sleep')
+    process = registry.start(spawn)
+    assert SQLiteProcessRegistry(path, command_marker='time.sleep').status() == {'isRunning': True, 'pid': process.pid}
+
+    results = multiprocessing.Queue()
+    other = multiprocessing.Process(target=stop_from_other_process, args=(path, results))
+    other.start()
+    results.get(timeout=30)
+    other.join()
+
+    assert process.wait(timeout=10) is not None
+    assert registry.status() == {'isRunning': False, 'pid': None}
+
+    # A PID that no longer belongs to a try-on worker is never signalled
+    process = registry.start(lambda: subprocess.Popen([sys.executable, '-c', 'pass']))
+    process.wait()
+    assert registry.status()['isRunning'] is False
+    registry.stop()
+
+    print("✅ Shared registry works")
+
+
+def test_shared_session_records():
+    """A session accepted by one API process can be polled from another"""
+    print("🧪 Testing shared session records...")
+
+    from api_server import create_app
+
+    path = os.path.join(tempfile.mkdtemp(), 'tryon_state.db')
+    # Stands in for the SessionManager of another API process
+    manager = SessionManager()
+    session = manager.submit('male', 2, lambda session: manager.advance(session, 'starting'),
+                             store=SQLiteProcessRegistry(path))
+    deadline = time.monotonic() + 5
+    while session.state != 'starting':
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    manager.attach(session, 4321)
+    manager.shutdown()
+
+    client = create_app({'STATE_BACKEND': 'sqlite', 'STATE_PATH': path}).test_client()
+    response = client.get(f'/api/try-on/{session.id}')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['state'] == 'starting' and data['pid'] == 4321 and 'preparing' not in data['timestamps']
+    assert create_app({'STATE_BACKEND': 'memory'}).test_client().get(f'/api/try-on/{session.id}').status_code == 404
+
+    # A write that arrives late does not overwrite a newer one
+    registry = SQLiteProcessRegistry(path)
+    registry.save_session(dict(data, state='queued'), 1)
+    assert registry.load_session(session.id)['state'] == 'starting'
+
+    print("✅ Shared session records work")
+
+
+def test_app_factory():
+    """Apps built by create_app() are independent and run their shutdown hooks once"""
+    print("🧪 Testing app factory...")
+
+    from api_server import create_app
+
+    path = os.path.join(tempfile.mkdtemp(), 'tryon_state.db')
+    app = create_app({'STATE_BACKEND': 'sqlite', 'STATE_PATH': path})
+    other = create_app({'STATE_BACKEND': 'memory'})
+    assert app.extensions['tryon_processes'] is not other.extensions['tryon_processes']
+
+    status = app.test_client().get('/api/status').get_json()
+    assert status['isRunning'] is False and status['pid'] is None
+    assert other.test_client().get('/api/contact/options').status_code == 200
+
+    calls = []
+    lifecycle = app.extensions['lifecycle']
+    lifecycle.on_shutdown(lambda: calls.append('hook'))
+    lifecycle.shutdown()
+    lifecycle.shutdown()
+    assert calls == ['hook']
+
+    print("✅ App factory works")
+
+
+if __name__ == "__main__":
+    test_in_process_registry()
+    test_replace_spawns_before_stopping()
+    test_shared_registry_across_processes()
+    test_shared_session_records()
+    test_app_factory()
+    print("🎉 All process registry tests passed!")
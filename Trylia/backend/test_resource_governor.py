@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test the try-on worker resource governor: CPU lists, slot layout, the
+cross-process concurrency cap and the worker-side limits
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from unittest import mock
+
+from resource_governor import ResourceGovernor, create_resource_governor, parse_cpu_list, format_cpu_list
+
+LIMITS = '''
+import os, sys, cv2
+from resource_governor import apply_worker_limits
+apply_worker_limits({0})
+print(cv2.getNumThreads(), sorted(os.sched_getaffinity(0)))
+'''
+HOLDER = '''
+import sys, time
+from resource_governor import ResourceGovernor
+slot = ResourceGovernor(range(4), 2, sys.argv[1]).try_acquire()
+print(slot.index, flush=True)
+time.sleep(60)
+'''
+
+
+def test_cpu_lists():
+    """CPU lists parse and format with runs collapsed"""
+    print("🧪 Testing CPU lists...")
+
+    assert parse_cpu_list('0-3,6, 8-9') == {0, 1, 2, 3, 6, 8, 9}
+    assert parse_cpu_list('') == set()
+    assert format_cpu_list({9, 0, 1, 2, 6, 8}) == '0-2,6,8-9'
+    assert parse_cpu_list(format_cpu_list({5})) == {5}
+
+    print("✅ CPU lists work")
+
+
+def test_slot_layout():
+    """CPUs are split into one contiguous group per session, capped at one CPU each"""
+    print("🧪 Testing slot layout...")
+
+    slot_dir = tempfile.mkdtemp(prefix='trylia-slots-')
+    governor = ResourceGovernor(range(8), 3, slot_dir)
+    assert governor.slots == [{0, 1, 2}, {3, 4, 5}, {6, 7}]
+    assert governor.threads == 2
+    env = governor.thread_env()
+    assert env['OMP_NUM_THREADS'] == env['OPENBLAS_NUM_THREADS'] == env['TRYON_NUM_THREADS'] == '2'
+
+    capped = ResourceGovernor([2, 3], 8, slot_dir)
+    assert capped.max_sessions == 2 and capped.slots == [{2}, {3}]
+
+    print("✅ Slot layout works")
+
+
+def test_default_sizing():
+    """By default slots follow WEB_CONCURRENCY, and a single worker keeps every CPU"""
+    print("🧪 Testing default sizing...")
+
+    slot_dir = tempfile.mkdtemp(prefix='trylia-slots-')
+    base = {'TRYON_CPUS': '0-7', 'TRYON_SLOT_DIR': slot_dir}
+    with mock.patch.dict(os.environ, base):
+        os.environ.pop('WEB_CONCURRENCY', None)
+        os.environ.pop('TRYON_MAX_SESSIONS', None)
+        single = create_resource_governor()
+        assert single.max_sessions == 1 and single.slots == [set(range(8))]
+        assert single.thread_env()['TRYON_NUM_THREADS'] == '8'
+
+    with mock.patch.dict(os.environ, dict(base, WEB_CONCURRENCY='4')):
+        os.environ.pop('TRYON_MAX_SESSIONS', None)
+        shared = create_resource_governor()
+        assert shared.max_sessions == 4 and shared.threads == 2
+
+    with mock.patch.dict(os.environ, dict(base, WEB_CONCURRENCY='4', TRYON_MAX_SESSIONS='2')):
+        assert create_resource_governor().slots == [{0, 1, 2, 3}, {4, 5, 6, 7}]
+
+    with mock.patch.dict(os.environ, dict(base, TRYON_GOVERNOR='0')):
+        assert create_resource_governor() is None
+
+    print("✅ Default sizing works")
+
+
+def test_concurrency_cap():
+    """Slots are shared between governors and processes, and freed on release or exit"""
+    print("🧪 Testing concurrency cap...")
+
+    slot_dir = tempfile.mkdtemp(prefix='trylia-slots-')
+    holder = subprocess.Popen([sys.executable, '-c', HOLDER, slot_dir], stdout=subprocess.PIPE, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        assert holder.stdout.readline().strip() == '0'
+        governor = ResourceGovernor(range(4), 2, slot_dir)
+        second = governor.try_acquire()
+        assert second.index == 1 and second.cpus == {2, 3}
+        assert governor.try_acquire() is None
+
+        started = time.monotonic()
+        assert governor.acquire(timeout=0.2) is None
+        assert time.monotonic() - started >= 0.2
+
+        second.release()
+        second.release()
+        assert governor.try_acquire().index == 1
+    finally:
+        holder.kill()
+        holder.wait()
+    # A process that dies gives its slot back
+    assert ResourceGovernor(range(4), 2, slot_dir).acquire(timeout=1).index == 0
+
+    print("✅ Concurrency cap works")
+
+
+def test_worker_limits():
+    """The worker sizes OpenCV's pool and pins its threads"""
+    print("🧪 Testing worker limits...")
+
+    result = subprocess.run([sys.executable, '-c', LIMITS], capture_output=True, text=True, check=True,
+                            env=dict(os.environ, TRYON_NUM_THREADS='1'),
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.split() == ['1', '[0]']
+
+    print("✅ Worker limits work")
+
+
+if __name__ == "__main__":
+    test_cpu_lists()
+    test_slot_layout()
+    test_default_sizing()
+    test_concurrency_cap()
+    test_worker_limits()
+    print("🎉 All resource governor tests passed!")
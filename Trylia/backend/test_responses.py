@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test precomputed static responses and the JSON codecs
+"""
+
+import gzip
+import json
+from datetime import datetime
+
+from flask import Flask, request
+
+from responses import PrecomputedResponse, StdlibCodec, load_json_codec, accepted_encodings
+
+PAYLOAD = {'success': True, 'options': {'countries': ['India', 'Ukraine'] * 50}}
+
+
+def make_app():
+    app = Flask(__name__)
+    static = PrecomputedResponse(PAYLOAD, codec=StdlibCodec(), max_age=60)
+
+    @app.route('/options')
+    def options():
+        return static.serve(request)
+
+    return app.test_client()
+
+
+def test_etag_and_compression():
+    """Clients get the smallest accepted variant and 304 on revalidation"""
+    print("🧪 Testing precomputed responses...")
+
+    client = make_app()
+    plain = client.get('/options')
+    assert plain.status_code == 200 and plain.get_json() == PAYLOAD
+    assert plain.headers['Cache-Control'] == 'public, max-age=60'
+    assert 'Content-Encoding' not in plain.headers
+
+    zipped = client.get('/options', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.data)) == PAYLOAD
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+
+    cached = client.get('/options', headers={'If-None-Match': plain.headers['ETag']})
+    assert cached.status_code == 304 and cached.data == b''
+    assert client.get('/options', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+    assert accepted_encodings('gzip;q=0, br') == {'br'}
+
+    print("✅ Precomputed responses work")
+
+
+def test_codecs_agree():
+    """Every available codec produces the same JSON for API payloads"""
+    print("🧪 Testing JSON codecs...")
+
+    payload = {'timestamp': datetime(2025, 1, 2, 3, 4, 5), 'name': 'Grüße', 'values': [1, 2.5, None]}
+    expected = StdlibCodec().dumps(payload)
+    assert json.loads(expected)['timestamp'] == '2025-01-02T03:04:05'
+    assert json.loads(load_json_codec().dumps(payload)) == json.loads(expected)
+
+    print("✅ JSON codecs work")
+
+
+if __name__ == "__main__":
+    test_etag_and_compression()
+    test_codecs_agree()
+    print("🎉 All response tests passed!")
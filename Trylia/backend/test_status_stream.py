@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test the try-on session event stream: worker event lines, fan-out with
+bounded per-client buffers and the /api/status/stream endpoint
+"""
+
+import sys
+import json
+import threading
+import subprocess
+
+from status_stream import StatusBroadcaster, SessionEventReporter, parse_event_line, format_event_line
+
+
+class FakeFrame:
+    size_recommendation = "M"
+    confidence = 87.25
+
+
+def test_worker_event_lines():
+    """The worker reports first_frame once and live readings at most every interval"""
+    print("🧪 Testing worker event lines...")
+
+    lines = []
+    reporter = SessionEventReporter(interval=0.0, emit=lines.append)
+    for _ in range(3):
+        reporter(FakeFrame())
+    events = [parse_event_line(line) for line in lines]
+    assert [name for name, data in events] == ['first_frame', 'live', 'live', 'live']
+    assert events[1][1]['sizeRecommendation'] == 'M' and events[1][1]['confidence'] == 87.2
+
+    lines.clear()
+    throttled = SessionEventReporter(interval=60.0, emit=lines.append)
+    for _ in range(100):
+        throttled(FakeFrame())
+    assert len(lines) == 1
+
+    assert parse_event_line(format_event_line('error', error='no camera')) == ('error', {'error': 'no camera'})
+    assert parse_event_line('[INFO] Camera opened') is None
+    assert parse_event_line('[EVENT] not json') is None
+
+    print("✅ Worker event lines work")
+
+
+def test_fan_out_with_bounded_buffers():
+    """Every subscriber gets each event; a slow one keeps a bounded, coalesced buffer"""
+    print("🧪 Testing event fan-out...")
+
+    broadcaster = StatusBroadcaster(buffer_size=4)
+    fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+
+    broadcaster.publish('starting', pid=42)
+    assert [event['event'] for event in fast.get(timeout=1)] == ['starting']
+    for i in range(50):
+        broadcaster.publish('live', pid=42, fps=i)
+    # Live readings replace the one still waiting
+    assert [(event['event'], event['data'].get('fps')) for event in slow.get(timeout=1)] == \
+        [('starting', None), ('live', 49)]
+
+    for name in ('camera_ready', 'model_loaded', 'first_frame', 'stopped', 'starting', 'camera_ready'):
+        broadcaster.publish(name, pid=42)
+    assert len(slow.get(timeout=1)) == 4 and slow.dropped == 2
+
+    slow.close()
+    assert broadcaster.subscriber_count() == 1
+    assert slow.get(timeout=5) == []
+
+    print("✅ Event fan-out works")
+
+
+def test_session_state():
+    """The session snapshot follows lifecycle events and ignores replaced workers"""
+    print("🧪 Testing session state...")
+
+    broadcaster = StatusBroadcaster()
+    assert broadcaster.session()['state'] == 'idle'
+    broadcaster.publish('starting', pid=1)
+    broadcaster.publish('camera_ready', pid=1)
+    broadcaster.publish('starting', pid=2)
+    broadcaster.publish('stopped', pid=1)
+    broadcaster.publish('first_frame', pid=2)
+    broadcaster.publish('live', pid=2, fps=29.5, sizeRecommendation='L', confidence=91.0)
+
+    session = broadcaster.session()
+    assert session['state'] == 'running' and session['pid'] == 2
+    assert set(session['events']) == {'starting', 'first_frame'}
+    assert session['live'] == {'fps': 29.5, 'sizeRecommendation': 'L', 'confidence': 91.0}
+
+    broadcaster.publish('crashed', pid=2, error='Exited with status 1')
+    session = broadcaster.session()
+    assert session['state'] == 'crashed' and session['error'] == 'Exited with status 1'
+
+    print("✅ Session state works")
+
+
+def test_status_stream_endpoint():
+    """The endpoint sends the current status, then published events"""
+    print("🧪 Testing status stream endpoint...")
+
+    import api_server
+
+    client = api_server.create_app().test_client()
+    response = client.get('/api/status/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+
+    def next_event():
+        chunk = next(chunks)
+        return chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+
+    first = next_event()
+    assert 'event: status' in first
+    status = json.loads(first.split('data: ', 1)[1])
+    assert status['isRunning'] is False and 'session' in status
+
+    threading.Timer(0.05, api_server.status_broadcaster.publish, args=('starting',),
+                    kwargs={'pid': 4242}).start()
+    event = next_event()
+    assert 'event: starting' in event and '"pid":4242' in event
+
+    response.close()
+    assert api_server.status_broadcaster.subscriber_count() == 0
+
+    print("✅ Status stream endpoint works")
+
+
+def test_worker_exit_events():
+    """A worker we stopped is reported stopped whatever its exit status; others crashed"""
+    print("🧪 Testing worker exit events...")
+
+    import api_server
+    from process_registry import stop_process
+
+    # Exits with status 1 on SIGTERM, as terminate() leaves a worker on Windows
+    script = ('import signal, sys, time\n'
+              'signal.signal(signal.SIGTERM, lambda *args: sys.exit(1))\n'
+              'print("ready", flush=True)\n'
+              'time.sleep(60)\n')
+    events = []
+    listener = lambda event: events.append((event['event'], event['data'].get('returncode')))
+    api_server.status_broadcaster.listeners.append(listener)
+    try:
+        process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, text=True)
+        assert process.stdout.readline().strip() == 'ready'
+        threading.Timer(0.05, stop_process, args=(process,)).start()
+        api_server.monitor_process_output(process)
+        assert events[-1] == ('stopped', 1)
+
+        process = subprocess.Popen([sys.executable, '-c', 'import sys; sys.exit(1)'], stdout=subprocess.PIPE, text=True)
+        api_server.monitor_process_output(process)
+        assert events[-1] == ('crashed', 1)
+    finally:
+        api_server.status_broadcaster.listeners.remove(listener)
+
+    print("✅ Worker exit events work")
+
+
+if __name__ == "__main__":
+    test_worker_event_lines()
+    test_fan_out_with_bounded_buffers()
+    test_session_state()
+    test_status_stream_endpoint()
+    test_worker_exit_events()
+    print("🎉 All status stream tests passed!")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test the submission search index
+"""
+
+import os
+import random
+import tempfile
+
+from submission_store import SubmissionStore
+from submission_index import (ARRAY_LIMIT, BITMAP_BYTES, CHUNK_SIZE, container_to_int,
+                              merge_container, tokenize)
+
+COUNTRIES = ['India', 'Germany', 'Ukraine']
+INQUIRY_TYPES = ['Demo Request', 'Integration Request']
+WORDS = ['shopify', 'magento', 'pricing', 'demo', 'returns', 'catalog']
+
+
+def make_submission(rng):
+    return {'companyName': f'Company {rng.randint(1, 20)}', 'contactPerson': 'Jane Doe',
+            'businessEmail': 'jane@example.com', 'companySize': '11-50', 'meetingMode': 'Google Meet',
+            'message': ' '.join(rng.choices(WORDS, k=4)),
+            'country': rng.choice(COUNTRIES), 'inquiryType': rng.choice(INQUIRY_TYPES)}
+
+
+def brute_force(rows, text, facets, since=None):
+    words = tokenize(text)
+    return [row['id'] for row in sorted(rows, key=lambda row: -row['id'])
+            if words <= tokenize(row['message'] + ' ' + row['companyName'])
+            and all(row[field] == value for field, value in facets.items())
+            and (since is None or row['submittedAt'] >= since)]
+
+
+def test_containers_switch_to_bitmaps():
+    """Sparse containers are offset arrays, dense ones bitmaps, both decode the same"""
+    print("🧪 Testing index containers...")
+
+    sparse = merge_container(None, [5, 1, 65535])
+    assert len(sparse) == 6 and container_to_int(sparse) == (1 << 1) | (1 << 5) | (1 << 65535)
+
+    offsets = list(range(0, 2 * (ARRAY_LIMIT + 1), 2))
+    dense = merge_container(merge_container(None, offsets[:10]), offsets[10:])
+    assert len(dense) == BITMAP_BYTES
+    assert container_to_int(dense) == sum(1 << offset for offset in offsets)
+
+    print("✅ Index containers work")
+
+
+def test_search_matches_brute_force():
+    """Search returns exactly the submissions a full scan would, across chunks"""
+    print("🧪 Testing submission search...")
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SubmissionStore(os.path.join(tmp, 'submissions.db'))
+        for i in range(60):
+            store.add(make_submission(rng), tracking_id=f'a{i}', submitted_at=f'2025-01-{1 + i // 3:02d}T10:00:00')
+        # Continue in the next ID chunk, partly through the batch path
+        store._connection().execute("UPDATE sqlite_sequence SET seq = ?", (CHUNK_SIZE + 10,))
+        store._connection().commit()
+        store.add_many([(make_submission(rng), f'b{i}') for i in range(40)])
+
+        rows = list(store.iter_submissions())
+        cases = [('shopify', {}), ('pricing DEMO', {'country': 'Germany'}),
+                 ('', {'country': 'India', 'inquiryType': 'Demo Request'}), ('unknownword', {})]
+        for text, facets in cases:
+            expected = brute_force(rows, text, facets)
+            found, cursor = [], None
+            while True:
+                page = store.search(text, facets, limit=7, cursor=cursor)
+                assert page['total'] == len(expected)
+                found += [item['id'] for item in page['submissions']]
+                cursor = page['nextCursor']
+                if cursor is None:
+                    break
+            assert found == expected, (text, facets)
+
+        page = store.search('shopify', since='2025-01-10', until='2025-01-15', limit=100)
+        expected = [row['id'] for row in rows if '2025-01-10' <= row['submittedAt'] < '2025-01-15'
+                    and 'shopify' in row['message']]
+        assert sorted(item['id'] for item in page['submissions']) == sorted(expected)
+
+    print("✅ Submission search works")
+
+
+def test_existing_submissions_are_indexed():
+    """Submissions stored before the index existed are indexed on first search"""
+    print("🧪 Testing index backfill...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SubmissionStore(os.path.join(tmp, 'submissions.db'))
+        store.add(dict(make_submission(random.Random(1)), message='Shopify storefront'))
+        conn = store._connection()
+        conn.execute("DELETE FROM search_postings")
+        conn.execute("DELETE FROM search_meta")
+        conn.commit()
+        assert store.search('shopify')['total'] == 1
+
+    print("✅ Index backfill works")
+
+
+if __name__ == "__main__":
+    test_containers_switch_to_bitmaps()
+    test_search_matches_brute_force()
+    test_existing_submissions_are_indexed()
+    print("🎉 All submission search tests passed!")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite contact submission store
+"""
+
+import os
+import csv
+import io
+import json
+import tempfile
+
+from submission_store import SubmissionStore, iter_csv, iter_ndjson
+
+
+def make_submission(i):
+    return {
+        'companyName': f'Company {i}',
+        'websiteUrl': 'https://example.com',
+        'contactPerson': 'Jane Doe',
+        'businessEmail': 'Jane@example.com' if i % 2 else 'ops@example.com',
+        'phoneNumber': '+1234567890',
+        'companySize': '11-50',
+        'inquiryType': 'Partnership' if i % 3 == 0 else 'General Inquiry',
+        'message': 'Interested in a virtual try-on integration.',
+        'meetingMode': 'Online',
+        'country': 'India' if i < 5 else 'Germany'
+    }
+
+
+def test_keyset_pagination_and_filters():
+    """Pages are newest first, never overlap, and filters use the indexes"""
+    print("🧪 Testing submission pagination...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SubmissionStore(os.path.join(tmp, 'submissions.db'))
+        for i in range(12):
+            store.add(make_submission(i), tracking_id=f't{i}', submitted_at=f'2025-01-01T10:00:{i:02d}')
+
+        seen = []
+        cursor = None
+        while True:
+            page = store.query(limit=5, cursor=cursor)
+            seen += [item['trackingId'] for item in page['submissions']]
+            cursor = page['nextCursor']
+            if cursor is None:
+                break
+        assert seen == [f't{i}' for i in reversed(range(12))]
+
+        assert store.count({'country': 'India'}) == 5
+        assert store.count({'email': 'jane@EXAMPLE.com'}) == 6
+        assert store.count({'inquiryType': 'Partnership', 'since': '2025-01-01T10:00:06'}) == 2
+        store.close()
+
+    print("✅ Submission pagination works")
+
+
+def test_streaming_export():
+    """CSV and NDJSON exports contain every matching row, oldest first"""
+    print("🧪 Testing submission export...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SubmissionStore(os.path.join(tmp, 'submissions.db'))
+        for i in range(3):
+            store.add(make_submission(i), tracking_id=f't{i}', submitted_at=f'2025-01-0{i + 1}T09:00:00')
+
+        lines = ''.join(iter_ndjson(store.iter_submissions())).splitlines()
+        assert [json.loads(line)['trackingId'] for line in lines] == ['t0', 't1', 't2']
+
+        rows = list(csv.DictReader(io.StringIO(''.join(iter_csv(store.iter_submissions({'country': 'India'}))))))
+        assert len(rows) == 3
+        assert rows[0]['companyName'] == 'Company 0'
+
+        # Cells that a spreadsheet would run as formulas are exported as text
+        formulas = dict(make_submission(3), companyName='=HYPERLINK("http://evil.example")',
+                        contactPerson='@SUM(A1)', message='-2+3')
+        store.add(formulas, tracking_id='t3', submitted_at='2025-01-04T09:00:00')
+        row = list(csv.DictReader(io.StringIO(''.join(iter_csv(store.iter_submissions())))))[-1]
+        assert row['companyName'] == '\'=HYPERLINK("http://evil.example")'
+        assert row['contactPerson'] == "'@SUM(A1)" and row['message'] == "'-2+3"
+        assert row['trackingId'] == 't3'
+        store.close()
+
+    print("✅ Submission export works")
+
+
+if __name__ == "__main__":
+    test_keyset_pagination_and_filters()
+    test_streaming_export()
+    print("🎉 All submission store tests passed!")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test request tracing: propagation into a child process, the OTLP/JSON
+trace file and the critical path report
+"""
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+from tracing import Tracer, JsonLinesExporter, QueuedExporter, configure_tracer, parse_traceparent
+from trace_report import load_traces, critical_path, merge_segments
+
+WORKER_SCRIPT = """
+from tracing import worker_trace_context
+tracer, parent, spawned_at = worker_trace_context()
+startup = tracer.start_span('worker.startup', parent=parent, start_ns=spawned_at)
+tracer.activate(startup)
+with tracer.span('worker.model_load'):
+    pass
+startup.end()
+"""
+
+
+def test_trace_continues_in_child_process():
+    """A child started with child_env() adds its spans to the parent's trace"""
+    print("🧪 Testing trace propagation...")
+
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    tracer = Tracer('trylia-api', JsonLinesExporter(path, 'trylia-api'))
+    assert tracer.child_env() == {}
+
+    with tracer.span('worker_spawn') as spawn:
+        env = dict(os.environ, **tracer.child_env())
+        assert parse_traceparent(env['TRACEPARENT']) == (spawn.trace_id, spawn.span_id)
+        subprocess.run([sys.executable, '-c', WORKER_SCRIPT], env=env, check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 3
+    resource = lines[0]['resourceSpans'][0]
+    assert resource['resource']['attributes'][0]['value']['stringValue'] == 'trylia-tryon-worker'
+    assert int(resource['scopeSpans'][0]['spans'][0]['endTimeUnixNano']) > 0
+
+    spans = load_traces(path, 100)[spawn.trace_id]
+    by_name = {span['name']: span for span in spans}
+    assert by_name['worker.startup']['parent_id'] == spawn.span_id
+    assert by_name['worker.model_load']['parent_id'] == by_name['worker.startup']['span_id']
+    assert by_name['worker.startup']['start'] >= by_name['worker_spawn']['start']
+
+    print("✅ Trace propagation works")
+
+
+def test_critical_path():
+    """The critical path follows the span each moment was waiting on, past the request's end"""
+    print("🧪 Testing critical path...")
+
+    def span(name, span_id, parent_id, start, end):
+        return {'trace_id': 't', 'span_id': span_id, 'parent_id': parent_id, 'name': name,
+                'service': 'test', 'start': start, 'end': end, 'error': None}
+
+    spans = [
+        span('POST /api/try-on', 'a', 'caller', 0, 100),
+        span('stop_previous', 'b', 'a', 10, 40),
+        span('camera_probe', 'c', 'a', 40, 60),
+        span('worker_spawn', 'd', 'a', 60, 90),
+        span('worker.startup', 'e', 'd', 80, 500),
+        span('worker.model_load', 'f', 'e', 150, 450),
+    ]
+    path = [(segment[0]['name'], segment[1], segment[2]) for segment in merge_segments(critical_path(spans))]
+    assert path == [
+        ('POST /api/try-on', 0, 10),
+        ('stop_previous', 10, 40),
+        ('camera_probe', 40, 60),
+        ('worker_spawn', 60, 80),
+        ('worker.startup', 80, 150),
+        ('worker.model_load', 150, 450),
+        ('worker.startup', 450, 500),
+    ]
+
+    print("✅ Critical path works")
+
+
+def test_request_spans():
+    """Each request gets a server span, continuing an incoming traceparent"""
+    print("🧪 Testing request spans...")
+
+    import api_server
+
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    exporter = api_server.tracer.exporter
+    api_server.tracer.exporter = JsonLinesExporter(path, 'trylia-api')
+    try:
+        client = api_server.create_app().test_client()
+        trace_id, caller_id = '4bf92f3577b34da6a3ce929d0e0e4736', '00f067aa0ba902b7'
+        response = client.get('/health', headers={'traceparent': f'00-{trace_id}-{caller_id}-01'})
+        assert response.headers['X-Trace-ID'] == trace_id
+        fresh = client.get('/api/contact/options')
+        assert fresh.headers['X-Trace-ID'] != trace_id
+    finally:
+        api_server.tracer.exporter = exporter
+
+    traces = load_traces(path, 100)
+    (health,) = traces[trace_id]
+    assert health['name'] == 'GET /health' and health['parent_id'] == caller_id
+    assert traces[fresh.headers['X-Trace-ID']][0]['parent_id'] is None
+
+    print("✅ Request spans work")
+
+
+def test_background_export_and_rotation():
+    """Queued spans are written off the caller's thread; writers sharing a file rotate it once"""
+    print("🧪 Testing background export and rotation...")
+
+    class BlockedExporter:
+        def __init__(self):
+            self.release = __import__('threading').Event()
+            self.spans = []
+
+        def export(self, span):
+            self.release.wait(5)
+            self.spans.append(span.name)
+
+    blocked = BlockedExporter()
+    queued = QueuedExporter(blocked, queue_size=2)
+    tracer = Tracer('trylia-api', queued)
+    for i in range(5):
+        tracer.start_span(f'span-{i}').end()
+    # Ending spans did not wait for the exporter; what did not fit was dropped
+    assert blocked.spans == [] and queued.dropped >= 2
+    blocked.release.set()
+    queued.flush()
+    assert len(blocked.spans) == 5 - queued.dropped
+    queued.stop()
+
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    first, second = JsonLinesExporter(path, 'a', max_bytes=1000), JsonLinesExporter(path, 'b', max_bytes=1000)
+    first.CHECK_EVERY = second.CHECK_EVERY = 1
+    writer = Tracer('trylia-api', first)
+    for i in range(20):
+        if os.path.exists(path + '.1'):
+            break
+        writer.exporter = first if i % 2 == 0 else second
+        writer.start_span(f'span-{i}').end()
+    rotated_size = os.path.getsize(path + '.1')
+    # The other writer finds the file already rotated and follows it instead of rotating again
+    for i in range(2):
+        writer.exporter = second if writer.exporter is first else first
+        writer.start_span(f'more-{i}').end()
+    assert os.path.getsize(path + '.1') == rotated_size
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) >= 2
+    assert os.path.exists(path + '.lock')
+
+    print("✅ Background export and rotation work")
+
+
+def test_background_child_env():
+    """A background tracer still hands its trace file to child processes"""
+    print("🧪 Testing child environment with a background tracer...")
+
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    tracer = configure_tracer('trylia-api', path, background=True)
+    try:
+        with tracer.span('worker_spawn') as spawn:
+            env = tracer.child_env()
+        assert env['TRACE_FILE'] == path
+        assert parse_traceparent(env['TRACEPARENT']) == (spawn.trace_id, spawn.span_id)
+    finally:
+        tracer.exporter.stop()
+
+    print("✅ Child environment with a background tracer works")
+
+
+if __name__ == "__main__":
+    test_trace_continues_in_child_process()
+    test_critical_path()
+    test_request_spans()
+    test_background_export_and_rotation()
+    test_background_child_env()
+    print("🎉 All tracing tests passed!")
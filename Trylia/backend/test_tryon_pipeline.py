@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the try-on stage pipeline with replayed landmarks (no camera or mediapipe)
+"""
+
+import os
+import tempfile
+
+from landmark_trace import TraceRecorder, TraceReplaySource
+from tryon_pipeline import build_pipeline, Stage, calculate_size_recommendation
+
+HEADLESS = {'replace': {'sink': 'null_sink'}}
+
+
+class CountingStage(Stage):
+    calls = 0
+
+    def process(self, ctx):
+        CountingStage.calls += 1
+        return ctx
+
+
+def make_trace(tmp, frames=20):
+    path = os.path.join(tmp, 'session.trace')
+    with TraceRecorder(path, (640, 480)) as recorder:
+        for i in range(frames):
+            landmarks = [[0, 0, 0] for _ in range(33)]
+            landmarks[11] = [270, 150, 0]
+            landmarks[12] = [380, 150, 0]
+            landmarks[23] = [290, 320, 0]
+            landmarks[24] = [360, 320, 0]
+            recorder.record(landmarks, timestamp=i / 30.0)
+    return path
+
+
+def test_pipeline_runs_all_stages():
+    """Every default stage runs and is timed for each frame"""
+    print("🧪 Testing pipeline run...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = TraceReplaySource(make_trace(tmp), realtime=False).open()
+        pipeline = build_pipeline(source, config=HEADLESS)
+        pipeline.select_shirt('male', 1)
+
+        last = None
+        while True:
+            ctx = pipeline.step()
+            if ctx is None:
+                break
+            last = ctx
+        pipeline.close()
+
+        assert last.size_recommendation == calculate_size_recommendation(110)
+        assert last.confidence > 0
+        assert last.garment is not None
+        report = pipeline.timing_report()
+        assert list(report) == ['capture', 'pose', 'record', 'smoothing', 'sizing',
+                                'transform', 'composite', 'hud', 'sink']
+        assert report['hud']['count'] == 20
+
+    print("✅ Pipeline runs all stages")
+
+
+def test_pipeline_config():
+    """Stages can be bypassed, replaced and reordered through configuration"""
+    print("🧪 Testing pipeline configuration...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = TraceReplaySource(make_trace(tmp, frames=5), realtime=False).open()
+        pipeline = build_pipeline(source, config={
+            'order': ['capture', 'smoothing', 'sizing', 'hud', 'sink'],
+            'bypass': ['hud'],
+            'replace': {'sink': 'test_tryon_pipeline:CountingStage'},
+            'options': {'smoothing': {'alpha': 1.0}}
+        })
+        CountingStage.calls = 0
+        pipeline.run()
+
+        assert [stage.name for stage in pipeline.stages] == ['capture', 'smoothing', 'sizing', 'sink']
+        assert CountingStage.calls == 5
+
+    print("✅ Pipeline configuration works")
+
+
+def test_headless_keeps_env_config():
+    """Headless workers swap in the null sink on top of TRYON_PIPELINE_CONFIG"""
+    print("🧪 Testing headless pipeline config...")
+
+    from unittest import mock
+    from tryon_service import create_pipeline
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = TraceReplaySource(make_trace(tmp), realtime=False).open()
+        with mock.patch.dict(os.environ, {'TRYON_PIPELINE_CONFIG': '{"bypass": ["hud"]}'}):
+            pipeline = create_pipeline(source, worker=True, headless=True)
+        names = [stage.name for stage in pipeline.stages]
+        assert 'hud' not in names
+        assert type(pipeline.stages[names.index('sink')]).__name__ == 'NullSink'
+        source.release()
+
+    print("✅ Headless pipeline config works")
+
+
+if __name__ == "__main__":
+    test_pipeline_runs_all_stages()
+    test_pipeline_config()
+    test_headless_keeps_env_config()
+    print("🎉 All pipeline tests passed!")
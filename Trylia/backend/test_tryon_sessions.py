@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test try-on session states: background startup, worker events, replacement
+and the /api/try-on endpoints
+"""
+
+import time
+import threading
+
+from tryon_sessions import SessionManager
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def event(name, pid, **data):
+    return {'id': 1, 'event': name, 'data': dict(data, pid=pid)}
+
+
+def test_session_follows_worker_events():
+    """A session moves through its states, each with a timestamp"""
+    print("🧪 Testing session states...")
+
+    manager = SessionManager()
+
+    def startup(session):
+        manager.advance(session, 'preparing')
+        manager.attach(session, 101)
+        manager.advance(session, 'probing_camera')
+        manager.advance(session, 'starting')
+
+    session = manager.submit('male', 1, startup)
+    wait_for(lambda: manager.get(session.id)['state'] == 'starting')
+    for name in ('camera_ready', 'model_loaded', 'first_frame'):
+        manager.on_worker_event(event(name, 101))
+    manager.on_worker_event(event('first_frame', 999))
+
+    status = manager.get(session.id)
+    assert status['state'] == 'running' and status['pid'] == 101
+    assert list(status['timestamps']) == ['queued', 'preparing', 'probing_camera', 'starting',
+                                          'camera_ready', 'model_loaded', 'running']
+
+    manager.on_worker_event(event('crashed', 101, error='Exited with status 1'))
+    status = manager.get(session.id)
+    assert status['state'] == 'crashed' and status['error'] == 'Exited with status 1'
+    assert manager.get('unknown') is None
+    manager.shutdown()
+
+    print("✅ Session states work")
+
+
+def test_newer_sessions_replace_older_ones():
+    """Queued sessions are skipped and running ones replaced when a newer one starts"""
+    print("🧪 Testing session replacement...")
+
+    manager = SessionManager()
+    release = threading.Event()
+    started = []
+
+    def startup(session):
+        started.append(session.id)
+        manager.attach(session, len(started))
+        if len(started) == 1:
+            release.wait(5)
+
+    first = manager.submit('male', 1, startup)
+    wait_for(lambda: started == [first.id])
+    queued = manager.submit('male', 2, startup)
+    latest = manager.submit('female', 1, startup)
+    assert queued.state == 'replaced'
+    release.set()
+
+    wait_for(lambda: len(started) == 2)
+    assert started == [first.id, latest.id]
+    wait_for(lambda: manager.get(first.id)['state'] == 'replaced')
+
+    manager.cancel()
+    assert manager.get(latest.id)['state'] == 'stopped'
+    manager.shutdown()
+
+    print("✅ Session replacement works")
+
+
+def test_failed_startup():
+    """An exception during startup fails the session with its message"""
+    print("🧪 Testing failed startup...")
+
+    manager = SessionManager()
+
+    def startup(session):
+        raise OSError("no such file")
+
+    session = manager.submit('male', 1, startup)
+    wait_for(lambda: manager.get(session.id)['state'] == 'failed')
+    assert manager.get(session.id)['error'] == 'no such file'
+    manager.shutdown()
+
+    print("✅ Failed startup works")
+
+
+def test_shutdown_drops_queued_startups():
+    """Startups still queued at shutdown never run; the manager restarts on the next submit"""
+    print("🧪 Testing shutdown...")
+
+    manager = SessionManager()
+    release, ran = threading.Event(), []
+
+    def blocking(session):
+        ran.append(session.id)
+        release.wait(5)
+
+    first = manager.submit('male', 1, blocking)
+    wait_for(lambda: ran == [first.id])
+    # Startups run one at a time, so this one is still queued
+    queued = manager.submit('male', 2, lambda session: ran.append(session.id))
+    manager.shutdown()
+    release.set()
+    time.sleep(0.1)
+    assert ran == [first.id] and manager.get(queued.id)['state'] == 'queued'
+
+    later = manager.submit('male', 3, lambda session: ran.append(session.id))
+    wait_for(lambda: ran[-1] == later.id)
+    manager.shutdown()
+
+    print("✅ Shutdown works")
+
+
+def test_try_on_endpoints():
+    """POST /api/try-on answers 202 at once; the session reports its progress"""
+    print("🧪 Testing try-on endpoints...")
+
+    import api_server
+
+    client = api_server.create_app().test_client()
+    assert client.post('/api/try-on', json={'shirtId': 999}).status_code == 400
+    assert client.get('/api/try-on/unknown').status_code == 404
+
+    calls = []
+    original = api_server.start_tryon_service
+    api_server.start_tryon_service = lambda session, *args: calls.append(session.id)
+    try:
+        response = client.post('/api/try-on', json={'shirtId': 101})
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['gender'] == 'female' and data['shirtIndex'] == 1
+        assert response.headers['Location'] == data['statusUrl'] == f"/api/try-on/{data['sessionId']}"
+        wait_for(lambda: calls == [data['sessionId']])
+    finally:
+        api_server.start_tryon_service = original
+
+    status = client.get(data['statusUrl']).get_json()
+    assert status['sessionId'] == data['sessionId'] and 'queued' in status['timestamps']
+
+    print("✅ Try-on endpoints work")
+
+
+if __name__ == "__main__":
+    test_session_follows_worker_events()
+    test_newer_sessions_replace_older_ones()
+    test_failed_startup()
+    test_shutdown_drops_queued_startups()
+    test_try_on_endpoints()
+    print("🎉 All try-on session tests passed!")
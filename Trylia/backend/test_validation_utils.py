@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test the compiled contact form validator
+"""
+
+from validation_utils import ContactFormValidator, ValidatedSubmission, normalize_email
+
+VALID_FORM = {
+    'companyName': '  Acme Fashion ',
+    'websiteUrl': 'acme.com',
+    'contactPerson': 'Jane Doe',
+    'businessEmail': 'jane@ACME.com',
+    'phoneNumber': '+1 (555) 123-4567',
+    'companySize': '11-50 employees',
+    'inquiryType': 'Demo Request',
+    'message': 'Please show us the virtual fitting room.',
+    'meetingMode': 'Zoom',
+    'country': 'Ukraine',
+    'meetingTime': ' '
+}
+
+
+def test_valid_form():
+    """A valid form comes back cleaned, with the normalized email attached"""
+    print("🧪 Testing valid contact form...")
+
+    is_valid, errors, data = ContactFormValidator.validate_contact_form(VALID_FORM)
+    assert is_valid and errors == {}
+    assert isinstance(data, ValidatedSubmission)
+    assert data['companyName'] == 'Acme Fashion'
+    assert data['websiteUrl'] == 'https://acme.com'
+    assert data.normalized_email == 'jane@acme.com'
+    assert 'meetingTime' not in data
+
+    print("✅ Valid contact form works")
+
+
+def test_invalid_form():
+    """Each failing field reports the same message the form has always shown"""
+    print("🧪 Testing invalid contact form...")
+
+    form = dict(VALID_FORM, companyName='A', phoneNumber='12ab', country=['India'],
+                inquiryType='Spam', message=None, businessEmail='nope')
+    is_valid, errors, _ = ContactFormValidator.validate_contact_form(form)
+    assert not is_valid
+    assert errors == {
+        'companyName': 'Company Name must be at least 2 characters',
+        'businessEmail': errors['businessEmail'],
+        'phoneNumber': 'Phone number should contain only digits, spaces, hyphens, parentheses, and plus sign',
+        'inquiryType': 'Please select a valid inquiry type',
+        'message': 'Message is required',
+        'country': 'Please select a valid country'
+    }
+    assert errors['businessEmail'].startswith('Invalid email format:')
+
+    normalize_email.cache_clear()
+    normalize_email('jane@acme.com')
+    normalize_email('jane@acme.com')
+    assert normalize_email.cache_info().hits == 1
+
+    print("✅ Invalid contact form works")
+
+
+if __name__ == "__main__":
+    test_valid_form()
+    test_invalid_form()
+    print("🎉 All validation tests passed!")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test the try-on worker heartbeat, the watchdog's health checks, the warm
+spare and the restart counters
+"""
+
+import sys
+import time
+import subprocess
+
+from metrics import ServiceMetrics
+from process_registry import WarmSpare, stop_process
+from worker_watchdog import Heartbeat, WorkerWatchdog, open_heartbeat_writer
+
+SLEEPER = [sys.executable, '-c', 'import time; time.sleep(60)']
+WRITER = '''
+import sys
+from worker_watchdog import HeartbeatWriter
+writer = HeartbeatWriter(sys.argv[1])
+for _ in range(3):
+    writer()
+writer.close()
+'''
+
+
+class FakeHeartbeat:
+    def __init__(self):
+        self.frames = 0
+        self.last_frame_at = 0.0
+
+    def beat(self, at, frames=1):
+        self.frames += frames
+        self.last_frame_at = at
+
+    def read(self):
+        return self.frames, self.last_frame_at
+
+
+def test_heartbeat_roundtrip():
+    """Frames written by the worker side are read by the server side"""
+    print("🧪 Testing heartbeat...")
+
+    heartbeat = Heartbeat()
+    try:
+        assert heartbeat.read() == (0, 0.0)
+        # The block outlives the worker that wrote it
+        subprocess.run([sys.executable, '-c', WRITER, heartbeat.name], check=True)
+        frames, last_frame_at = heartbeat.read()
+        assert frames == 3 and last_frame_at > 0
+    finally:
+        heartbeat.close()
+    # Closing twice, as the monitor thread and the spare may both do, is fine
+    heartbeat.close()
+
+    print("✅ Heartbeat works")
+
+
+def test_missing_heartbeat():
+    """A worker whose heartbeat block cannot be opened runs without one"""
+    print("🧪 Testing missing heartbeat...")
+
+    assert open_heartbeat_writer(None) is None
+    assert open_heartbeat_writer('trylia_hb_does_not_exist') is None
+
+    print("✅ Missing heartbeat is skipped")
+
+
+def test_watchdog_reasons():
+    """Workers without a first frame, stalled or below the fps floor are reported once"""
+    print("🧪 Testing watchdog checks...")
+
+    watchdog = WorkerWatchdog(None, stall_timeout=2, min_fps=10, slo_window=3, startup_timeout=60, interval=1)
+    starting, stalled, slow, healthy = FakeHeartbeat(), FakeHeartbeat(), FakeHeartbeat(), FakeHeartbeat()
+    start = time.monotonic()
+    for pid, heartbeat in enumerate((starting, stalled, slow, healthy), 1):
+        watchdog.watch(pid, heartbeat)
+        watchdog._watched[pid].since = start
+
+    stalled.beat(start + 1)
+    reported = {}
+    for second in range(2, 12):
+        now = start + second
+        slow.beat(now, frames=2)
+        healthy.beat(now, frames=30)
+        for pid, reason in watchdog.check(now):
+            reported[pid] = (reason, second)
+    # 2 fps stays below the floor for the 3 s window from the first reading
+    assert reported == {2: ('stalled', 3), 3: ('slow', 5)}
+    healthy.beat(start + 60, frames=30 * 49)
+    assert watchdog.check(start + 60) == [(1, 'no_first_frame')]
+    assert watchdog.check(start + 62) == [(4, 'stalled')]
+
+    assert watchdog.status(2)['unhealthy'] == 'stalled'
+    watchdog.forget(2)
+    assert watchdog.status(2) is None
+
+    print("✅ Watchdog checks work")
+
+
+def test_warm_spare():
+    """take() hands over the waiting spare; refill() starts the next one"""
+    print("🧪 Testing warm spare...")
+
+    discarded = []
+
+    def discard(process):
+        stop_process(process)
+        discarded.append(process.pid)
+
+    spare = WarmSpare(lambda: subprocess.Popen(SLEEPER), discard=discard)
+    assert spare.take() is None
+    spare.refill()
+    first = spare.take()
+    assert first is not None and first.poll() is None
+    assert spare.take() is None
+
+    spare.refill()
+    spare.refill()
+    second = spare._process
+    second.kill()
+    second.wait()
+    # A spare that died while waiting is discarded, not handed over
+    assert spare.take() is None and discarded == [second.pid]
+
+    spare.refill()
+    third = spare._process
+    spare.stop()
+    assert third.poll() is not None and discarded == [second.pid, third.pid]
+    stop_process(first)
+
+    print("✅ Warm spare works")
+
+
+def test_restart_counters():
+    """Watchdog counters are exposed as Prometheus counters"""
+    print("🧪 Testing restart counters...")
+
+    metrics = ServiceMetrics()
+    metrics.count('trylia_worker_unhealthy_total', [('reason', 'stalled')])
+    metrics.count('trylia_worker_unhealthy_total', [('reason', 'stalled')])
+    metrics.count('trylia_worker_restarts_total')
+    metrics.count('trylia_worker_spawns_total', [('source', 'spare')])
+    text = metrics.to_prometheus()
+    assert '# TYPE trylia_worker_unhealthy_total counter' in text
+    assert 'trylia_worker_unhealthy_total{reason="stalled"} 2' in text
+    assert 'trylia_worker_restarts_total 1' in text
+    assert 'trylia_worker_spawns_total{source="spare"} 1' in text
+
+    print("✅ Restart counters work")
+
+
+if __name__ == "__main__":
+    test_heartbeat_roundtrip()
+    test_missing_heartbeat()
+    test_watchdog_reasons()
+    test_warm_spare()
+    test_restart_counters()
+    print("🎉 All worker watchdog tests passed!")
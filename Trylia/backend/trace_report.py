@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Critical paths of the slowest recent requests in the trace file
+Reads the spans written by tracing.py (the API server and the try-on
+workers it starts), groups them by trace and, for the slowest traces,
+prints the chain of spans that determined the end-to-end time.
+"""
+
+import os
+import json
+import argparse
+
+from log_reader import tail_lines
+
+
+def iter_otlp_spans(line):
+    """Span dicts from one OTLP/JSON line of the trace file"""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return
+    for resource_spans in request.get('resourceSpans', []):
+        service = next((item['value'].get('stringValue') for item in resource_spans.get('resource', {})
+                        .get('attributes', []) if item.get('key') == 'service.name'), None)
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                yield {
+                    'trace_id': span['traceId'],
+                    'span_id': span['spanId'],
+                    'parent_id': span.get('parentSpanId'),
+                    'name': span['name'],
+                    'service': service,
+                    'start': int(span['startTimeUnixNano']),
+                    'end': int(span['endTimeUnixNano']),
+                    'error': span.get('status', {}).get('message'),
+                }
+
+
+def load_traces(path, recent):
+    """trace ID -> spans, from the last recent lines of the trace file"""
+    traces = {}
+    for line in tail_lines(path, recent):
+        for span in iter_otlp_spans(line):
+            traces.setdefault(span['trace_id'], []).append(span)
+    return traces
+
+
+def trace_root(spans):
+    """
+    The span the trace hangs from. When several spans have no parent in the
+    file (the caller's span is elsewhere, or lines were cut off by --recent)
+    a synthetic root covers them all.
+    """
+    ids = {span['span_id'] for span in spans}
+    roots = [span for span in spans if span['parent_id'] not in ids]
+    if len(roots) == 1:
+        return roots[0]
+    return {'span_id': None, 'name': '(trace)', 'service': None, 'error': None,
+            'start': min(span['start'] for span in spans), 'end': max(span['end'] for span in spans)}
+
+
+def critical_path(spans):
+    """
+    (span, start ns, end ns) segments covering the trace from its first
+    start to its last end, in time order. Each segment is the span whose
+    own work the trace was waiting on at the time. A child may end after
+    its parent (the try-on worker outlives the request that started it),
+    so spans are measured to the last end in their subtree.
+    """
+    root = trace_root(spans)
+    ids = {span['span_id'] for span in spans}
+    children = {}
+    for span in spans:
+        if span is not root:
+            # Spans without a parent here hang from the synthetic root
+            children.setdefault(span['parent_id'] if span['parent_id'] in ids else None, []).append(span)
+
+    subtree_end = {}
+
+    def effective_end(span):
+        key = span['span_id']
+        if key not in subtree_end:
+            subtree_end[key] = max([span['end']] + [effective_end(child)
+                                                    for child in children.get(key, [])])
+        return subtree_end[key]
+
+    def walk(span, until):
+        segments = []
+        cursor = until
+        for child in sorted(children.get(span['span_id'], []), key=effective_end, reverse=True):
+            child_end = min(effective_end(child), cursor)
+            if child['start'] >= cursor or child_end <= span['start']:
+                continue
+            if child_end < cursor:
+                segments.append((span, child_end, cursor))
+            segments += walk(child, child_end)
+            cursor = max(child['start'], span['start'])
+        if cursor > span['start']:
+            segments.append((span, span['start'], cursor))
+        return segments
+
+    return list(reversed(walk(root, effective_end(root))))
+
+
+def merge_segments(segments):
+    """Join consecutive segments of the same span"""
+    merged = []
+    for span, start, end in segments:
+        if merged and merged[-1][0] is span and merged[-1][2] == start:
+            merged[-1] = (span, merged[-1][1], end)
+        else:
+            merged.append((span, start, end))
+    return merged
+
+
+def trace_duration_ms(spans):
+    return (max(span['end'] for span in spans) - min(span['start'] for span in spans)) / 1e6
+
+
+def print_trace(rank, spans):
+    root = trace_root(spans)
+    duration_ms = trace_duration_ms(spans)
+    trace_start = min(span['start'] for span in spans)
+    services = {span['service'] for span in spans if span['service']}
+    errors = [span for span in spans if span['error']]
+
+    print(f"{rank}. {root['name']}  {duration_ms:.1f} ms  trace {spans[0]['trace_id']}")
+    print(f"   {len(spans)} spans from {', '.join(sorted(services))}"
+          + (f", {len(errors)} failed" if errors else ""))
+    print("   Critical path:")
+    reported = set()
+    for span, start, end in merge_segments(critical_path(spans)):
+        segment_ms = (end - start) / 1e6
+        share = segment_ms / duration_ms * 100 if duration_ms else 0.0
+        # A span's error is shown on its first segment only
+        marker = "  ❌ " + span['error'] if span['error'] and span['span_id'] not in reported else ""
+        reported.add(span['span_id'])
+        print(f"   {(start - trace_start) / 1e6:9.1f} ms  +{segment_ms:9.1f} ms  {share:5.1f}%  "
+              f"{span['name']}{marker}")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Critical paths of the slowest traced requests")
+    parser.add_argument('--file', default=os.getenv('TRACE_FILE') or 'traces.jsonl', help="Trace file")
+    parser.add_argument('--slowest', type=int, default=5, help="Number of traces to show")
+    parser.add_argument('--recent', type=int, default=5000, help="Only read this many spans from the end of the file")
+    parser.add_argument('--name', help="Only traces whose root span name contains this, e.g. try-on")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        print(f"❌ No trace file found at {args.file}. Make sure the backend server has been running.")
+        return 1
+
+    traces = load_traces(args.file, args.recent)
+    if args.name:
+        traces = {trace_id: spans for trace_id, spans in traces.items() if args.name in trace_root(spans)['name']}
+    if not traces:
+        print("📭 No matching traces")
+        return 0
+
+    slowest = sorted(traces.values(), key=trace_duration_ms, reverse=True)[:args.slowest]
+    print(f"🐢 Slowest {len(slowest)} of {len(traces)} traces in {args.file}")
+    print("=" * 60)
+    for rank, spans in enumerate(slowest, 1):
+        print_trace(rank, spans)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
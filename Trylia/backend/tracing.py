@@ -0,0 +1,321 @@
+"""
+Lightweight request tracing for the Trylia backend
+Spans carry W3C trace context (the traceparent format) and are appended to a
+JSON-lines file, one OTLP/JSON ExportTraceServiceRequest per line, so the
+file can be read by trace_report.py or loaded into OpenTelemetry tooling.
+The API server passes the context of a request to the try-on worker through
+its environment (TRACEPARENT), so both sides land in one trace.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+TRACEPARENT_ENV = 'TRACEPARENT'
+TRACE_FILE_ENV = 'TRACE_FILE'
+# Wall-clock time (ns) just before the worker process was started
+SPAWNED_AT_ENV = 'TRYON_SPAWNED_AT_NS'
+
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_current_span = contextvars.ContextVar('trylia_current_span', default=None)
+
+
+def parse_traceparent(value):
+    """(trace_id, span_id) from a traceparent header, or None if invalid"""
+    parts = (value or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def _attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    """A timed operation; end() exports it"""
+
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'parent_id', 'name', 'kind',
+                 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, tracer, name, trace_id, parent_id, kind, start_ns, attributes):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    @property
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        self.error = str(message)
+
+    def end(self, end_ns=None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            self.tracer.export(self)
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KINDS[self.kind],
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': _attribute_value(value)}
+                           for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class JsonLinesExporter:
+    """
+    Appends spans to a file that several processes may share. Each span is
+    one write() on an O_APPEND descriptor, so lines do not interleave. The
+    file is renamed to <path>.1 once it exceeds max_bytes; processes rotate
+    under <path>.lock, so only one of them renames a full file.
+    """
+
+    CHECK_EVERY = 100
+
+    def __init__(self, path, service_name, max_bytes=None):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes or int(os.getenv('TRACE_MAX_BYTES', str(20 * 1024 * 1024)))
+        self._resource = {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]}
+        self._lock = threading.Lock()
+        self._fd = None
+        self._exports = 0
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    @contextmanager
+    def _rotation_lock(self):
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def _maybe_rotate(self):
+        with self._rotation_lock():
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                current = None
+            ours = os.fstat(self._fd)
+            if current is None or (current.st_dev, current.st_ino) != (ours.st_dev, ours.st_ino):
+                # Another process rotated the file
+                os.close(self._fd)
+                self._open()
+            elif current.st_size > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+                os.close(self._fd)
+                self._open()
+
+    def export(self, span):
+        line = json.dumps({'resourceSpans': [{
+            'resource': self._resource,
+            'scopeSpans': [{'scope': {'name': 'trylia'}, 'spans': [span.to_otlp()]}]
+        }]}, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._fd is None:
+                self._open()
+            self._exports += 1
+            if self._exports % self.CHECK_EVERY == 0:
+                self._maybe_rotate()
+            os.write(self._fd, line.encode('utf-8'))
+
+
+class QueuedExporter:
+    """
+    Hands ended spans to a background thread that exports them, so request
+    threads never wait on the disk. When the queue is full spans are dropped
+    and counted, as log records are (see log_setup.py).
+    """
+
+    def __init__(self, exporter, queue_size=None):
+        self.exporter = exporter
+        self.queue = queue.Queue(maxsize=queue_size or int(os.getenv('TRACE_QUEUE_SIZE', '10000')))
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+        self._thread.start()
+
+    @property
+    def path(self):
+        return self.exporter.path
+
+    def export(self, span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        while True:
+            span = self.queue.get()
+            try:
+                if span is None:
+                    return
+                self.exporter.export(span)
+            except OSError:
+                # A full or missing disk must not stop tracing for good
+                with self._lock:
+                    self.dropped += 1
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until every queued span has been exported"""
+        self.queue.join()
+
+    def stop(self):
+        """Export everything still queued and stop the thread"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class Tracer:
+    """Creates spans; without an exporter spans are timed but not recorded"""
+
+    def __init__(self, service_name, exporter=None):
+        self.service_name = service_name
+        self.exporter = exporter
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def start_span(self, name, parent=None, kind='internal', start_ns=None, attributes=None):
+        """
+        Start a span under parent: a Span, a (trace_id, span_id) pair, None
+        for the current span (a new trace if there is none) or False to
+        always start a new trace.
+        """
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, Span):
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif parent:
+            trace_id, parent_id = parent
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+        return Span(self, name, trace_id, parent_id, kind, start_ns, attributes)
+
+    def activate(self, span):
+        """Make span the parent of spans started in this context; returns a reset token"""
+        return _current_span.set(span)
+
+    def deactivate(self, token):
+        _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the block as a child of the current span"""
+        span = self.start_span(name, attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(repr(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def export(self, span):
+        if self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except OSError:
+                # Tracing must never break the traced operation
+                pass
+
+    def child_env(self):
+        """Environment for a child process to continue the current trace"""
+        span = _current_span.get()
+        if not self.enabled or span is None:
+            return {}
+        return {TRACEPARENT_ENV: span.traceparent, TRACE_FILE_ENV: self.exporter.path,
+                SPAWNED_AT_ENV: str(time.time_ns())}
+
+
+def configure_tracer(service_name, path=None, background=False):
+    """
+    Tracer writing to TRACE_FILE (default traces.jsonl); an empty TRACE_FILE
+    disables tracing. With background=True spans are written by a thread
+    behind a bounded queue of TRACE_QUEUE_SIZE (10000) spans.
+    """
+    path = os.getenv(TRACE_FILE_ENV, 'traces.jsonl') if path is None else path
+    if not path:
+        return Tracer(service_name)
+    exporter = JsonLinesExporter(path, service_name)
+    if background:
+        exporter = QueuedExporter(exporter)
+        atexit.register(exporter.stop)
+    return Tracer(service_name, exporter)
+
+
+def worker_trace_context(service_name='trylia-tryon-worker'):
+    """
+    (tracer, parent context, spawn time in ns) for a process started by
+    the API server. Outside a trace the tracer records nothing and the
+    parent and spawn time are None.
+    """
+    parent = parse_traceparent(os.getenv(TRACEPARENT_ENV))
+    path = os.getenv(TRACE_FILE_ENV)
+    if parent is None or not path:
+        return Tracer(service_name), None, None
+    spawned_at = os.getenv(SPAWNED_AT_ENV, '')
+    return configure_tracer(service_name, path), parent, int(spawned_at) if spawned_at.isdigit() else None
@@ -0,0 +1,573 @@
+"""
+Frame pipeline engine for the Trylia virtual try-on
+Capture, pose, smoothing, sizing, garment transform, composite, HUD and sink
+are registered stages behind one interface. The engine times every stage and
+lets configuration bypass, replace or reorder them, so the interactive viewer
+and the API worker share one implementation.
+"""
+
+import os
+import json
+import math
+import time
+import importlib
+import logging
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+SHIRT_EXTENSIONS = (".png", ".jpg", ".jpeg")
+SHIRT_RATIO = 581 / 440  # Height/Width ratio of shirt images
+VALID_SIZES = ["XS", "S", "M", "L", "XL"]
+
+DEFAULT_STAGE_ORDER = [
+    "capture", "pose", "record", "smoothing", "sizing",
+    "transform", "composite", "hud", "sink"
+]
+
+
+# --- Sizing and HUD helpers ---
+
+def calculate_size_recommendation(shoulder_dist):
+    """
+    Calculate size recommendation based on shoulder distance in pixels.
+    Caps the size at XL maximum.
+    """
+    shoulder_dist = max(0, min(shoulder_dist, 140))  # Clamp to max 140 pixels
+    if shoulder_dist < 80:
+        return "XS"
+    elif shoulder_dist < 100:
+        return "S"
+    elif shoulder_dist < 120:
+        return "M"
+    elif shoulder_dist < 140:
+        return "L"
+    else:
+        return "XL"  # Max size
+
+
+def calculate_confidence_score(lmList, shoulder_dist, stability_px=150.0):
+    """
+    Calculate confidence/accuracy score based on pose detection quality.
+    """
+    if not lmList or len(lmList) < 25:
+        return 0.0
+
+    key_landmarks = [11, 12, 23, 24]  # shoulders and hips
+    visible_count = 0
+
+    for idx in key_landmarks:
+        if idx < len(lmList) and len(lmList[idx]) >= 3:
+            # Check if landmark has visibility/confidence
+            if len(lmList[idx]) > 3 and lmList[idx][3] > 0.5:
+                visible_count += 1
+            elif len(lmList[idx]) == 3:
+                visible_count += 1
+
+    visibility_score = visible_count / len(key_landmarks)
+    shoulder_stability = min(1.0, shoulder_dist / stability_px) if shoulder_dist > 0 else 0.0
+
+    confidence = (visibility_score * 0.7 + shoulder_stability * 0.3) * 100
+    return min(100.0, confidence)
+
+
+def draw_info_panel(img, size_rec, confidence, gender, shirt_index):
+    """
+    Draw size recommendation and confidence score at bottom right corner.
+    """
+    h, w = img.shape[:2]
+
+    panel_width = 280
+    panel_height = 120
+    panel_x = w - panel_width - 20
+    panel_y = h - panel_height - 20
+
+    overlay = img.copy()
+    cv2.rectangle(overlay, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (0, 0, 0), -1)
+    cv2.addWeighted(overlay, 0.7, img, 0.3, 0, img)
+
+    cv2.rectangle(img, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (255, 255, 255), 2)
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = 0.6
+    thickness = 2
+
+    title_text = f"{gender.upper()} SHIRT {shirt_index}"
+    cv2.putText(img, title_text, (panel_x + 10, panel_y + 25), font, 0.5, (255, 255, 255), 1)
+
+    # Ensure size_rec is valid
+    if size_rec not in VALID_SIZES:
+        size_rec = "XL"
+
+    size_text = f"Recommended Size: {size_rec}"
+    cv2.putText(img, size_text, (panel_x + 10, panel_y + 50), font, font_scale, (0, 255, 0), thickness)
+
+    conf_text = f"Accuracy: {confidence:.1f}%"
+    if confidence >= 80:
+        conf_color = (0, 255, 0)  # Green
+    elif confidence >= 60:
+        conf_color = (0, 255, 255)  # Yellow
+    else:
+        conf_color = (0, 0, 255)  # Red
+    cv2.putText(img, conf_text, (panel_x + 10, panel_y + 75), font, font_scale, conf_color, thickness)
+
+    bar_x = panel_x + 10
+    bar_y = panel_y + 90
+    bar_width = 200
+    bar_height = 15
+    cv2.rectangle(img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (50, 50, 50), -1)
+
+    fill_width = int((confidence / 100.0) * bar_width)
+    cv2.rectangle(img, (bar_x, bar_y), (bar_x + fill_width, bar_y + bar_height), conf_color, -1)
+    cv2.rectangle(img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (255, 255, 255), 1)
+
+    return img
+
+
+def list_shirts(gender):
+    """Shirt image paths for a gender, relative to the static directory"""
+    folder = os.path.join(STATIC_DIR, gender)
+    return [f"{gender}/{f}" for f in sorted(os.listdir(folder)) if f.lower().endswith(SHIRT_EXTENSIONS)]
+
+
+# --- Frame context ---
+
+class FrameContext:
+    """Per-frame state handed from stage to stage"""
+
+    def __init__(self, index):
+        self.index = index
+        self.image = None
+        self.timestamp = 0.0
+        self.captured_at = 0.0
+        self.landmarks = None
+        self.shoulder_dist = 0.0
+        self.anchor = None      # smoothed (cx, cy, w, h) of the garment
+        self.garment = None     # transformed BGRA garment image
+        self.garment_pos = None
+        self.size_recommendation = "N/A"
+        self.confidence = 0.0
+        self.timings = {}
+        self.stop = False
+
+
+# --- Stages ---
+
+STAGE_REGISTRY = {}
+
+
+def register_stage(name):
+    """Class decorator that makes a stage available to pipeline configs"""
+    def decorator(cls):
+        cls.name = name
+        STAGE_REGISTRY[name] = cls
+        return cls
+    return decorator
+
+
+class Stage:
+    """
+    Base class for pipeline stages. process() receives the FrameContext and
+    returns it, or returns None / sets ctx.stop to end the stream.
+    """
+
+    name = "stage"
+
+    def __init__(self, **options):
+        self.options = options
+
+    def setup(self, engine):
+        self.engine = engine
+
+    def process(self, ctx):
+        return ctx
+
+    def teardown(self):
+        pass
+
+
+@register_stage("capture")
+class CaptureStage(Stage):
+    """Reads the next frame from the engine's frame source"""
+
+    def process(self, ctx):
+        source = self.engine.source
+        success, img = source.read()
+        if not success:
+            return None
+        ctx.image = img
+        ctx.timestamp = source.timestamp
+        ctx.captured_at = source.captured_at
+        if source.provides_landmarks:
+            ctx.landmarks = source.landmarks
+        return ctx
+
+
+@register_stage("pose")
+class PoseStage(Stage):
+    """Runs the calibrated pose detector unless the source supplied landmarks"""
+
+    def setup(self, engine):
+        super().setup(engine)
+        self.detector = None
+        self.config = None
+        if not engine.source.provides_landmarks:
+            from calibration import get_pose_config, create_pose_detector
+            self.config = self.options.get("config") or get_pose_config()
+            print(f"[INFO] Pose config: model complexity {self.config['model_complexity']}, "
+                  f"inference width {self.config['inference_width']}px")
+            self.detector = create_pose_detector(self.config)
+
+    def process(self, ctx):
+        if ctx.landmarks is None and self.detector is not None:
+            from calibration import find_landmarks
+            ctx.landmarks = find_landmarks(self.detector, ctx.image, self.config["inference_width"])
+        return ctx
+
+
+@register_stage("record")
+class RecordStage(Stage):
+    """Appends landmarks to a trace when TRYON_RECORD_TRACE is set"""
+
+    def setup(self, engine):
+        super().setup(engine)
+        self.recorder = None
+        if not engine.source.provides_landmarks:
+            from landmark_trace import open_recorder_from_env
+            self.recorder = open_recorder_from_env((engine.source.width, engine.source.height))
+
+    def process(self, ctx):
+        if self.recorder:
+            self.recorder.record(ctx.landmarks, frame=ctx.image)
+        return ctx
+
+    def teardown(self):
+        if self.recorder:
+            self.recorder.close()
+
+
+@register_stage("smoothing")
+class SmoothingStage(Stage):
+    """Exponential smoothing of the garment anchor so the overlay is stable"""
+
+    def setup(self, engine):
+        super().setup(engine)
+        self.alpha = float(self.options.get("alpha", 0.2))  # smaller = smoother
+        self.prev = (0, 0, 0, 0)
+
+    def process(self, ctx):
+        lmList = ctx.landmarks
+        if not lmList or len(lmList) < 25:
+            ctx.anchor = None
+            return ctx
+
+        lm11, lm12 = lmList[11], lmList[12]
+        lm23, lm24 = lmList[23], lmList[24]
+        ctx.shoulder_dist = math.hypot(lm12[0] - lm11[0], lm12[1] - lm11[1])
+
+        w = int(ctx.shoulder_dist * 1.6)
+        h = int(w * SHIRT_RATIO)
+        cx = (lm11[0] + lm12[0]) // 2
+        cy = (lm11[1] + lm12[1]) // 2
+        torso_y = (lm23[1] + lm24[1]) // 2
+        cy_torso = (cy + torso_y) // 2
+
+        prev_cx, prev_cy, prev_w, prev_h = self.prev
+        cx = int(prev_cx + (cx - prev_cx) * self.alpha)
+        cy_torso = int(prev_cy + (cy_torso - prev_cy) * self.alpha)
+        w = int(prev_w + (w - prev_w) * self.alpha)
+        h = int(prev_h + (h - prev_h) * self.alpha)
+        self.prev = (cx, cy_torso, w, h)
+        ctx.anchor = self.prev
+        return ctx
+
+
+@register_stage("sizing")
+class SizingStage(Stage):
+    """Size recommendation and confidence score from the shoulder distance"""
+
+    def process(self, ctx):
+        if not ctx.landmarks or len(ctx.landmarks) < 25:
+            ctx.size_recommendation = "N/A"
+            ctx.confidence = 0.0
+            return ctx
+        stability_px = float(self.options.get("stability_px", 150.0))
+        ctx.confidence = calculate_confidence_score(ctx.landmarks, ctx.shoulder_dist, stability_px)
+        ctx.size_recommendation = calculate_size_recommendation(ctx.shoulder_dist)
+        return ctx
+
+
+@register_stage("transform")
+class GarmentTransformStage(Stage):
+    """
+    Scales, mirrors and rotates the selected shirt to the smoothed anchor.
+    The decoded shirt is cached per file, and the scaled copy per size,
+    instead of reading the PNG from disk on every frame.
+    """
+
+    def setup(self, engine):
+        super().setup(engine)
+        self.min_shoulder_px = float(self.options.get("min_shoulder_px", 50))
+        self.mirror = bool(self.options.get("mirror", True))
+        self._images = {}
+        self._scaled_key = None
+        self._scaled = None
+
+    def _load(self, shirt):
+        if shirt not in self._images:
+            path = os.path.join(STATIC_DIR, shirt)
+            img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if img is not None and self.mirror:
+                img = cv2.flip(img, 1)
+            self._images[shirt] = img
+        return self._images[shirt]
+
+    def process(self, ctx):
+        ctx.garment = None
+        shirt = self.engine.state.get("shirt")
+        if not shirt or ctx.anchor is None or ctx.shoulder_dist < self.min_shoulder_px:
+            return ctx
+
+        cx, cy, w, h = ctx.anchor
+        if w <= 0 or h <= 0:
+            return ctx
+        base = self._load(shirt)
+        if base is None:
+            return ctx
+
+        key = (shirt, w, h)
+        if key != self._scaled_key:
+            self._scaled = cv2.resize(base, (w, h))
+            self._scaled_key = key
+
+        lm11, lm12 = ctx.landmarks[11], ctx.landmarks[12]
+        dx = lm12[0] - lm11[0]
+        dy = lm12[1] - lm11[1]
+        angle = math.degrees(math.atan2(dy, dx))
+        if dx < 0:
+            angle += 180
+
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1)
+        ctx.garment = cv2.warpAffine(self._scaled, M, (w, h), borderMode=cv2.BORDER_TRANSPARENT)
+        ctx.garment_pos = [max(cx - w // 2, 0), max(cy - h // 2, 0)]
+        return ctx
+
+
+@register_stage("composite")
+class CompositeStage(Stage):
+    """Alpha-blends the transformed garment onto the frame"""
+
+    def process(self, ctx):
+        if ctx.garment is not None:
+            try:
+                import cvzone
+                ctx.image = cvzone.overlayPNG(ctx.image, ctx.garment, ctx.garment_pos)
+            except Exception as e:
+                print(f"[WARN] Shirt overlay skipped: {e}")
+        return ctx
+
+
+@register_stage("hud")
+class HudStage(Stage):
+    """Draws the size and accuracy panel"""
+
+    def process(self, ctx):
+        state = self.engine.state
+        ctx.image = draw_info_panel(ctx.image, ctx.size_recommendation, ctx.confidence,
+                                    state.get("gender", ""), state.get("shirt_index", 0))
+        return ctx
+
+
+@register_stage("sink")
+class DisplaySink(Stage):
+    """
+    Shows frames in an OpenCV window. 'q' stops the stream; other keys are
+    dispatched to engine.key_handlers.
+    """
+
+    def setup(self, engine):
+        super().setup(engine)
+        self.window = self.options.get("window", "Virtual Try-On")
+        cv2.namedWindow(self.window, cv2.WINDOW_NORMAL)
+        if self.options.get("fullscreen"):
+            width, height = self.options.get("screen_size") or (1280, 720)
+            cv2.resizeWindow(self.window, width, height)
+            cv2.moveWindow(self.window, 0, 0)
+            cv2.setWindowProperty(self.window, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    def process(self, ctx):
+        cv2.imshow(self.window, ctx.image)
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            ctx.stop = True
+        elif key != 0xFF and chr(key) in self.engine.key_handlers:
+            self.engine.key_handlers[chr(key)]()
+        return ctx
+
+    def teardown(self):
+        cv2.destroyAllWindows()
+
+
+@register_stage("null_sink")
+class NullSink(Stage):
+    """Discards frames, for headless profiling and tests"""
+
+
+# --- Engine ---
+
+class StageStats:
+    """Running timing statistics for one stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'meanMs': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'maxMs': round(self.max_ms, 3),
+            'lastMs': round(self.last_ms, 3)
+        }
+
+
+class TryOnPipeline:
+    """Runs a list of stages over frames from a source, timing each stage"""
+
+    def __init__(self, source, stages):
+        self.source = source
+        self.stages = stages
+        self.state = {"gender": "male", "shirt_index": 1, "shirt": None}
+        self.key_handlers = {}
+        self.frame_listeners = []  # called with each completed FrameContext
+        self.stats = {stage.name: StageStats() for stage in stages}
+        self.frame_index = 0
+        self._started = False
+
+    def select_shirt(self, gender, index):
+        if gender not in ("male", "female"):
+            raise ValueError("Invalid gender")
+        shirts = list_shirts(gender)
+        if not 1 <= index <= len(shirts):
+            raise ValueError(f"Invalid {gender} shirt index: {index} (available: 1-{len(shirts)})")
+        self.state.update({"gender": gender, "shirt_index": index, "shirt": shirts[index - 1]})
+        print(f"[INFO] Selected shirt: {shirts[index - 1]}")
+
+    def start(self):
+        if not self._started:
+            for stage in self.stages:
+                stage.setup(self)
+            self._started = True
+
+    def step(self):
+        """Process one frame. Returns the FrameContext, or None at end of stream."""
+        self.start()
+        ctx = FrameContext(self.frame_index)
+        self.frame_index += 1
+
+        for stage in self.stages:
+            start = time.perf_counter()
+            result = stage.process(ctx)
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            ctx.timings[stage.name] = elapsed_ms
+            self.stats[stage.name].add(elapsed_ms)
+            if result is None:
+                return None
+            if ctx.stop:
+                break
+
+        for listener in self.frame_listeners:
+            listener(ctx)
+        return ctx
+
+    def run(self):
+        """Process frames until the source ends or a stage stops the stream"""
+        self.start()
+        try:
+            while True:
+                ctx = self.step()
+                if ctx is None or ctx.stop:
+                    break
+        finally:
+            self.close()
+
+    def close(self):
+        for stage in self.stages:
+            try:
+                stage.teardown()
+            except Exception as e:
+                logger.error(f"Stage {stage.name} teardown failed: {e}")
+        self.source.release()
+
+    def timing_report(self):
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+
+def load_pipeline_config(value=None):
+    """
+    Pipeline configuration from a dict, a JSON string, a JSON file path, or
+    TRYON_PIPELINE_CONFIG. Supported keys:
+
+        order    list of stage names to run, in order
+        bypass   stage names to drop from the order
+        replace  {"stage name": "module:ClassName" or registered name}
+        options  {"stage name": {option: value}}
+    """
+    if value is None:
+        value = os.getenv("TRYON_PIPELINE_CONFIG", "")
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    if os.path.exists(value):
+        with open(value, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+def _resolve_stage_class(name):
+    if name in STAGE_REGISTRY:
+        return STAGE_REGISTRY[name]
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    raise ValueError(f"Unknown pipeline stage: {name}")
+
+
+def build_pipeline(source, config=None, options=None):
+    """
+    Build a TryOnPipeline from the default stage order plus configuration.
+    `options` are per-stage defaults from the caller, which the config's own
+    options override.
+    """
+    config = load_pipeline_config(config)
+    order = list(config.get("order") or DEFAULT_STAGE_ORDER)
+    bypass = set(config.get("bypass") or [])
+    replace = config.get("replace") or {}
+
+    stage_options = {name: dict(values) for name, values in (options or {}).items()}
+    for name, values in (config.get("options") or {}).items():
+        stage_options.setdefault(name, {}).update(values)
+
+    stages = []
+    for name in order:
+        if name in bypass:
+            continue
+        cls = _resolve_stage_class(replace.get(name, name))
+        stage = cls(**stage_options.get(name, {}))
+        # Keep the slot name so timings and overrides stay addressable
+        stage.name = name
+        stages.append(stage)
+
+    return TryOnPipeline(source, stages)
@@ -1,234 +1,197 @@
+#!/usr/bin/env python3
+"""
+Virtual try-on viewer and API worker
+Both modes run the stage pipeline from tryon_pipeline.py
+"""
+
 import os
-import cv2
-import math
-import cvzone
-from cvzone.PoseModule import PoseDetector
-
-# --- Camera and Pose Detector ---
-cap = cv2.VideoCapture(1)
-detector = PoseDetector()
-shirtRatio = 581 / 440  # Height/Width ratio of shirt images
-selected_shirt = None
-
-# --- Shirt lists ---
-male_shirts = [f"male/{f}" for f in os.listdir("static/male") if f.lower().endswith((".png", ".jpg"))]
-female_shirts = [f"female/{f}" for f in os.listdir("static/female") if f.lower().endswith((".png", ".jpg"))]
-
-# --- Smoothing variables for stable overlay ---
-prev_cx, prev_cy, prev_w, prev_h = 0, 0, 0, 0
-smoothing = 0.2  # smaller = smoother
-
-# --- Size and confidence tracking ---
-size_recommendation = "N/A"
-confidence_score = 0.0
-current_gender = "male"
-current_shirt_index = 1
-
-# --- Functions ---
-
-def calculate_size_recommendation(shoulder_dist):
+import sys
+import time
+import argparse
+
+# Worker startup spans: interpreter start ends here, the imports below follow
+MODULE_STARTED_NS = time.time_ns()
+
+from frame_sources import open_frame_source
+from metrics import FrameMetrics, PeriodicReporter
+from status_stream import SessionEventReporter
+from tracing import worker_trace_context
+from worker_watchdog import open_heartbeat_writer
+from resource_governor import apply_worker_limits, parse_cpu_list
+from tryon_pipeline import build_pipeline, load_pipeline_config
+
+IMPORTS_DONE_NS = time.time_ns()
+
+# --- Keyboard shortcuts for the interactive viewer ---
+SHIRT_KEYS = {
+    "1": ("male", 1),
+    "2": ("male", 2),
+    "3": ("female", 1),
+    "4": ("male", 3),
+    "5": ("female", 2),
+}
+
+
+def get_screen_size():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        size = (root.winfo_screenwidth(), root.winfo_screenheight())
+        root.destroy()
+        return size
+    except Exception:
+        return None
+
+
+def create_pipeline(source, worker=False, headless=False):
     """
-    Calculate size recommendation based on shoulder distance in pixels.
-    Caps the size at XL maximum.
+    Build the try-on pipeline for a frame source. The viewer runs fullscreen
+    with shirt shortcuts, the worker uses a plain window.
     """
-    shoulder_dist = max(0, min(shoulder_dist, 140))  # Clamp to max 140 pixels
-    if shoulder_dist < 80:
-        return "XS"
-    elif shoulder_dist < 100:
-        return "S"
-    elif shoulder_dist < 120:
-        return "M"
-    elif shoulder_dist < 140:
-        return "L"
-    else:
-        return "XL"  # Max size
-
-def calculate_confidence_score(lmList, shoulder_dist):
-    if not lmList or len(lmList) < 25:
-        return 0.0
-
-    key_landmarks = [11, 12, 23, 24]  # shoulders and hips
-    visible_count = 0
-
-    for idx in key_landmarks:
-        if idx < len(lmList) and len(lmList[idx]) >= 3:
-            # Check if landmark has visibility/confidence
-            if len(lmList[idx]) > 3 and lmList[idx][3] > 0.5:
-                visible_count += 1
-            elif len(lmList[idx]) == 3:
-                visible_count += 1
-
-    visibility_score = visible_count / len(key_landmarks)
-    shoulder_stability = min(1.0, shoulder_dist / 150.0) if shoulder_dist > 0 else 0.0
-
-    confidence = (visibility_score * 0.7 + shoulder_stability * 0.3) * 100
-    return min(100.0, confidence)
-
-def draw_info_panel(img, size_rec, confidence, gender, shirt_index):
-    h, w = img.shape[:2]
-
-    panel_width = 280
-    panel_height = 120
-    panel_x = w - panel_width - 20
-    panel_y = h - panel_height - 20
-
-    overlay = img.copy()
-    cv2.rectangle(overlay, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.7, img, 0.3, 0, img)
-
-    cv2.rectangle(img, (panel_x, panel_y), (panel_x + panel_width, panel_y + panel_height), (255, 255, 255), 2)
-
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 0.6
-    thickness = 2
-
-    title_text = f"{gender.upper()} SHIRT {shirt_index}"
-    cv2.putText(img, title_text, (panel_x + 10, panel_y + 25), font, 0.5, (255, 255, 255), 1)
-
-    # Ensure size_rec is valid
-    if size_rec not in ["XS", "S", "M", "L", "XL"]:
-        size_rec = "XL"
-
-    size_text = f"Recommended Size: {size_rec}"
-    cv2.putText(img, size_text, (panel_x + 10, panel_y + 50), font, font_scale, (0, 255, 0), thickness)
-
-    conf_text = f"Accuracy: {confidence:.1f}%"
-    if confidence >= 80:
-        conf_color = (0, 255, 0)
-    elif confidence >= 60:
-        conf_color = (0, 255, 255)
-    else:
-        conf_color = (0, 0, 255)
-    cv2.putText(img, conf_text, (panel_x + 10, panel_y + 75), font, font_scale, conf_color, thickness)
-
-    bar_x = panel_x + 10
-    bar_y = panel_y + 90
-    bar_width = 200
-    bar_height = 15
-    cv2.rectangle(img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (50, 50, 50), -1)
-
-    fill_width = int((confidence / 100.0) * bar_width)
-    cv2.rectangle(img, (bar_x, bar_y), (bar_x + fill_width, bar_y + bar_height), conf_color, -1)
-    cv2.rectangle(img, (bar_x, bar_y), (bar_x + bar_width, bar_y + bar_height), (255, 255, 255), 1)
-
-    return img
-
-def select_shirt(gender, index):
-    global selected_shirt, current_gender, current_shirt_index
-    if gender == "male":
-        if 1 <= index <= len(male_shirts):
-            selected_shirt = male_shirts[index - 1]
-        else:
-            raise ValueError("Invalid male shirt index")
-    elif gender == "female":
-        if 1 <= index <= len(female_shirts):
-            selected_shirt = female_shirts[index - 1]
-        else:
-            raise ValueError("Invalid female shirt index")
-    else:
-        raise ValueError("Invalid gender")
-    current_gender = gender
-    current_shirt_index = index
-    print(f"[INFO] Selected shirt: {selected_shirt}")
-
-def process_frame():
-    global selected_shirt, prev_cx, prev_cy, prev_w, prev_h, size_recommendation, confidence_score
-
-    success, img = cap.read()
-    if not success:
-        return None
+    options = {}
+    # TRYON_PIPELINE_CONFIG, with the sink swapped out when headless
+    config = load_pipeline_config()
+    if headless:
+        config = dict(config, replace=dict(config.get("replace") or {}, sink="null_sink"))
+    elif not worker:
+        options["sink"] = {"fullscreen": True, "screen_size": get_screen_size()}
+
+    pipeline = build_pipeline(source, config=config, options=options)
+    if not worker:
+        for key, (gender, index) in SHIRT_KEYS.items():
+            pipeline.key_handlers[key] = lambda g=gender, i=index: pipeline.select_shirt(g, i)
+    return pipeline
+
+
+def run_viewer(source_spec, headless=False):
+    print("Starting Virtual Try-On Stream...")
+    pipeline = create_pipeline(open_frame_source(source_spec), headless=headless)
+    pipeline.select_shirt("male", 1)
+    pipeline.run()
+    return 0
+
+
+def run_worker(gender, shirt_index, source_spec, headless=False):
+    """
+    Entry point for sessions started through the API server. When the
+    server passed a trace context, startup is traced up to the first
+    processed frame as part of the /api/try-on request's trace.
+    """
+    tracer, parent, spawned_at = worker_trace_context()
+    startup = tracer.start_span(
+        "worker.startup", parent=parent or False, start_ns=spawned_at or MODULE_STARTED_NS,
+        attributes={"tryon.gender": gender, "tryon.shirt": shirt_index, "process.pid": os.getpid()}
+    )
+    token = tracer.activate(startup)
+    if spawned_at:
+        tracer.start_span("worker.interpreter_start", start_ns=spawned_at).end(MODULE_STARTED_NS)
+    tracer.start_span("worker.imports", start_ns=MODULE_STARTED_NS).end(IMPORTS_DONE_NS)
+    try:
+        return serve_worker(gender, shirt_index, source_spec, headless, tracer, startup)
+    finally:
+        tracer.deactivate(token)
+        startup.end()
+
+
+def serve_worker(gender, shirt_index, source_spec, headless, tracer, startup):
+    # Session events go to stdout, where the API server streams them to clients
+    events = SessionEventReporter(float(os.getenv("TRYON_STATUS_INTERVAL", "0.5")))
+
+    def fail(message):
+        print(f"[ERROR] {message}")
+        events.event("error", error=message)
+        startup.set_error(message)
+
+    cpus = None
+    if os.getenv("TRYON_WAIT_FOR_START"):
+        # The API server sends "start [gender shirt [cpus]]" once the previous
+        # worker has released the camera; a warm spare learns its shirt from it
+        with tracer.span("worker.wait_for_start"):
+            command = sys.stdin.readline().split()
+        if not command or command[0] != "start":
+            print("[INFO] Start cancelled")
+            return 0
+        if len(command) >= 3:
+            gender, shirt_index = command[1], int(command[2])
+        if len(command) == 4:
+            cpus = parse_cpu_list(command[3])
+    # Thread pools and CPUs from the API server's resource governor
+    apply_worker_limits(cpus)
+
+    print(f"[INFO] Starting Virtual Try-On for {gender} shirt {shirt_index}")
 
-    img = detector.findPose(img, draw=False)
-    lmList, _ = detector.findPosition(img, bboxWithHands=False, draw=False)
+    try:
+        with tracer.span("worker.open_source", source=source_spec):
+            source = open_frame_source(source_spec)
+    except (IOError, OSError, ValueError) as e:
+        fail(f"Could not open camera: {e}")
+        return 1
 
-    if not lmList or len(lmList) < 25:
-        size_recommendation = "N/A"
-        confidence_score = 0.0
-        return draw_info_panel(img, size_recommendation, confidence_score, current_gender, current_shirt_index)
+    print(f"[INFO] Camera opened successfully ({source.width}x{source.height} @ {source.fps:.0f} fps)")
+    events.event("camera_ready", width=source.width, height=source.height, fps=source.fps)
 
     try:
-        lm11, lm12 = lmList[11], lmList[12]
-        lm23, lm24 = lmList[23], lmList[24]
-
-        shoulderDist = math.hypot(lm12[0]-lm11[0], lm12[1]-lm11[1])
-        confidence_score = calculate_confidence_score(lmList, shoulderDist)
-        size_recommendation = calculate_size_recommendation(shoulderDist)
-
-        if selected_shirt:
-            w = int(shoulderDist * 1.6)
-            h = int(w * shirtRatio)
-
-            cx = (lm11[0]+lm12[0])//2
-            cy = (lm11[1]+lm12[1])//2
-            torso_y = (lm23[1]+lm24[1])//2
-            cy_torso = (cy+torso_y)//2
-
-            cx = int(prev_cx + (cx-prev_cx)*smoothing)
-            cy_torso = int(prev_cy + (cy_torso-prev_cy)*smoothing)
-            w = int(prev_w + (w-prev_w)*smoothing)
-            h = int(prev_h + (h-prev_h)*smoothing)
-            prev_cx, prev_cy, prev_w, prev_h = cx, cy_torso, w, h
-
-            path = os.path.join("static", selected_shirt)
-            if os.path.exists(path):
-                imgShirt = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-                imgShirt = cv2.resize(imgShirt, (w, h))
-
-                dx = lm12[0] - lm11[0]
-                dy = lm12[1] - lm11[1]
-                angle = math.degrees(math.atan2(dy, dx))
-                if dx < 0:
-                    angle += 180
-
-                M = cv2.getRotationMatrix2D((w//2, h//2), angle, 1)
-                imgShirt = cv2.warpAffine(imgShirt, M, (w, h), borderMode=cv2.BORDER_TRANSPARENT)
-
-                x = max(cx - w//2, 0)
-                y = max(cy_torso - h//2, 0)
-                img = cvzone.overlayPNG(img, imgShirt, [x, y])
+        with tracer.span("worker.build_pipeline"):
+            pipeline = create_pipeline(source, worker=True, headless=headless)
+            pipeline.select_shirt(gender, shirt_index)
+    except Exception as e:
+        fail(f"Shirt selection failed: {e}")
+        source.release()
+        return 1
+
+    # Frame metrics go to stdout, where the API server aggregates them
+    reporter = PeriodicReporter(FrameMetrics(source), float(os.getenv("TRYON_METRICS_INTERVAL", "2")))
+    pipeline.frame_listeners.append(reporter)
+    # Frame heartbeat for the API server's watchdog
+    heartbeat = open_heartbeat_writer(os.getenv("TRYON_HEARTBEAT"))
+    if heartbeat:
+        pipeline.frame_listeners.append(heartbeat)
 
+    try:
+        with tracer.span("worker.model_load"):
+            pipeline.start()
+        print("[INFO] Virtual Try-On started! Press 'q' to quit.")
+        events.event("model_loaded")
+        pipeline.frame_listeners.append(events)
+
+        # Startup ends when the first frame has been through every stage
+        first_frame = tracer.start_span("worker.first_frame")
+
+        def end_startup(ctx):
+            if startup.end_ns is None:
+                first_frame.end()
+                startup.end()
+        pipeline.frame_listeners.append(end_startup)
+        pipeline.run()
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted by user")
     except Exception as e:
-        print(f"[WARN] Overlay skipped: {e}")
+        fail(f"Unexpected error: {e}")
+    finally:
+        reporter.flush()
+        if heartbeat:
+            heartbeat.close()
+        print("[INFO] Virtual Try-On stopped.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Virtual Try-On viewer")
+    parser.add_argument("--worker", action="store_true", help="Run as an API server worker")
+    parser.add_argument("--gender", default="male", choices=["male", "female"])
+    parser.add_argument("--shirt", type=int, default=1, help="1-based shirt index")
+    parser.add_argument("--source", default=None, help="Frame source spec (default: TRYON_FRAME_SOURCE)")
+    parser.add_argument("--headless", action="store_true", help="Do not open a window")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        source_spec = args.source or os.getenv("TRYON_FRAME_SOURCE", "camera:0")
+        return run_worker(args.gender, args.shirt, source_spec, args.headless)
+
+    source_spec = args.source or os.getenv("TRYON_FRAME_SOURCE", "camera:1")
+    return run_viewer(source_spec, args.headless)
 
-    img = draw_info_panel(img, size_recommendation, confidence_score, current_gender, current_shirt_index)
-    return img
 
 # --- Main Loop ---
 if __name__ == "__main__":
-    print("Starting Virtual Try-On Stream...")
-    select_shirt("male", 1)
-
-    import tkinter as tk
-    root = tk.Tk()
-    screen_width = root.winfo_screenwidth()
-    screen_height = root.winfo_screenheight()
-    root.destroy()
-
-    cv2.namedWindow("Virtual Try-On", cv2.WINDOW_NORMAL)
-    cv2.resizeWindow("Virtual Try-On", screen_width, screen_height)
-    cv2.moveWindow("Virtual Try-On", 0, 0)
-    cv2.setWindowProperty("Virtual Try-On", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-
-    while True:
-        frame = process_frame()
-        if frame is None:
-            break
-
-        cv2.imshow("Virtual Try-On", frame)
-        key = cv2.waitKey(1) & 0xFF
-
-        if key == ord('q'):
-            break
-        elif key == ord('1'):
-            select_shirt("male", 1)
-        elif key == ord('2'):
-            select_shirt("male", 2)
-        elif key == ord('3'):
-            select_shirt("female", 1)
-        elif key == ord('4'):
-            select_shirt("male", 3)
-        elif key == ord('5'):
-            select_shirt("female", 2)
-
-    cap.release()
-    cv2.destroyAllWindows()
+    sys.exit(main())
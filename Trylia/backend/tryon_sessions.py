@@ -0,0 +1,232 @@
+"""
+Try-on sessions for POST /api/try-on
+A start request only creates a session; its startup runs in a background
+executor and the session moves through explicit states, each with the
+time it was entered:
+
+    queued -> preparing -> probing_camera -> starting
+           -> camera_ready -> model_loaded -> running
+
+and ends in stopped, replaced (by a newer session), failed (before the
+worker was released) or crashed (the worker exited on its own). States
+from starting on follow the events the worker reports (see status_stream).
+
+Every change is also written to the session's store, so other API
+processes can report the session (see process_registry).
+"""
+
+import uuid
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('stopped', 'replaced', 'failed', 'crashed')
+# Worker events that move a session forward
+EVENT_STATES = {
+    'camera_ready': 'camera_ready',
+    'model_loaded': 'model_loaded',
+    'first_frame': 'running',
+}
+
+
+class TryOnSession:
+    """One request to run the try-on worker for a shirt"""
+
+    def __init__(self, gender, shirt_index, restarts=0, store=None):
+        self.id = uuid.uuid4().hex[:16]
+        self.gender = gender
+        self.shirt_index = shirt_index
+        # Watchdog restarts since the user started the shirt
+        self.restarts = restarts
+        self.state = 'queued'
+        self.timestamps = {'queued': datetime.now().isoformat()}
+        self.pid = None
+        self.error = None
+        # Shared record of the session; version orders its writes
+        self.store = store
+        self.version = 0
+
+    @property
+    def finished(self):
+        return self.state in TERMINAL_STATES
+
+    def to_dict(self):
+        return {
+            'sessionId': self.id,
+            'gender': self.gender,
+            'shirtIndex': self.shirt_index,
+            'state': self.state,
+            'timestamps': dict(self.timestamps),
+            'pid': self.pid,
+            'restarts': self.restarts,
+            'error': self.error
+        }
+
+
+class SessionManager:
+    """
+    Runs session startups one at a time on a background thread and keeps
+    the latest sessions for status requests. A session still queued when
+    a newer one arrives is replaced without being started.
+    """
+
+    def __init__(self, history=100):
+        self.history = history
+        self._executor = None
+        self._futures = set()
+        self._sessions = OrderedDict()
+        self._by_pid = {}
+        self._lock = threading.Lock()
+
+    def submit(self, gender, shirt_index, startup, restarts=0, store=None):
+        """
+        Create a session and queue startup(session); returns the session at
+        once. The session is recorded in store (see process_registry).
+        """
+        session = TryOnSession(gender, shirt_index, restarts, store)
+        with self._lock:
+            changed = [other for other in self._sessions.values()
+                       if other.state == 'queued' and self._advance(other, 'replaced')]
+            changed.append(session)
+            snapshots = self._snapshot(changed)
+            self._sessions[session.id] = session
+            self._evict()
+            # Started on first use, and again after a shutdown
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tryon-session')
+            future = self._executor.submit(self._run, session, startup)
+            self._futures.add(future)
+        self._publish(snapshots)
+        future.add_done_callback(self._discard_future)
+        return session
+
+    def _discard_future(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(self, session, startup):
+        if session.state != 'queued':
+            return
+        try:
+            startup(session)
+        except Exception as e:
+            logger.error(f"Try-on session {session.id} failed: {e}")
+            self.advance(session, 'failed', error=str(e))
+
+    def _evict(self):
+        while len(self._sessions) > self.history:
+            oldest = next(iter(self._sessions.values()))
+            del self._sessions[oldest.id]
+            self._by_pid.pop(oldest.pid, None)
+
+    def _advance(self, session, state, error=None):
+        # Called with the lock held; finished sessions keep their final state
+        if session.finished:
+            return False
+        session.state = state
+        session.timestamps.setdefault(state, datetime.now().isoformat())
+        if error is not None:
+            session.error = error
+        return True
+
+    def _snapshot(self, sessions):
+        # Called with the lock held, so versions follow the order of changes
+        snapshots = []
+        for session in sessions:
+            session.version += 1
+            snapshots.append((session, session.version, session.to_dict()))
+        return snapshots
+
+    def _publish(self, snapshots):
+        # Outside the lock: a shared store may wait on other processes
+        for session, version, record in snapshots:
+            if session.store is None:
+                continue
+            try:
+                session.store.save_session(record, version)
+            except Exception as e:
+                logger.warning(f"Could not record try-on session {session.id}: {e}")
+
+    def advance(self, session, state, error=None):
+        """Move session to state unless it has already finished"""
+        with self._lock:
+            advanced = self._advance(session, state, error)
+            snapshots = self._snapshot([session]) if advanced else []
+        self._publish(snapshots)
+        return advanced
+
+    def attach(self, session, pid):
+        """
+        Record the worker started for session. The session whose worker it
+        replaces is marked replaced.
+        """
+        with self._lock:
+            changed = [session]
+            for other_pid, other in list(self._by_pid.items()):
+                if other is not session:
+                    if self._advance(other, 'replaced'):
+                        changed.append(other)
+                    del self._by_pid[other_pid]
+            session.pid = pid
+            self._by_pid[pid] = session
+            snapshots = self._snapshot(changed)
+        self._publish(snapshots)
+
+    def cancel(self):
+        """Stop every session that has not finished, e.g. on /api/stop"""
+        with self._lock:
+            changed = [session for session in self._sessions.values() if self._advance(session, 'stopped')]
+            self._by_pid.clear()
+            snapshots = self._snapshot(changed)
+        self._publish(snapshots)
+
+    def report_unhealthy(self, pid, reason):
+        """
+        Note on the session of pid why the watchdog gave up on its worker.
+        Returns (gender, shirt index, restarts so far), or None for a worker
+        that belongs to no current session.
+        """
+        with self._lock:
+            session = self._by_pid.get(pid)
+            if session is None or session.finished:
+                return None
+            session.error = f"Worker {reason.replace('_', ' ')}"
+            snapshots = self._snapshot([session])
+        self._publish(snapshots)
+        return session.gender, session.shirt_index, session.restarts
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.to_dict() if session else None
+
+    def on_worker_event(self, event):
+        """StatusBroadcaster listener: follow the events of each session's worker"""
+        name, pid = event['event'], event['data'].get('pid')
+        with self._lock:
+            session = self._by_pid.get(pid)
+            if session is None:
+                return
+            advanced = False
+            if name in EVENT_STATES:
+                advanced = self._advance(session, EVENT_STATES[name])
+            elif name in ('stopped', 'crashed'):
+                advanced = self._advance(session, name, event['data'].get('error') if name == 'crashed' else None)
+                del self._by_pid[pid]
+            snapshots = self._snapshot([session]) if advanced else []
+        self._publish(snapshots)
+
+    def shutdown(self):
+        """Drop queued startups; one already running finishes on its own"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            futures, self._futures = self._futures, set()
+        # Cancelled one by one; shutdown(cancel_futures=True) needs Python 3.9
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
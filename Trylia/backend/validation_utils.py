@@ -1,11 +1,45 @@
 """
 Validation utilities for Trylia Contact Us feature
+The contact form is described by a declarative schema that is compiled once,
+at import, into a list of specialized field checks
 """
 
 import re
+from functools import lru_cache
+from collections import namedtuple
 from urllib.parse import urlparse
 from email_validator import validate_email, EmailNotValidError # type: ignore
 
+# Separators allowed in phone numbers
+PHONE_SEPARATORS = re.compile(r'[\s\-\(\)\+\.]')
+
+@lru_cache(maxsize=4096)
+def normalize_email(email):
+    """
+    Validate and normalize an email address, memoized so the same address is
+    only parsed once. Returns (True, normalized) or (False, error message).
+    """
+    try:
+        # Use check_deliverability=False to avoid strict domain checking
+        # This allows valid email formats without checking if domain accepts email
+        valid = validate_email(email, check_deliverability=False)
+        return True, valid.email
+    except EmailNotValidError as e:
+        return False, str(e)
+
+class ValidatedSubmission(dict):
+    """
+    Cleaned contact form data. Its businessEmail is already normalized, so
+    downstream code (e.g. EmailService) does not need to validate it again.
+    """
+    
+    @property
+    def normalized_email(self):
+        return self.get('businessEmail')
+
+# One entry of a form schema: the form key, the kind of check and its options
+Field = namedtuple('Field', 'name kind label options', defaults=(None, None))
+
 class ContactFormValidator:
     """Validator for contact form data"""
     
@@ -56,7 +90,7 @@ class ContactFormValidator:
     @staticmethod
     def validate_required_field(value, field_name, min_length=1, max_length=None):
         """Validate required field with length constraints"""
-        if not value or not value.strip():
+        if not isinstance(value, str) or not value.strip():
             return False, f"{field_name} is required"
         
         value = value.strip()
@@ -71,18 +105,17 @@ class ContactFormValidator:
     @staticmethod
     def validate_email(email):
         """Validate email format"""
-        try:
-            # Use check_deliverability=False to avoid strict domain checking
-            # This allows valid email formats without checking if domain accepts email
-            valid = validate_email(email, check_deliverability=False)
-            return True, valid.email
-        except EmailNotValidError as e:
-            return False, f"Invalid email format: {str(e)}"
+        if not isinstance(email, str):
+            email = ''
+        is_valid, result = normalize_email(email)
+        if not is_valid:
+            return False, f"Invalid email format: {result}"
+        return True, result
     
     @staticmethod
     def validate_url(url):
         """Validate URL format"""
-        if not url or not url.strip():
+        if not isinstance(url, str) or not url.strip():
             return False, "Website URL is required"
         
         url = url.strip()
@@ -107,13 +140,13 @@ class ContactFormValidator:
     @staticmethod
     def validate_phone(phone):
         """Validate phone number format"""
-        if not phone or not phone.strip():
+        if not isinstance(phone, str) or not phone.strip():
             return False, "Phone number is required"
         
         phone = phone.strip()
         
         # Remove common separators and spaces
-        cleaned_phone = re.sub(r'[\s\-\(\)\+\.]', '', phone)
+        cleaned_phone = PHONE_SEPARATORS.sub('', phone)
         
         # Check if it contains only digits after cleaning
         if not cleaned_phone.isdigit():
@@ -134,97 +167,87 @@ class ContactFormValidator:
     
     @classmethod
     def validate_contact_form(cls, form_data):
-        """Validate entire contact form"""
+        """
+        Validate entire contact form. Returns (is_valid, errors, validated_data)
+        where validated_data is a ValidatedSubmission.
+        """
+        return CONTACT_FORM_VALIDATOR.validate(form_data)
+
+def _compile_field(field):
+    """Build the check for one schema field: value -> (is_valid, result)"""
+    options = field.options or {}
+    kind = field.kind
+    
+    if kind == 'text':
+        label = field.label
+        min_length = options.get('min_length', 1)
+        max_length = options.get('max_length')
+        return lambda value: ContactFormValidator.validate_required_field(value, label, min_length, max_length)
+    
+    if kind == 'choice':
+        choices = frozenset(options['choices'])
+        message = f"Please select a valid {field.label}"
+        
+        def check_choice(value):
+            try:
+                if value and value in choices:
+                    return True, value
+            except TypeError:
+                # Unhashable values (lists, dicts) are never valid choices
+                pass
+            return False, message
+        return check_choice
+    
+    if kind == 'optional_text':
+        def check_optional(value):
+            if isinstance(value, str) and value.strip():
+                return True, value.strip()
+            return True, None
+        return check_optional
+    
+    checks = {
+        'email': ContactFormValidator.validate_email,
+        'url': ContactFormValidator.validate_url,
+        'phone': ContactFormValidator.validate_phone
+    }
+    if kind not in checks:
+        raise ValueError(f"Unknown field kind '{kind}' for {field.name}")
+    return checks[kind]
+
+class CompiledValidator:
+    """A form schema compiled into (name, check) pairs, built once at import"""
+    
+    def __init__(self, schema):
+        self.schema = tuple(schema)
+        self._checks = tuple((field.name, _compile_field(field)) for field in self.schema)
+    
+    def validate(self, form_data):
         errors = {}
-        validated_data = {}
+        validated_data = ValidatedSubmission()
+        get = form_data.get
         
-        # Company Name
-        is_valid, result = cls.validate_required_field(
-            form_data.get('companyName'), 'Company Name', 2, 100
-        )
-        if not is_valid:
-            errors['companyName'] = result
-        else:
-            validated_data['companyName'] = result
-        
-        # Website URL
-        is_valid, result = cls.validate_url(form_data.get('websiteUrl'))
-        if not is_valid:
-            errors['websiteUrl'] = result
-        else:
-            validated_data['websiteUrl'] = result
+        for name, check in self._checks:
+            is_valid, result = check(get(name))
+            if not is_valid:
+                errors[name] = result
+            elif result is not None:
+                validated_data[name] = result
         
-        # Contact Person
-        is_valid, result = cls.validate_required_field(
-            form_data.get('contactPerson'), 'Contact Person Name', 2, 50
-        )
-        if not is_valid:
-            errors['contactPerson'] = result
-        else:
-            validated_data['contactPerson'] = result
-        
-        # Business Email
-        is_valid, result = cls.validate_email(form_data.get('businessEmail'))
-        if not is_valid:
-            errors['businessEmail'] = result
-        else:
-            validated_data['businessEmail'] = result
-        
-        # Phone Number
-        is_valid, result = cls.validate_phone(form_data.get('phoneNumber'))
-        if not is_valid:
-            errors['phoneNumber'] = result
-        else:
-            validated_data['phoneNumber'] = result
-        
-        # Company Size
-        is_valid, result = cls.validate_dropdown_choice(
-            form_data.get('companySize'), cls.COMPANY_SIZES, 'company size'
-        )
-        if not is_valid:
-            errors['companySize'] = result
-        else:
-            validated_data['companySize'] = result
-        
-        # Inquiry Type
-        is_valid, result = cls.validate_dropdown_choice(
-            form_data.get('inquiryType'), cls.INQUIRY_TYPES, 'inquiry type'
-        )
-        if not is_valid:
-            errors['inquiryType'] = result
-        else:
-            validated_data['inquiryType'] = result
-        
-        # Message
-        is_valid, result = cls.validate_required_field(
-            form_data.get('message'), 'Message', 10, 1000
-        )
-        if not is_valid:
-            errors['message'] = result
-        else:
-            validated_data['message'] = result
-        
-        # Meeting Mode
-        is_valid, result = cls.validate_dropdown_choice(
-            form_data.get('meetingMode'), cls.MEETING_MODES, 'meeting mode'
-        )
-        if not is_valid:
-            errors['meetingMode'] = result
-        else:
-            validated_data['meetingMode'] = result
-        
-        # Country
-        is_valid, result = cls.validate_dropdown_choice(
-            form_data.get('country'), cls.COUNTRIES, 'country'
-        )
-        if not is_valid:
-            errors['country'] = result
-        else:
-            validated_data['country'] = result
-        
-        # Meeting Time (optional)
-        meeting_time = form_data.get('meetingTime')
-        if meeting_time and meeting_time.strip():
-            validated_data['meetingTime'] = meeting_time.strip()
-        
-        return len(errors) == 0, errors, validated_data
\ No newline at end of file
+        return len(errors) == 0, errors, validated_data
+
+# The contact form, in the order errors are reported
+CONTACT_FORM_SCHEMA = (
+    Field('companyName', 'text', 'Company Name', {'min_length': 2, 'max_length': 100}),
+    Field('websiteUrl', 'url'),
+    Field('contactPerson', 'text', 'Contact Person Name', {'min_length': 2, 'max_length': 50}),
+    Field('businessEmail', 'email'),
+    Field('phoneNumber', 'phone'),
+    Field('companySize', 'choice', 'company size', {'choices': ContactFormValidator.COMPANY_SIZES}),
+    Field('inquiryType', 'choice', 'inquiry type', {'choices': ContactFormValidator.INQUIRY_TYPES}),
+    Field('message', 'text', 'Message', {'min_length': 10, 'max_length': 1000}),
+    Field('meetingMode', 'choice', 'meeting mode', {'choices': ContactFormValidator.MEETING_MODES}),
+    Field('country', 'choice', 'country', {'choices': ContactFormValidator.COUNTRIES}),
+    Field('meetingTime', 'optional_text'),
+)
+
+CONTACT_FORM_VALIDATOR = CompiledValidator(CONTACT_FORM_SCHEMA)
@@ -1,58 +1,100 @@
 #!/usr/bin/env python3
 """
-View contact form submissions from server logs
+View contact form submissions from the submission store, and server
+activity from the API log
 """
 
 import os
+import sys
 import re
-from datetime import datetime
+import argparse
+from collections import Counter
 
-def parse_log_file():
-    """Parse the API server log file for contact form submissions"""
-    
-    log_file = "api_server.log"
+from submission_store import SubmissionStore, iter_csv, iter_ndjson
+from log_reader import IncrementalLogReader, parse_log_line, tail_lines
+
+# Logged by api_server.py for every accepted contact form
+# Logged once a submission has passed validation and admission and is queued
+SUBMISSION_MESSAGE = re.compile(r'Contact form processed successfully for (.+) \(tracking ID: \w+\)')
+
+def show_submissions(store, filters, limit):
+    """Print the most recent contact form submissions"""
     
-    if not os.path.exists(log_file):
-        print("❌ No log file found. Make sure the backend server has been running.")
+    if not os.path.exists(store.path):
+        print("❌ No submission store found. Make sure the backend server has been running.")
         return
     
-    print("📋 Contact Form Submissions from Server Logs")
+    print("📋 Contact Form Submissions")
     print("=" * 60)
     
-    submissions = []
-    
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            # Look for contact form submissions
-            if "Received contact form submission from" in line:
-                # Extract timestamp and company name
-                match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ - INFO - Received contact form submission from (.+)', line)
-                if match:
-                    timestamp = match.group(1)
-                    company = match.group(2)
-                    submissions.append((timestamp, company))
+        total = store.count(filters)
+        page = store.query(filters, limit=limit)
         
-        if submissions:
-            print(f"📊 Found {len(submissions)} contact form submissions:\n")
+        if page['submissions']:
+            print(f"📊 Found {total} contact form submissions, showing the latest {len(page['submissions'])}:\n")
             
-            for i, (timestamp, company) in enumerate(submissions, 1):
-                print(f"{i}. 🏢 {company}")
-                print(f"   📅 {timestamp}")
+            for i, item in enumerate(page['submissions'], 1):
+                print(f"{i}. 🏢 {item['companyName']} ({item['contactPerson']}, {item['businessEmail']})")
+                print(f"   📅 {item['submittedAt']}")
+                print(f"   🏷️  {item['inquiryType']} - {item['country']}")
                 print()
         else:
-            print("📭 No contact form submissions found in logs.")
+            print("📭 No contact form submissions found.")
             print("💡 Submit a test form to see it appear here.")
     
     except Exception as e:
-        print(f"❌ Error reading log file: {e}")
+        print(f"❌ Error reading submissions: {e}")
 
-def show_recent_activity():
-    """Show recent server activity"""
+def search_submissions(store, text, facets, since, until, limit):
+    """Print the newest submissions matching the search words and facets"""
+    
+    if not os.path.exists(store.path):
+        print("❌ No submission store found. Make sure the backend server has been running.")
+        return
+    
+    try:
+        page = store.search(text, facets, since=since, until=until, limit=limit)
+    except Exception as e:
+        print(f"❌ Error searching submissions: {e}")
+        return
     
-    log_file = "api_server.log"
+    print(f"🔎 {page['total']} matching submissions ({page['tookMs']} ms), showing the latest {len(page['submissions'])}:\n")
+    for i, item in enumerate(page['submissions'], 1):
+        print(f"{i}. 🏢 {item['companyName']} ({item['contactPerson']}, {item['businessEmail']})")
+        print(f"   📅 {item['submittedAt']}")
+        print(f"   🏷️  {item['inquiryType']} - {item['country']} - {item['companySize']} - {item['meetingMode']}")
+        print(f"   💬 {(item['message'] or '')[:120]}")
+        print()
+
+def export_submissions(store, filters, output_format):
+    """Write every matching submission to stdout as CSV or NDJSON"""
+    rows = store.iter_submissions(filters)
+    chunks = iter_csv(rows) if output_format == 'csv' else iter_ndjson(rows)
+    for chunk in chunks:
+        sys.stdout.write(chunk)
+
+def format_log_line(line):
+    """Readable form of a JSON or text log line"""
+    entry = parse_log_line(line)
+    if entry.get('ts') is None:
+        return entry.get('message', '')
+    return f"{entry['ts']} - {entry.get('level')} - {entry.get('message', '')}"
+
+def print_activity_line(line):
+    """Print a log line if it is contact or request activity"""
+    if any(keyword in line for keyword in ['contact', 'POST', 'GET']):
+        # Clean up the line for display
+        clean_line = format_log_line(line)
+        if 'contact' in clean_line.lower():
+            print(f"📧 {clean_line}")
+        elif 'POST' in clean_line:
+            print(f"📤 {clean_line}")
+        elif 'GET' in clean_line:
+            print(f"📥 {clean_line}")
+
+def show_recent_activity(log_file):
+    """Show recent server activity"""
     
     if not os.path.exists(log_file):
         print("❌ No log file found.")
@@ -62,39 +104,128 @@ def show_recent_activity():
     print("=" * 30)
     
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Get last 10 lines
-        recent_lines = lines[-10:]
-        
-        for line in recent_lines:
-            if any(keyword in line for keyword in ['contact', 'POST', 'GET']):
-                # Clean up the line for display
-                clean_line = line.strip()
-                if 'contact' in clean_line.lower():
-                    print(f"📧 {clean_line}")
-                elif 'POST' in clean_line:
-                    print(f"📤 {clean_line}")
-                elif 'GET' in clean_line:
-                    print(f"📥 {clean_line}")
+        # Get last 10 lines, read backwards from the end of the log
+        for line in tail_lines(log_file, 10):
+            print_activity_line(line)
     
     except Exception as e:
         print(f"❌ Error reading recent activity: {e}")
 
+def show_new_activity(log_file, checkpoint_path):
+    """Summarize log activity written since the last run, reading only the new lines"""
+    
+    if not os.path.exists(log_file):
+        print("❌ No log file found.")
+        return
+    
+    print("📈 New Server Activity")
+    print("=" * 30)
+    
+    reader = IncrementalLogReader(log_file, checkpoint_path)
+    lines = errors = submissions = 0
+    responses = Counter()
+    
+    try:
+        for line in reader.read():
+            lines += 1
+            entry = parse_log_line(line)
+            if entry.get('status'):
+                responses[f"{entry.get('method')} {entry['status'] // 100}xx"] += 1
+            if entry.get('level') == 'ERROR':
+                errors += 1
+            match = SUBMISSION_MESSAGE.match(entry.get('message', ''))
+            if match:
+                submissions += 1
+                print(f"📧 {entry['ts']} - {match.group(1)}")
+    
+    except Exception as e:
+        print(f"❌ Error reading new activity: {e}")
+        return
+    
+    if lines == 0:
+        print("📭 Nothing new since the last run.")
+        return
+    
+    print(f"\n📊 {lines} new log lines: {submissions} contact submissions, {errors} errors")
+    for response, count in sorted(responses.items()):
+        print(f"   {response}: {count}")
+
+def follow_activity(log_file):
+    """Print server activity as it is logged, until Ctrl+C"""
+    
+    reader = IncrementalLogReader(log_file)
+    reader.seek_to_end()
+    print("\n👀 Following server activity (Ctrl+C to stop)...")
+    
+    try:
+        for line in reader.follow():
+            print_activity_line(line)
+    except KeyboardInterrupt:
+        print()
+
 def main():
+    parser = argparse.ArgumentParser(description="View Trylia contact form submissions")
+    parser.add_argument('--db', help="Submission store path (default: CONTACT_DB_PATH or contact_submissions.db)")
+    parser.add_argument('--limit', type=int, default=20, help="Number of submissions to show")
+    parser.add_argument('--email', help="Only submissions from this business email")
+    parser.add_argument('--country', help="Only submissions from this country")
+    parser.add_argument('--inquiry-type', help="Only submissions with this inquiry type")
+    parser.add_argument('--since', help="Only submissions at or after this ISO timestamp")
+    parser.add_argument('--until', help="Only submissions before this ISO timestamp")
+    parser.add_argument('--export', choices=['csv', 'ndjson'], help="Write all matching submissions to stdout")
+    parser.add_argument('--log', default=os.getenv('LOG_FILE') or 'api_server.log', help="API server log file")
+    parser.add_argument('--new', action='store_true', help="Only summarize log activity since the last --new run")
+    parser.add_argument('--checkpoint', help="Where --new keeps its log position (default: <log>.offset)")
+    parser.add_argument('--follow', action='store_true', help="Keep printing server activity as it is logged")
+    
+    commands = parser.add_subparsers(dest='command')
+    search = commands.add_parser('search', help="Search submissions by words and facets")
+    search.add_argument('words', nargs='*', help="Words that must all appear in the message or company name")
+    # Options shared with the main parser keep its value unless given here
+    search.add_argument('--db', default=argparse.SUPPRESS, help="Submission store path")
+    search.add_argument('--limit', type=int, default=argparse.SUPPRESS, help="Number of submissions to show")
+    search.add_argument('--country', default=argparse.SUPPRESS, help="Only submissions from this country")
+    search.add_argument('--inquiry-type', default=argparse.SUPPRESS, help="Only submissions with this inquiry type")
+    search.add_argument('--company-size', help="Only submissions with this company size")
+    search.add_argument('--meeting-mode', help="Only submissions with this meeting mode")
+    search.add_argument('--since', default=argparse.SUPPRESS, help="Only submissions at or after this ISO timestamp")
+    search.add_argument('--until', default=argparse.SUPPRESS, help="Only submissions before this ISO timestamp")
+    args = parser.parse_args()
+    
+    store = SubmissionStore(args.db)
+    filters = {'email': args.email, 'country': args.country, 'inquiryType': args.inquiry_type,
+               'since': args.since, 'until': args.until}
+    
+    if args.command == 'search':
+        facets = {'country': args.country, 'inquiryType': args.inquiry_type,
+                  'companySize': args.company_size, 'meetingMode': args.meeting_mode}
+        search_submissions(store, ' '.join(args.words), facets, args.since, args.until, args.limit)
+        return
+    
+    if args.export:
+        export_submissions(store, filters, args.export)
+        return
+    
+    if args.new:
+        show_new_activity(args.log, args.checkpoint or f"{args.log}.offset")
+        return
+    
     print("🔍 Trylia Contact Form Submission Viewer")
     print("=" * 45)
     print()
     
-    # Parse submissions
-    parse_log_file()
+    # Show stored submissions
+    show_submissions(store, filters, args.limit)
     
     # Show recent activity
-    show_recent_activity()
+    show_recent_activity(args.log)
+    
+    if args.follow:
+        follow_activity(args.log)
+        return
     
     print("\n💡 Tips:")
-    print("   - All form submissions are logged even without email setup")
+    print("   - All form submissions are stored even without email setup")
     print("   - Check this script after each form submission")
     print("   - Configure email to get notifications automatically")
     print()
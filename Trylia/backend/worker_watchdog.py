@@ -0,0 +1,213 @@
+"""
+Heartbeat and watchdog for try-on workers
+The API server creates a small shared memory block per worker and passes
+its name in TRYON_HEARTBEAT. The worker bumps a frame counter in it after
+every processed frame, from the frame loop itself, so a worker stuck in
+cap.read() or inside mediapipe stops beating even though its process is
+alive. The watchdog reads the counters and reports workers that never
+produce a first frame, stall, or stay below a frame-rate floor.
+"""
+
+import os
+import time
+import uuid
+import struct
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Heartbeat layout: sequence (uint64), frames (uint64), time of the last
+# frame (float64, time.monotonic()). The writer makes the sequence odd
+# while it updates the block.
+HEARTBEAT = struct.Struct('<QQd')
+
+
+class HeartbeatWriter:
+    """Worker side: frame listener that records each processed frame"""
+
+    def __init__(self, name):
+        from multiprocessing import resource_tracker, shared_memory
+
+        self._shm = shared_memory.SharedMemory(name=name, create=False)
+        if os.name == 'posix':
+            # The API server owns the block; keep this process's resource
+            # tracker from unlinking it when the worker exits. Windows has
+            # no resource tracker for shared memory.
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self._sequence = 0
+        self.frames = 0
+
+    def __call__(self, ctx=None):
+        self.frames += 1
+        now = time.monotonic()
+        HEARTBEAT.pack_into(self._shm.buf, 0, self._sequence + 1, self.frames, now)
+        self._sequence += 2
+        HEARTBEAT.pack_into(self._shm.buf, 0, self._sequence, self.frames, now)
+
+    def close(self):
+        self._shm.close()
+
+
+def open_heartbeat_writer(name):
+    """
+    HeartbeatWriter for the block the API server passed, or None if it
+    cannot be opened; the worker then runs without a heartbeat and the
+    watchdog reports it as never having produced a frame.
+    """
+    if not name:
+        return None
+    try:
+        return HeartbeatWriter(name)
+    except Exception as e:
+        print(f"[WARN] Heartbeat unavailable, running without it: {e}")
+        return None
+
+
+class Heartbeat:
+    """API server side: the heartbeat block of one worker"""
+
+    def __init__(self):
+        from multiprocessing import shared_memory
+
+        self.name = f"trylia_hb_{uuid.uuid4().hex[:12]}"
+        self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=HEARTBEAT.size)
+        HEARTBEAT.pack_into(self._shm.buf, 0, 0, 0, 0.0)
+
+    def read(self):
+        """(frames, monotonic time of the last frame) as last written by the worker"""
+        for _ in range(100):
+            sequence, frames, last_frame_at = HEARTBEAT.unpack_from(self._shm.buf, 0)
+            if sequence % 2 == 0 and HEARTBEAT.unpack_from(self._shm.buf, 0)[0] == sequence:
+                break
+            time.sleep(0)
+        # A worker that died mid-update leaves the sequence odd; its last values are close enough
+        return frames, last_frame_at
+
+    def close(self):
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _Watched:
+    def __init__(self, heartbeat, now):
+        self.heartbeat = heartbeat
+        self.since = now
+        # (time, frames) at the start of the current frame-rate window
+        self.window = None
+        self.below_floor_since = None
+        # Reason the worker was reported unhealthy
+        self.reason = None
+
+
+class WorkerWatchdog:
+    """
+    Checks the heartbeats of watched workers. A worker is unhealthy when:
+      no_first_frame - it has produced no frame startup_timeout seconds
+                       after being watched
+      stalled        - no frame for stall_timeout seconds
+      slow           - its frame rate stayed below min_fps (0 disables) for
+                       slo_window seconds
+    on_unhealthy(pid, reason) is called once per worker, from the watchdog
+    thread.
+    """
+
+    def __init__(self, on_unhealthy, stall_timeout=5.0, min_fps=0.0, slo_window=30.0,
+                 startup_timeout=60.0, interval=1.0):
+        self.on_unhealthy = on_unhealthy
+        self.stall_timeout = stall_timeout
+        self.min_fps = min_fps
+        self.slo_window = slo_window
+        self.startup_timeout = startup_timeout
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, pid, heartbeat):
+        """Start checking a worker; its startup time counts from now"""
+        with self._lock:
+            self._watched[pid] = _Watched(heartbeat, time.monotonic())
+
+    def forget(self, pid):
+        with self._lock:
+            self._watched.pop(pid, None)
+
+    def check(self, now=None):
+        """[(pid, reason)] for workers that have just become unhealthy"""
+        now = time.monotonic() if now is None else now
+        unhealthy = []
+        with self._lock:
+            for pid, watched in self._watched.items():
+                if watched.reason:
+                    continue
+                reason = self._diagnose(watched, now)
+                if reason:
+                    watched.reason = reason
+                    unhealthy.append((pid, reason))
+        return unhealthy
+
+    def status(self, pid):
+        """Heartbeat of a watched worker for status responses, or None"""
+        with self._lock:
+            watched = self._watched.get(pid)
+        if watched is None:
+            return None
+        frames, last_frame_at = watched.heartbeat.read()
+        return {
+            'frames': frames,
+            'secondsSinceFrame': round(time.monotonic() - last_frame_at, 3) if frames else None,
+            'unhealthy': watched.reason
+        }
+
+    def _diagnose(self, watched, now):
+        frames, last_frame_at = watched.heartbeat.read()
+        if frames == 0:
+            return 'no_first_frame' if now - watched.since >= self.startup_timeout else None
+        if now - last_frame_at >= self.stall_timeout:
+            return 'stalled'
+        if not self.min_fps:
+            return None
+
+        if watched.window is None:
+            watched.window = (now, frames)
+            return None
+        window_start, window_frames = watched.window
+        if now - window_start < self.interval:
+            return None
+        fps = (frames - window_frames) / (now - window_start)
+        watched.window = (now, frames)
+        if fps >= self.min_fps:
+            watched.below_floor_since = None
+            return None
+        if watched.below_floor_since is None:
+            watched.below_floor_since = window_start
+        return 'slow' if now - watched.below_floor_since >= self.slo_window else None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for pid, reason in self.check():
+                try:
+                    self.on_unhealthy(pid, reason)
+                except Exception as e:
+                    logger.error(f"Handling unhealthy try-on worker {pid} failed: {e}")
+
+    def start(self):
+        """Start the watchdog thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='tryon-watchdog', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join(timeout=5)
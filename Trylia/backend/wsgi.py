@@ -0,0 +1,10 @@
+"""
+WSGI entry point for the Trylia API server
+Production servers import the application from here, e.g.
+    gunicorn -c gunicorn.conf.py wsgi:app
+See multi_worker_setup.md.
+"""
+
+from api_server import create_app
+
+app = create_app()
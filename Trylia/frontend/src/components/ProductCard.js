@@ -1,27 +1,14 @@
 import React, { useState, useEffect } from 'react';
 import '../styles/ProductCard.css';
+import { subscribeToTryOnStatus, waitForTryOnSession } from '../services/tryonStatus';
 
 const ProductCard = ({ product }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
   const [isRunning, setIsRunning] = useState(false);
 
-  // Check service status periodically
-  useEffect(() => {
-    const checkStatus = async () => {
-      try {
-        const response = await fetch('http://localhost:5000/api/status');
-        const data = await response.json();
-        setIsRunning(data.isRunning);
-      } catch (err) {
-        setIsRunning(false);
-      }
-    };
-
-    checkStatus();
-    const interval = setInterval(checkStatus, 2000); // Check every 2 seconds
-    return () => clearInterval(interval);
-  }, []);
+  // Follow the service status pushed by the backend
+  useEffect(() => subscribeToTryOnStatus((status) => setIsRunning(status.isRunning)), []);
 
   const handleTryOn = async () => {
     setIsLoading(true);
@@ -41,8 +28,13 @@ const ProductCard = ({ product }) => {
       const data = await response.json();
       
       if (data.success) {
+        // The worker starts in the background; wait until it shows frames
+        const session = await waitForTryOnSession(data.statusUrl);
+        if (session.state !== 'running') {
+          throw new Error(session.error || `Virtual try-on ${session.state}`);
+        }
         setIsRunning(true);
-        alert(`Virtual try-on started for "${product.name}"! The camera window will open shortly. Press 'q' in the camera window to stop.`);
+        alert(`Virtual try-on started for "${product.name}"! The camera window is open. Press 'q' in the camera window to stop.`);
       } else {
         throw new Error(data.message || 'Failed to start virtual try-on');
       }
@@ -0,0 +1,109 @@
+/**
+ * Live try-on session status from the backend's Server-Sent Events stream.
+ * All subscribers share one EventSource, opened with the first subscriber
+ * and closed with the last.
+ */
+
+const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
+
+const LIFECYCLE_EVENTS = ['starting', 'camera_ready', 'model_loaded', 'first_frame', 'stopped', 'crashed'];
+const RUNNING_EVENTS = ['starting', 'camera_ready', 'model_loaded', 'first_frame'];
+
+let source = null;
+let status = { isRunning: false, state: 'idle', live: null, error: null };
+// Worker of the current session; late events from a replaced worker are ignored
+let currentPid = null;
+const listeners = new Set();
+
+function update(changes) {
+  status = { ...status, ...changes };
+  listeners.forEach((listener) => listener(status));
+}
+
+function open() {
+  source = new EventSource(`${API_BASE_URL}/api/status/stream`);
+
+  source.addEventListener('status', (event) => {
+    const data = JSON.parse(event.data);
+    currentPid = data.session.pid;
+    update({
+      isRunning: data.isRunning,
+      state: data.session.state,
+      live: data.session.live,
+      error: data.session.error,
+    });
+  });
+
+  LIFECYCLE_EVENTS.forEach((name) => {
+    source.addEventListener(name, (event) => {
+      const data = JSON.parse(event.data);
+      if (name === 'starting') {
+        currentPid = data.pid;
+      } else if (data.pid !== currentPid) {
+        return;
+      }
+      update({
+        isRunning: RUNNING_EVENTS.includes(name),
+        state: name,
+        live: name === 'starting' ? null : status.live,
+        error: name === 'crashed' ? data.error : null,
+      });
+    });
+  });
+
+  source.addEventListener('live', (event) => {
+    const { pid, fps, sizeRecommendation, confidence } = JSON.parse(event.data);
+    if (pid !== currentPid) {
+      return;
+    }
+    update({ live: { fps, sizeRecommendation, confidence } });
+  });
+
+  // EventSource reconnects on its own; until then the session is unknown
+  source.onerror = () => update({ isRunning: false });
+}
+
+/**
+ * Call listener with the current status now and on every change.
+ * Returns a function that unsubscribes.
+ */
+export function subscribeToTryOnStatus(listener) {
+  listeners.add(listener);
+  if (source === null) {
+    open();
+  }
+  listener(status);
+
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0 && source !== null) {
+      source.close();
+      source = null;
+    }
+  };
+}
+
+const SESSION_DONE_STATES = ['running', 'stopped', 'replaced', 'failed', 'crashed'];
+
+/**
+ * Follow a session started with POST /api/try-on until its worker is
+ * running or the session has ended. Resolves with the session; rejects
+ * if neither happens within timeoutMs.
+ */
+export async function waitForTryOnSession(statusUrl, intervalMs = 500, timeoutMs = 90000) {
+  const deadline = Date.now() + timeoutMs;
+  for (;;) {
+    const response = await fetch(`${API_BASE_URL}${statusUrl}`);
+    const session = await response.json();
+    if (!response.ok) {
+      throw new Error(session.message || 'Failed to load try-on session');
+    }
+    if (SESSION_DONE_STATES.includes(session.state)) {
+      return session;
+    }
+    if (Date.now() >= deadline) {
+      throw new Error(`Virtual try-on did not start in time (still ${session.state})`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}